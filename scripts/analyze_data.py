@@ -1,22 +1,47 @@
 
+import argparse
 import csv
-import json
 import statistics
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data_io
+import stats_schema
+from quantile_sketch import TDigest
+
+# Popularity tiers: upper quantile of Num Votes among the watched movies
+POPULARITY_TIERS = [
+    ('Hidden gems', 0.25),
+    ('Niche', 0.5),
+    ('Well known', 0.75),
+    ('Blockbusters', 1.0),
+]
+
+def parse_film(row):
+    """
+    Returns the row with its numeric fields converted, or None if it isn't a film.
+    """
+    if row['Title Type'] != 'Film':
+        return None
+    # Convert numeric fields
+    try:
+        row['Your Rating'] = float(row['Your Rating'])
+        row['Runtime (mins)'] = int(row['Runtime (mins)'])
+    except ValueError:
+        return None # Skip bad data
+    return row
 
 def load_data(filepath):
     movies = []
-    with open(filepath, 'r', encoding='utf-8') as f:
+    # Rows are streamed, so a compressed ratings file (.gz/.zst) is never decompressed in full
+    with data_io.open_data(filepath, 'r') as f:
         reader = csv.DictReader(f)
         for row in reader:
-            if row['Title Type'] == 'Film':
-                # Convert numeric fields
-                try:
-                    row['Your Rating'] = float(row['Your Rating'])
-                    row['Runtime (mins)'] = int(row['Runtime (mins)'])
-                except ValueError:
-                    continue # Skip bad data
-                movies.append(row)
+            movie = parse_film(row)
+            if movie:
+                movies.append(movie)
     return movies
 
 def process_category(movies, key_extractor, min_count=3):
@@ -74,11 +99,113 @@ def get_actors(movie):
     actors = movie['Main Actors'].split(',')
     return [a.strip() for a in actors if a.strip()]
 
-def main():
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_file = os.path.join(base_dir, 'data', 'ratings-plus.csv')
-    movies = load_data(data_file)
-    
+def add_popularity(digest, movie):
+    """
+    Adds a movie's Num Votes to the quantile sketch, with sums of its ratings on the
+    centroid, so the tiers can be aggregated without keeping every movie.
+    """
+    try:
+        votes = int(movie['Num Votes'])
+    except (KeyError, ValueError, TypeError):
+        return
+    rating = movie['Your Rating']
+    sums = {'liked': 1 if rating >= 7 else 0, 'rating': rating}
+    try:
+        imdb_rating = float(movie['IMDb Rating'])
+        sums.update(imdb_count=1, imdb_rating=imdb_rating, divergence=rating - imdb_rating)
+    except (KeyError, ValueError, TypeError):
+        pass
+    digest.add(votes, **sums)
+
+def popularity_digest(movies):
+    """
+    The Num Votes sketch of the movies on their own, e.g. to save or merge it.
+    build_stats fills its sketch in its own pass over the movies.
+    """
+    digest = TDigest()
+    for m in movies:
+        add_popularity(digest, m)
+    return digest
+
+def largest_remainder(values):
+    """
+    Rounds the values to integers adding up to their (rounded) total: the units left
+    after rounding down go to the largest fractional parts.
+    """
+    floors = [int(value) for value in values]
+    left = round(sum(values)) - sum(floors)
+    by_remainder = sorted(range(len(values)), key=lambda i: values[i] - floors[i], reverse=True)
+    for i in by_remainder[:left]:
+        floors[i] += 1
+    return floors
+
+def popularity_stats(digest):
+    """
+    Approval rate and divergence from the IMDb rating (my rating minus IMDb's, on average)
+    for each popularity tier. The tiers are ranges of ranks (the first quarter of the
+    movies by Num Votes, the second...): a centroid of the sketch straddling a boundary
+    is split between the two tiers in proportion to its weight on each side, its sums
+    with it. The counts are therefore equal quarters, rounded so that they add up to
+    the number of movies, and the rates are interpolated within the split centroids,
+    i.e. approximate.
+    """
+    if not digest.count:
+        return {'median_votes': 0, 'tiers': []}
+    digest.compress()
+    total = digest.count
+    bounds = [digest.quantile(q) for _, q in POPULARITY_TIERS]
+    ranks = [q * total for _, q in POPULARITY_TIERS]
+    totals = [{} for _ in POPULARITY_TIERS]
+    start = 0  # rank of the first value of the centroid
+    for mean, weight, sums in digest.centroids:
+        end = start + weight
+        tier_start = 0
+        for tier, tier_end in zip(totals, ranks):
+            overlap = min(end, tier_end) - max(start, tier_start)
+            if overlap > 0:
+                share = overlap / weight
+                tier['count'] = tier.get('count', 0) + weight * share
+                for key, value in sums.items():
+                    tier[key] = tier.get(key, 0) + value * share
+            tier_start = tier_end
+        start = end
+
+    counts = largest_remainder([tier.get('count', 0) for tier in totals])
+    tiers = []
+    for i, ((name, _), tier) in enumerate(zip(POPULARITY_TIERS, totals)):
+        if not tier:
+            continue
+        imdb_count = tier.get('imdb_count', 0)
+        tiers.append({
+            'name': name,
+            'min_votes': int(digest.min if i == 0 else bounds[i - 1]),
+            'max_votes': int(bounds[i]),
+            'count': counts[i],
+            'approval_rate': tier.get('liked', 0) / tier['count'] * 100,
+            'avg_rating': tier.get('rating', 0) / tier['count'],
+            'avg_imdb_rating': tier.get('imdb_rating', 0) / imdb_count if imdb_count else 0,
+            'divergence': tier.get('divergence', 0) / imdb_count if imdb_count else 0,
+        })
+    return {'median_votes': int(digest.quantile(0.5)), 'tiers': tiers}
+
+CATEGORY_EXTRACTORS = {
+    'genres': get_genres,
+    'directors': get_directors,
+    'actors': get_actors,
+}
+
+def build_stats(movies, category_stats=None, popularity=None, merge_popularity=()):
+    """
+    category_stats(category, min_count): returns the process_category results for
+    'genres', 'directors' or 'actors'. Defaults to computing them from movies.
+    popularity: a sketch the movies' Num Votes are added to (default: a new one), so the
+    caller can save it. merge_popularity: other sketches (e.g. other users') merged into
+    a copy of it for the tiers.
+    """
+    if category_stats is None:
+        def category_stats(category, min_count):
+            return process_category(movies, CATEGORY_EXTRACTORS[category], min_count=min_count)
+
     # 1. Total Runtime & Count
     total_movies = len(movies)
     total_minutes = sum(m['Runtime (mins)'] for m in movies)
@@ -95,10 +222,10 @@ def main():
     # 3. Analyze Categories
     # Filter for genres: must be >= 10% of total movies
     min_genre_count = max(1, int(total_movies * 0.1))
-    genres_stats = process_category(movies, get_genres, min_count=min_genre_count)
+    genres_stats = category_stats('genres', min_genre_count)
     
-    directors_stats = process_category(movies, get_directors, min_count=2) # Directors might be fewer per movie
-    actors_stats = process_category(movies, get_actors, min_count=3)
+    directors_stats = category_stats('directors', 2) # Directors might be fewer per movie
+    actors_stats = category_stats('actors', 3)
     
     # Sort helper
     def sort_key(x):
@@ -138,11 +265,15 @@ def main():
             'avg_rating': avg
         })
         
-    # 5. Vote Distribution
+    # 5. Vote Distribution, and the popularity sketch in the same pass
     # Initialize 1-10
     votes_dist = {i: {'my_count': 0, 'imdb_count': 0} for i in range(1, 11)}
+    if popularity is None:
+        popularity = TDigest()
     
     for m in movies:
+        add_popularity(popularity, m)
+
         # My Rating
         my_r = int(m['Your Rating'])
         if 1 <= my_r <= 10:
@@ -164,6 +295,11 @@ def main():
             'imdb_count': votes_dist[v]['imdb_count']
         })
 
+    if merge_popularity:
+        popularity = TDigest.from_dict(popularity.to_dict())
+        for other in merge_popularity:
+            popularity.merge(other)
+
     output = {
         'total_movies': total_movies,
         'global_avg_rating': global_avg_rating,
@@ -179,11 +315,51 @@ def main():
         },
         'most_watched_genres': most_watched_genres[:5],
         'decades_data': decades_list,
-        'votes_data': votes_list
+        'votes_data': votes_list,
+        'popularity': popularity_stats(popularity)
     }
+    return output
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Generate stats.json from the ratings.")
+    parser.add_argument('--db', help="Read the ratings from this SQLite database (see ratings_db.py) instead of the CSV")
+    parser.add_argument('--ratings-file', default=None, help="Ratings CSV, optionally .gz or .zst (default: data/ratings-plus.csv)")
+    parser.add_argument('--output', default='stats.json', help="Stats file to write, compressed if it ends in .gz or .zst")
+    parser.add_argument('--minify', action='store_true', help="Write the stats without indentation")
+    parser.add_argument('--popularity-sketch', help="Also save the Num Votes sketch to this file, to merge it later")
+    parser.add_argument('--merge-popularity', action='append', default=[], metavar='SKETCH_FILE',
+                        help="Merge a sketch saved by another user or run into the popularity tiers (repeatable)")
+    args = parser.parse_args(argv)
+
+    def with_popularity(movies, category_stats=None):
+        popularity = TDigest()
+        others = [TDigest.from_dict(data_io.load_json(path)) for path in args.merge_popularity]
+        output = build_stats(movies, category_stats, popularity, others)
+        if args.popularity_sketch:
+            # Only this run's movies, whatever was merged
+            data_io.dump_json(popularity.to_dict(), args.popularity_sketch, minify=True)
+        return output
+
+    if args.db:
+        # The category aggregations run as SQL queries on the indexed link tables
+        import ratings_db
+        conn = ratings_db.connect(args.db)
+        try:
+            output = with_popularity(ratings_db.load_films(conn),
+                                     lambda category, min_count: ratings_db.category_stats(conn, category, min_count))
+        finally:
+            conn.close()
+    else:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        data_file = args.ratings_file or os.path.join(base_dir, 'data', 'ratings-plus.csv')
+        output = with_popularity(load_data(data_file))
+
+    # Enforce the shared schema on the in-memory stats, so a bad stats.json is never written
+    errors = stats_schema.validate(output)
+    if errors:
+        raise ValueError("Generated stats do not match the schema: " + " ".join(errors))
     
-    with open('stats.json', 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2)
+    data_io.dump_json(output, args.output, minify=args.minify)
 
 if __name__ == '__main__':
     main()
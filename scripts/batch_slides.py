@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_slides
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'slides')
+TEMPLATE_FILE = 'template.html'
+
+PDF_TIMEOUT = 60  # seconds per deck
+
+
+def load_manifest(manifest_path):
+    """
+    The manifest is a JSON list of {"stats": ..., "output_dir": ..., "id": optional}.
+    Relative paths are resolved against the manifest's folder.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for i, entry in enumerate(entries):
+        output_dir = os.path.join(base, entry['output_dir'])
+        jobs.append({
+            'id': entry.get('id', os.path.basename(os.path.normpath(output_dir)) or str(i)),
+            'stats': os.path.join(base, entry['stats']),
+            'output_dir': output_dir,
+        })
+    check_ids(jobs)
+    return jobs
+
+
+def check_ids(jobs):
+    """
+    Results are matched back to their job by id, so two jobs can't share one
+    (e.g. two output folders with the same name under different parents).
+    """
+    seen = set()
+    for job in jobs:
+        if job['id'] in seen:
+            raise ValueError(f"Duplicate job id: {job['id']} (give the entries an explicit \"id\")")
+        seen.add(job['id'])
+
+
+def render_html(job, template_dir, template_file, force=False):
+    """
+    Renders one deck's index.html (skipped by generate_slides when up to date) and
+    checks whether its PDF is up to date too. Runs in a worker process.
+    """
+    start = time.perf_counter()
+    result = {'id': job['id'], 'stats': job['stats'], 'output_dir': job['output_dir'], 'html': None, 'pdf': None}
+    try:
+        os.makedirs(job['output_dir'], exist_ok=True)
+        output_path = os.path.join(job['output_dir'], 'index.html')
+        generate_slides.generate_slides(job['stats'], template_dir, template_file, output_path, generate_pdf=False,
+                                        force=force)
+        result['html'] = output_path
+        result['status'] = 'ok'
+        # Same fingerprint as a PDF printed by generate_slides with Chromium
+        _, result['pdf_fingerprint'], _ = generate_slides.output_fingerprints(job['stats'], template_dir, template_file)
+        pdf_path = os.path.join(job['output_dir'], 'index.pdf')
+        if (not force and os.path.exists(pdf_path)
+                and generate_slides.load_fingerprints(output_path).get('pdf') == result['pdf_fingerprint']):
+            result['pdf'] = pdf_path
+            result['pdf_skipped'] = True
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"HTML: {e}"
+    result['html_seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+async def render_pdf(context, result, timeout):
+    start = time.perf_counter()
+    pdf_path = os.path.join(result['output_dir'], 'index.pdf')
+    page = None
+    try:
+        # Opening the page can fail too (e.g. the browser died): it is recorded like
+        # any other PDF failure, so the consumer keeps draining the queue
+        page = await context.new_page()
+
+        async def print_page():
+            await page.goto(f"file://{os.path.abspath(result['html'])}?print", wait_until="load")
+            await page.wait_for_function("window.__slidesReady === true")
+            await page.pdf(path=pdf_path, width="1920px", height="1080px", print_background=True)
+
+        await asyncio.wait_for(print_page(), timeout)
+        result['pdf'] = pdf_path
+        generate_slides.save_fingerprints(result['html'], {'pdf': result['pdf_fingerprint']})
+    except asyncio.TimeoutError:
+        result['status'] = 'timeout'
+        result['error'] = f"PDF: no result after {timeout}s"
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"PDF: {e}"
+    finally:
+        if page is not None:
+            try:
+                await page.close()
+            except Exception:
+                pass
+    result['pdf_seconds'] = round(time.perf_counter() - start, 3)
+
+
+async def run_batch(jobs, template_dir=TEMPLATE_DIR, template_file=TEMPLATE_FILE, workers=None,
+                    contexts=2, timeout=PDF_TIMEOUT, generate_pdf=True, force=False):
+    """
+    Renders HTML for every job in a process pool, one job per worker at a time. Each
+    finished deck is queued for PDF printing by a bounded pool of browser contexts;
+    the next job is only submitted once its predecessor is on the queue, and the
+    queue is bounded too, so HTML rendering waits when the printers fall behind.
+    Decks whose HTML and PDF are up to date (see generate_slides' fingerprints) are
+    skipped, unless force is set.
+    """
+    check_ids(jobs)
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=contexts * 2)
+    results = []
+
+    async def produce(executor):
+        remaining = iter(jobs)
+        pending = set()
+
+        def submit():
+            job = next(remaining, None)
+            if job is not None:
+                pending.add(loop.run_in_executor(executor, render_html, job, template_dir, template_file, force))
+
+        for _ in range(workers or os.cpu_count() or 1):
+            submit()
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results.append(result)
+                if generate_pdf and result['status'] == 'ok' and not result.get('pdf_skipped'):
+                    await queue.put(result)
+                submit()
+        for _ in range(contexts):
+            await queue.put(None)
+
+    async def consume(context):
+        while True:
+            result = await queue.get()
+            if result is None:
+                return
+            await render_pdf(context, result, timeout)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if not generate_pdf:
+            await produce(executor)
+        else:
+            from playwright.async_api import async_playwright
+            async with async_playwright() as p:
+                browser = await p.chromium.launch()
+                browser_contexts = [
+                    await browser.new_context(viewport={'width': 1920, 'height': 1080}) for _ in range(contexts)
+                ]
+                await asyncio.gather(produce(executor), *(consume(c) for c in browser_contexts))
+                await browser.close()
+
+    order = {job['id']: i for i, job in enumerate(jobs)}
+    return sorted(results, key=lambda r: order[r['id']])
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Render the slides for many stats files.")
+    parser.add_argument('manifest', help="JSON list of {\"stats\": ..., \"output_dir\": ...}")
+    parser.add_argument('--summary', default='batch-summary.json', help="Where to write the results")
+    parser.add_argument('--workers', type=int, default=None, help="HTML worker processes (default: CPU count)")
+    parser.add_argument('--contexts', type=int, default=2, help="Browser contexts printing PDFs in parallel")
+    parser.add_argument('--timeout', type=float, default=PDF_TIMEOUT, help="Seconds allowed per PDF")
+    parser.add_argument('--no-pdf', action='store_true', help="Only render the HTML")
+    parser.add_argument('--force', action='store_true', help="Render every deck, even the ones that are up to date")
+    args = parser.parse_args(argv)
+
+    jobs = load_manifest(args.manifest)
+    start = time.perf_counter()
+    results = asyncio.run(run_batch(jobs, workers=args.workers, contexts=args.contexts,
+                                    timeout=args.timeout, generate_pdf=not args.no_pdf, force=args.force))
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        'decks': len(results),
+        'ok': sum(1 for r in results if r['status'] == 'ok'),
+        'failed': sum(1 for r in results if r['status'] != 'ok'),
+        'seconds': round(elapsed, 3),
+        'results': results,
+    }
+    with open(args.summary, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    print(f"Rendered {summary['ok']}/{summary['decks']} decks in {elapsed:.2f}s. Summary saved to {args.summary}")
+
+    if summary['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
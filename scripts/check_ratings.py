@@ -1,72 +1,282 @@
+import argparse
 import csv
+import hashlib
+import io
+import json
+import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data_io
+
 RATINGS_FILE = Path(__file__).parent.parent / 'data' / 'ratings-plus.csv'
 
 
 REQUIRED_COLUMNS = [
-    'Const', 'Your Rating', 'Title', 'URL', 'Title Type', 
+    'Const', 'Your Rating', 'Title', 'URL', 'Title Type',
     'IMDb Rating', 'Runtime (mins)', 'Year', 'Genres', 'Directors', 'Main Actors', 'Countries'
 ]
 
-def validate_ratings():
-    if not RATINGS_FILE.exists():
-        print(f"Error: {RATINGS_FILE} does not exist.")
-        sys.exit(1)
+# Declarative rules for each column. Empty values are accepted unless 'required' is set.
+SCHEMA = {
+    'Const': {'required': True, 'pattern': r'^tt\d+$', 'unique': True},
+    'Your Rating': {'type': 'int', 'min': 1, 'max': 10},
+    'URL': {'pattern': r'^https?://'},
+    'IMDb Rating': {'type': 'float', 'min': 1, 'max': 10},
+    'Runtime (mins)': {'type': 'int', 'min': 1},
+    'Year': {'type': 'int', 'min': 1870, 'max': 2100},
+}
+
+MAX_SAMPLES = 5
+CHUNK_SIZE = 1024 * 1024  # bytes per worker chunk
+
+
+def compile_schema(schema):
+    """
+    Turns the declarative schema into a list of (column, checker) pairs.
+    Each checker takes a raw value and returns a rule name on failure, or None.
+    """
+    casts = {'int': int, 'float': float}
+    compiled = []
+
+    for column, rules in schema.items():
+        cast = casts.get(rules.get('type'))
+        pattern = re.compile(rules['pattern']) if 'pattern' in rules else None
+        low = rules.get('min')
+        high = rules.get('max')
+        required = rules.get('required', False)
+
+        def check(value, cast=cast, pattern=pattern, low=low, high=high, required=required):
+            if not value:
+                return 'required' if required else None
+            if pattern is not None and not pattern.match(value):
+                return 'pattern'
+            if cast is not None:
+                try:
+                    number = cast(value)
+                except ValueError:
+                    return 'type'
+                if (low is not None and number < low) or (high is not None and number > high):
+                    return 'range'
+            return None
+
+        compiled.append((column, check))
+
+    return compiled
+
+
+COMPILED_SCHEMA = compile_schema(SCHEMA)
+UNIQUE_COLUMNS = [column for column, rules in SCHEMA.items() if rules.get('unique')]
+
+
+def hash_value(value):
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+
+
+def read_header(filepath):
+    """
+    Returns (fieldnames, byte offset of the first data row). The offset is in the
+    decompressed data for a compressed file.
+    """
+    with data_io.open_data(filepath, 'rb') as f:
+        first_line = f.readline()
+        offset = f.tell()
+    text = first_line.decode('utf-8-sig')
+    fieldnames = next(csv.reader([text]), None)
+    return fieldnames, offset
+
+
+def split_chunks(filepath, start, chunk_size):
+    """
+    Splits the data section of the file into byte ranges aligned on line boundaries.
+    IMDb exports never contain multi-line fields, so a newline always ends a row.
+    """
+    size = os.path.getsize(filepath)
+    chunks = []
+    with open(filepath, 'rb') as f:
+        while start < size:
+            end = min(start + chunk_size, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def validate_chunk(filepath, fieldnames, start, end):
+    """
+    Validates the rows in a byte range. Row numbers in the result are local to the chunk.
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start).decode('utf-8')
+    # str.splitlines() would also break on \x85, \u2028 and the like inside titles
+    return validate_lines(io.StringIO(data, newline=''), fieldnames)
+
+
+def validate_stream(filepath, fieldnames):
+    """
+    Validates a compressed file in one pass: byte offsets can't be sought in a
+    compressed stream, but rows are decompressed as they are read, so memory stays flat.
+    """
+    with data_io.open_data(filepath, 'r', encoding='utf-8-sig', newline='') as f:
+        next(csv.reader(f), None)  # header
+        return validate_lines(f, fieldnames)
+
+
+def validate_lines(lines, fieldnames):
+    indexes = [(column, fieldnames.index(column), check) for column, check in COMPILED_SCHEMA if column in fieldnames]
+    unique_indexes = [(column, fieldnames.index(column)) for column in UNIQUE_COLUMNS if column in fieldnames]
+
+    row_count = 0
+    counts = {}
+    samples = {}
+    hashes = []
 
+    for values in csv.reader(lines):
+        if not values:
+            continue
+        row_count += 1
+
+        for column, index, check in indexes:
+            value = values[index] if index < len(values) else ''
+            failed = check(value)
+            if failed:
+                rule = f"{column}.{failed}"
+                counts[rule] = counts.get(rule, 0) + 1
+                rule_samples = samples.setdefault(rule, [])
+                if len(rule_samples) < MAX_SAMPLES:
+                    rule_samples.append({'row': row_count, 'value': value})
+
+        for column, index in unique_indexes:
+            value = values[index] if index < len(values) else ''
+            if value:
+                hashes.append((column, hash_value(value), row_count))
+
+    return {'rows': row_count, 'counts': counts, 'samples': samples, 'hashes': hashes}
+
+
+def validate_chunks(filepath, fieldnames, data_start, workers=None, chunk_size=CHUNK_SIZE):
+    chunks = split_chunks(filepath, data_start, chunk_size)
+    if len(chunks) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(validate_chunk, filepath, fieldnames, s, e) for s, e in chunks]
+            return [future.result() for future in futures]
+    return [validate_chunk(filepath, fieldnames, s, e) for s, e in chunks]
+
+
+def build_report(filepath, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Validates the ratings file and returns a JSON-serialisable report.
+    Structural problems (missing file, header or columns) are listed under 'structure'.
+    """
+    report = {
+        'file': str(filepath),
+        'rows': 0,
+        'valid': True,
+        'structure': [],
+        'error_count': 0,
+        'rules': {},
+    }
+
+    if not Path(filepath).exists():
+        report['structure'].append(f"{filepath} does not exist.")
+        report['valid'] = False
+        return report
+
+    fieldnames, data_start = read_header(filepath)
+    if not fieldnames:
+        report['structure'].append("CSV is empty or has no header.")
+        report['valid'] = False
+        return report
+
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in fieldnames]
+    if missing_cols:
+        report['structure'].append(f"Missing columns: {missing_cols}")
+        report['valid'] = False
+        return report
+
+    if data_io.compression_of(filepath):
+        results = [validate_stream(filepath, fieldnames)]
+    else:
+        results = validate_chunks(filepath, fieldnames, data_start, workers, chunk_size)
+
+    rules = report['rules']
+    seen = {}
+    row_offset = 0
+
+    for result in results:
+        for rule, count in result['counts'].items():
+            entry = rules.setdefault(rule, {'count': 0, 'samples': []})
+            entry['count'] += count
+            for sample in result['samples'][rule]:
+                if len(entry['samples']) < MAX_SAMPLES:
+                    entry['samples'].append({'row': sample['row'] + row_offset, 'value': sample['value']})
+
+        # Global duplicate pass: chunks only send short hashes of the unique columns
+        for column, digest, row in result['hashes']:
+            key = (column, digest)
+            row += row_offset
+            if key in seen:
+                entry = rules.setdefault(f"{column}.duplicate", {'count': 0, 'samples': []})
+                entry['count'] += 1
+                if len(entry['samples']) < MAX_SAMPLES:
+                    entry['samples'].append({'row': row, 'first_row': seen[key]})
+            else:
+                seen[key] = row
+
+        row_offset += result['rows']
+
+    report['rows'] = row_offset
+    report['error_count'] = sum(entry['count'] for entry in rules.values())
+    report['valid'] = report['error_count'] == 0
+    report['rules'] = dict(sorted(rules.items()))
+    return report
+
+
+def validate_ratings(workers=None, chunk_size=CHUNK_SIZE, output=None, ratings_file=None):
     try:
-        with open(RATINGS_FILE, mode='r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            
-            # Check columns
-            if not reader.fieldnames:
-                print("Error: CSV is empty or has no header.")
-                sys.exit(1)
-                
-            missing_cols = [col for col in REQUIRED_COLUMNS if col not in reader.fieldnames]
-            if missing_cols:
-                print(f"Error: Missing columns: {missing_cols}")
-                sys.exit(1)
-            
-            row_count = 0
-            error_count = 0
-            
-            for row in reader:
-                row_count += 1
-                
-                # We only care about validation, not filtering here, but we can check types
-                # 'Your Rating' should be int 1-10 if present
-                rating = row.get('Your Rating')
-                if rating:
-                    try:
-                        r = int(rating)
-                        if not (1 <= r <= 10):
-                            print(f"Warning: Row {row_count} has invalid rating: {rating}")
-                            error_count += 1
-                    except ValueError:
-                        print(f"Warning: Row {row_count} has non-integer rating: {rating}")
-                        error_count += 1
-
-                # 'Year' should be a year
-                year = row.get('Year')
-                if year:
-                    try:
-                        int(year)
-                    except ValueError:
-                        print(f"Warning: Row {row_count} has invalid year: {year}")
-                        error_count += 1
-                        
+        report = build_report(ratings_file or RATINGS_FILE, workers=workers, chunk_size=chunk_size)
     except Exception as e:
         print(f"Error processing CSV: {e}")
         sys.exit(1)
 
-    if error_count > 0:
-        print(f"Validation completed with {error_count} warnings.")
+    report_json = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(report_json)
+    print(report_json)
+
+    if report['structure']:
+        print("Error: " + " ".join(report['structure']))
+        sys.exit(1)
+
+    if report['error_count'] > 0:
+        print(f"Validation completed with {report['error_count']} warnings.")
         # Decide if we want to fail on warnings. For now, let's pass but report.
         # If strict validation is needed, sys.exit(1)
     else:
         print("Validation successful. ratings.csv is valid.")
 
+    return report
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Validate the enriched ratings file.")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Bytes per validation chunk")
+    parser.add_argument('--output', help="Also write the JSON report to this file")
+    parser.add_argument('--ratings-file', default=None,
+                        help="Ratings file, optionally .gz or .zst (default: data/ratings-plus.csv)")
+    args = parser.parse_args(argv)
+
+    validate_ratings(workers=args.workers, chunk_size=args.chunk_size, output=args.output,
+                     ratings_file=args.ratings_file)
+
 if __name__ == "__main__":
-    validate_ratings()
+    main()
@@ -0,0 +1,190 @@
+import argparse
+import gzip
+import io
+import json
+import os
+import shutil
+import sys
+import time
+
+# Compression is chosen by the file extension: ratings-plus.csv.gz, stats.json.zst...
+COMPRESSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+SUFFIXES = {compression: suffix for suffix, compression in COMPRESSIONS.items()}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+CHUNK_SIZE = 64 * 1024
+
+
+def compression_of(path):
+    """
+    'gzip', 'zstd' or None for a plain file.
+    """
+    return COMPRESSIONS.get(os.path.splitext(str(path))[1].lower())
+
+
+def base_name(path):
+    """
+    The file name without its compression suffix: stats.json.gz -> stats.json
+    """
+    name = os.path.basename(str(path))
+    suffix = os.path.splitext(name)[1].lower()
+    return name[:-len(suffix)] if suffix in COMPRESSIONS else name
+
+
+def _zstandard():
+    # Optional dependency, only needed for .zst files
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Reading or writing .zst files needs the zstandard package (pip install zstandard)") from None
+    return zstandard
+
+
+def available_compressions():
+    compressions = [None, 'gzip']
+    try:
+        _zstandard()
+        compressions.append('zstd')
+    except RuntimeError:
+        pass
+    return compressions
+
+
+def open_data(path, mode='r', encoding='utf-8', newline=None, compression='auto', level=None):
+    """
+    Opens a data file like open() ('r', 'w', 'rb' or 'wb'), compressing or decompressing
+    on the fly when the path ends in .gz or .zst. The stream is (de)compressed chunk by
+    chunk, so memory stays flat whatever the file size.
+    compression: 'auto' to follow the extension, or None/'gzip'/'zstd' to force it
+    (e.g. for a temporary file that will replace a compressed one).
+    """
+    if compression == 'auto':
+        compression = compression_of(path)
+    binary = 'b' in mode
+    raw_mode = mode.replace('b', '').replace('t', '') + 'b'
+
+    if compression is None:
+        if binary:
+            return open(path, mode)
+        return open(path, mode, encoding=encoding, newline=newline)
+
+    if compression == 'gzip':
+        stream = gzip.open(path, raw_mode, compresslevel=level or GZIP_LEVEL)
+    elif compression == 'zstd':
+        zstandard = _zstandard()
+        f = open(path, raw_mode)
+        if raw_mode == 'rb':
+            stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(f, closefd=True, read_across_frames=True))
+        else:
+            stream = zstandard.ZstdCompressor(level=level or ZSTD_LEVEL).stream_writer(f, closefd=True)
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+
+    if binary:
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding, newline=newline)
+
+
+def copy_data(source, destination):
+    """
+    Copies a file, converting between compressions when the extensions differ.
+    """
+    if compression_of(source) == compression_of(destination):
+        shutil.copy(source, destination)
+        return
+    with open_data(source, 'rb') as f_in, open_data(destination, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out, CHUNK_SIZE)
+
+
+def load_json(path):
+    with open_data(path, 'r') as f:
+        return json.load(f)
+
+
+def dump_json(data, path, minify=False, compression='auto'):
+    """
+    Writes JSON indented for reading and diffing, or minified (no whitespace at all).
+    """
+    with open_data(path, 'w', compression=compression) as f:
+        if minify:
+            json.dump(data, f, separators=(',', ':'))
+        else:
+            json.dump(data, f, indent=2)
+
+
+def measure(path, data, compression):
+    """
+    Writes data to path with the given compression, then streams it back.
+    Returns (size in bytes, write seconds, read seconds).
+    """
+    start = time.perf_counter()
+    with open_data(path, 'wb', compression=compression) as f:
+        f.write(data)
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open_data(path, 'rb', compression=compression) as f:
+        while f.read(CHUNK_SIZE):
+            pass
+    read_seconds = time.perf_counter() - start
+    return os.path.getsize(path), write_seconds, read_seconds
+
+
+def compare_formats(path, work_dir=None):
+    """
+    Measures the size and the write/read times of the file in every available
+    compression, plus the minified variants for JSON files. The first entry is the
+    plain (and, for JSON, indented) file every ratio is relative to.
+    """
+    import tempfile
+
+    with open_data(path, 'rb') as f:
+        data = f.read()
+    variants = [('', data)]
+    if base_name(path).endswith('.json'):
+        variants.append((' minified', json.dumps(json.loads(data), separators=(',', ':')).encode('utf-8')))
+        variants[0] = ('', json.dumps(json.loads(data), indent=2).encode('utf-8'))
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as temp_dir:
+        for label, content in variants:
+            for compression in available_compressions():
+                target = os.path.join(temp_dir, base_name(path) + SUFFIXES.get(compression, ''))
+                size, write_seconds, read_seconds = measure(target, content, compression)
+                results.append({
+                    'format': (compression or 'plain') + label,
+                    'bytes': size,
+                    'write_seconds': round(write_seconds, 4),
+                    'read_seconds': round(read_seconds, 4),
+                })
+
+    for result in results:
+        result['ratio'] = round(result['bytes'] / results[0]['bytes'], 3) if results[0]['bytes'] else 1.0
+    return results
+
+
+def format_report(path, results):
+    lines = [str(path), f"  {'format':<16} {'bytes':>12} {'ratio':>7} {'write s':>9} {'read s':>9}"]
+    for r in results:
+        lines.append(f"  {r['format']:<16} {r['bytes']:>12} {r['ratio']:>7.3f} {r['write_seconds']:>9.4f} {r['read_seconds']:>9.4f}")
+    return "\n".join(lines)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Compare the size and read/write time of the data files in each compression.")
+    parser.add_argument('files', nargs='+', help="Files to measure (.csv, .json, optionally already .gz/.zst)")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    reports = {path: compare_formats(path) for path in args.files}
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print("\n\n".join(format_report(path, results) for path, results in reports.items()))
+    if 'zstd' not in available_compressions():
+        print("zstd not measured: the zstandard package is not installed.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
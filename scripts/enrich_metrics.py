@@ -0,0 +1,185 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds (upper bounds), from a cached page to a throttled one
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HELP = {
+    'enrich_requests_total': "Metadata requests sent.",
+    'enrich_bytes_total': "Response bytes received.",
+    'enrich_titles_total': "Titles processed, by result.",
+    'enrich_errors_total': "Failed or empty fetches, by category.",
+    'enrich_fetch_seconds': "Time spent downloading a title page.",
+    'enrich_parse_seconds': "Time spent extracting the metadata from a page.",
+    'enrich_write_seconds': "Time spent saving the results.",
+}
+
+
+def classify_error(exc):
+    """
+    Error taxonomy: http_403, http_404, http_429, http_5xx, http_other, timeout, connection or other.
+    Works on the requests exceptions without importing requests.
+    """
+    status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    if isinstance(status, int):
+        if status in (403, 404, 429):
+            return f"http_{status}"
+        return 'http_5xx' if status >= 500 else 'http_other'
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    if names & {'Timeout', 'TimeoutError', 'ReadTimeout', 'ConnectTimeout'}:
+        return 'timeout'
+    if names & {'ConnectionError', 'ConnectionResetError'}:
+        return 'connection'
+    return 'other'
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Estimated by linear interpolation inside the bucket, like Prometheus' histogram_quantile.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - cumulative) / count)
+            cumulative += count
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'max': self.max,
+        }
+
+
+def open_for_write(path):
+    try:
+        return open(path, 'w', encoding='utf-8')
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(path, 'w', encoding='utf-8')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class MetricsRegistry:
+    """
+    Counters (with optional labels) and latency histograms for one enrichment run.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.started_at = time.time()
+        self.start = time.monotonic()
+        self.last_write = self.start
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds):
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(self.buckets)
+        self.histograms[name].observe(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def total(self, name):
+        return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    def by_label(self, name, label):
+        values = {}
+        for (counter, labels), value in self.counters.items():
+            labels = dict(labels)
+            if counter == name and label in labels:
+                values[labels[label]] = values.get(labels[label], 0) + value
+        return dict(sorted(values.items()))
+
+    def to_prometheus(self):
+        lines = []
+        for name in sorted({counter for counter, _ in self.counters}):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for (counter, labels), value in sorted(self.counters.items()):
+                if counter == name:
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+        for name, histogram in sorted(self.histograms.items()):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum {histogram.sum}")
+            lines.append(f"{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        elapsed = time.monotonic() - self.start
+        requests = self.total('enrich_requests_total')
+        return {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'seconds': round(elapsed, 3),
+            'requests': requests,
+            'requests_per_second': requests / elapsed if elapsed else 0.0,
+            'bytes': self.total('enrich_bytes_total'),
+            'titles': self.by_label('enrich_titles_total', 'result'),
+            'errors': self.by_label('enrich_errors_total', 'category'),
+            'latency': {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+        }
+
+    def write_prometheus(self, path):
+        # Scrapers read the file while the shards keep rewriting it: never expose a half-written one
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open_for_write(temp_path) as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+        self.last_write = time.monotonic()
+
+    def maybe_write_prometheus(self, path, interval):
+        if time.monotonic() - self.last_write >= interval:
+            self.write_prometheus(path)
+
+    def write_summary(self, path):
+        with open_for_write(path) as f:
+            json.dump(self.summary(), f, indent=2)
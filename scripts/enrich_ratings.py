@@ -1,10 +1,20 @@
+import argparse
 import csv
+import datetime
+import glob
+import hashlib
+import json
 import time
 import random
-import requests
 import os
 import shutil
-from bs4 import BeautifulSoup
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data_io
+import enrich_metrics
+import posters
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -13,6 +23,13 @@ RATINGS_FILE = os.path.join(DATA_DIR, 'ratings-plus.csv')
 SOURCE_FILE = os.path.join(DATA_DIR, 'ratings.csv')
 TEMP_FILE = RATINGS_FILE + '.tmp'
 
+# Prometheus text file, rewritten every METRICS_INTERVAL seconds, and JSON summary written at exit
+METRICS_FILE = os.path.join(BASE_DIR, '.cache', 'enrich', 'metrics.prom')
+SUMMARY_FILE = os.path.join(BASE_DIR, '.cache', 'enrich', 'summary.json')
+METRICS_INTERVAL = 15  # seconds
+
+METRICS = enrich_metrics.MetricsRegistry()
+
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36',
     'Accept-Language': 'en-US,en;q=0.9'
@@ -70,122 +87,649 @@ def get_countries(soup):
          
     return ", ".join(countries)
 
+def get_poster_url(soup):
+    """
+    The poster is the page's preview image.
+    """
+    meta = soup.find('meta', property='og:image')
+    return meta.get('content', '') if meta else ''
+
+def get_headshots(soup):
+    """
+    Actor name -> headshot URL, from the cast list.
+    """
+    headshots = {}
+    for item in soup.select('div[data-testid="title-cast-item"]'):
+        name = item.select_one('a[data-testid="title-cast-item__actor"]')
+        image = item.select_one('img')
+        if name and image and image.get('src'):
+            headshots[name.text.strip()] = image['src']
+    return headshots
+
 def get_metadata(url):
     """
     Fetches the IMDb page and extracts metadata (actors, countries).
     """
+    # Imported here so that loading this module (e.g. from the CLI) stays cheap
+    import requests
+    from bs4 import BeautifulSoup
+
     print(f"Fetching {url}...")
+    METRICS.inc('enrich_requests_total')
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+        with METRICS.timer('enrich_fetch_seconds'):
+            response = requests.get(url, headers=HEADERS, timeout=10)
+            response.raise_for_status()
+        METRICS.inc('enrich_bytes_total', len(response.content))
         
-        # Actors
-        actors = get_main_actors(soup)
-             
-        # Countries
-        countries = get_countries(soup)
-             
+        with METRICS.timer('enrich_parse_seconds'):
+            soup = BeautifulSoup(response.content, 'html.parser')
+            
+            # Actors
+            actors = get_main_actors(soup)
+                 
+            # Countries
+            countries = get_countries(soup)
+
+            # Images for the slides (see posters.py)
+            poster = get_poster_url(soup)
+            headshots = get_headshots(soup)
+
+        # A page without actors or countries (layout change) is a failure of apply_metadata
         return {
             "Main Actors": actors,
-            "Countries": countries
+            "Countries": countries,
+            "Poster": poster,
+            "Headshots": headshots
         }
         
     except Exception as e:
+        METRICS.inc('enrich_errors_total', category=enrich_metrics.classify_error(e))
         print(f"Error fetching {url}: {e}")
         return None
 
-def main():
+class MetadataSource:
+    """
+    Where the actors and countries come from. fetch_many() gets up to batch_size rows
+    and returns {title_key(row): metadata or None}, metadata being a dict like the one
+    returned by get_metadata(). Each call counts as one request in the budget.
+    """
+    batch_size = 1
+
+    def fetch_many(self, rows):
+        raise NotImplementedError
+
+class HtmlSource(MetadataSource):
+    """
+    Scrapes one IMDb title page per title.
+    """
+    def fetch_many(self, rows):
+        return {title_key(row): get_metadata(row['URL']) for row in rows}
+
+def metadata_from_json(title):
+    """
+    {"actors": [...], "countries": [...], "poster": "...", "headshots": {...}} -> get_metadata() format
+    """
+    return {
+        "Main Actors": ", ".join(title.get('actors') or []),
+        "Countries": ", ".join(title.get('countries') or []),
+        "Poster": title.get('poster') or '',
+        "Headshots": title.get('headshots') or {},
+    }
+
+class BulkJsonSource(MetadataSource):
+    """
+    Asks a bulk JSON endpoint (a GraphQL gateway or a self-hosted mirror) for many titles at once:
+    POST {"ids": ["tt...", ...]} answered with {"titles": {"tt...": {"actors": [...], "countries": [...],
+    "poster": "...", "headshots": {...}}}}. Titles missing from the answer count as failures.
+    """
+    def __init__(self, url, batch_size=50, timeout=30):
+        self.url = url
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+    def fetch_many(self, rows):
+        import requests
+
+        ids = [title_key(row) for row in rows]
+        print(f"Fetching {len(ids)} titles from {self.url}...")
+        METRICS.inc('enrich_requests_total')
+        try:
+            with METRICS.timer('enrich_fetch_seconds'):
+                response = requests.post(self.url, json={'ids': ids}, headers=HEADERS, timeout=self.timeout)
+                response.raise_for_status()
+            METRICS.inc('enrich_bytes_total', len(response.content))
+            with METRICS.timer('enrich_parse_seconds'):
+                titles = response.json().get('titles', {})
+        except Exception as e:
+            METRICS.inc('enrich_errors_total', len(ids), category=enrich_metrics.classify_error(e))
+            print(f"Error fetching {len(ids)} titles from {self.url}: {e}")
+            return {}
+
+        results = {}
+        for const in ids:
+            if const in titles:
+                results[const] = metadata_from_json(titles[const])
+            else:
+                METRICS.inc('enrich_errors_total', category='not_found')
+        return results
+
+class LocalJsonSource(MetadataSource):
+    """
+    Stand-in for tests and offline runs: a JSON file in the bulk endpoint's answer format.
+    """
+    def __init__(self, path, batch_size=50):
+        self.path = path
+        self.batch_size = batch_size
+        self.titles = None
+
+    def fetch_many(self, rows):
+        if self.titles is None:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.titles = json.load(f).get('titles', {})
+        METRICS.inc('enrich_requests_total')
+        results = {}
+        for row in rows:
+            title = self.titles.get(title_key(row))
+            if title is None:
+                METRICS.inc('enrich_errors_total', category='not_found')
+            results[title_key(row)] = metadata_from_json(title) if title is not None else None
+        return results
+
+SOURCES = ['html', 'bulk', 'local']
+
+def make_source(name, url=None, path=None, batch_size=None):
+    if name == 'html':
+        return HtmlSource()
+    if name == 'bulk':
+        if not url:
+            raise ValueError("The bulk source needs --source-url")
+        return BulkJsonSource(url, batch_size or 50)
+    if name == 'local':
+        if not path:
+            raise ValueError("The local source needs --source-file")
+        return LocalJsonSource(path, batch_size or 50)
+    raise ValueError(f"Unknown metadata source: {name}")
+
+def batches(indexes, size):
+    for start in range(0, len(indexes), size):
+        yield indexes[start:start + size]
+
+# Persistent failure counts: titles that keep failing are tried after all the others
+FAILURES_FILE = os.path.join(DATA_DIR, 'enrich-failures.json')
+
+def missing_both(row):
+    return 0 if not row.get('Main Actors') and not row.get('Countries') else 1
+
+def most_recent(row):
+    try:
+        return (0, -datetime.date.fromisoformat(row.get('Date Rated') or '').toordinal())
+    except ValueError:
+        return (1, 0)
+
+def most_popular(row):
+    try:
+        return (0, -int(row.get('Num Votes') or ''))
+    except ValueError:
+        return (1, 0)
+
+# Policy name -> sort key (lower comes first). Ties keep the file order.
+PRIORITY_POLICIES = {
+    'missing': missing_both,
+    'recent': most_recent,
+    'popular': most_popular,
+}
+DEFAULT_PRIORITY = 'missing,recent,popular'
+
+def title_key(row):
+    return row.get('Const') or row.get('URL')
+
+def needs_enrichment(row):
+    # We want to fetch if EITHER is missing, but efficient to do one request
+    return bool((not row.get('Main Actors') or not row.get('Countries')) and row.get('URL'))
+
+def schedule(rows, policies, failures):
+    """
+    Returns the indexes of the rows to enrich, in the order they should be fetched:
+    fewest past failures first, then by each policy in turn.
+    """
+    def sort_key(index):
+        row = rows[index]
+        return (failures.get(title_key(row), 0),) + tuple(PRIORITY_POLICIES[p](row) for p in policies)
+    return sorted((i for i, row in enumerate(rows) if needs_enrichment(row)), key=sort_key)
+
+def parse_priority(value):
+    policies = [p.strip() for p in value.split(',') if p.strip()]
+    unknown = [p for p in policies if p not in PRIORITY_POLICIES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown policy {', '.join(unknown)} (choose from {', '.join(PRIORITY_POLICIES)})")
+    return policies
+
+def load_failures(path=None):
+    try:
+        with open(path or FAILURES_FILE, 'r', encoding='utf-8') as f:
+            failures = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return failures if isinstance(failures, dict) else {}
+
+def save_failures(failures, path=None):
+    with open(path or FAILURES_FILE, 'w', encoding='utf-8') as f:
+        json.dump(failures, f, indent=2, sort_keys=True)
+
+class Budget:
+    """
+    Stops the run after max_time seconds or max_requests fetches, whichever comes first.
+    """
+    def __init__(self, max_time=None, max_requests=None):
+        self.max_time = max_time
+        self.max_requests = max_requests
+        self.requests = 0
+        self.start = time.monotonic()
+
+    def exhausted(self):
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            return True
+        return self.max_time is not None and time.monotonic() - self.start >= self.max_time
+
+    def spend(self):
+        self.requests += 1
+
+def enrich_batch(rows, failures, images=None, source=None):
+    """
+    Fetches the missing fields of the rows (dicts) with one call to the source (default:
+    the HTML scraper). Returns, for each row, the metadata if the row was updated and
+    None otherwise. The poster and headshot URLs found are added to images (see posters.py).
+    """
+    results = (source or HtmlSource()).fetch_many(rows)
+    return [apply_metadata(row, results.get(title_key(row)), failures, images) for row in rows]
+
+def enrich_row(row, failures, images=None, source=None):
+    return enrich_batch([row], failures, images, source)[0]
+
+def has_fields(fields):
+    """
+    True if the row or metadata has actors or countries.
+    """
+    return bool(fields.get('Main Actors') or fields.get('Countries'))
+
+def apply_metadata(row, metadata, failures, images=None):
+    if metadata and not has_fields(metadata):
+        # The page was fetched but the layout didn't match: the title is still missing
+        # both fields, so it counts as a failure and is retried like one
+        METRICS.inc('enrich_errors_total', category='parse_miss')
+        metadata = None
+    if not metadata:
+        print(f"Could not find metadata for {row['URL']}")
+        key = title_key(row)
+        failures[key] = failures.get(key, 0) + 1
+        METRICS.inc('enrich_titles_total', result='failed')
+        return None
+
+    failures.pop(title_key(row), None)
+    METRICS.inc('enrich_titles_total', result='enriched')
+    if images is not None:
+        posters.record_images(images, title_key(row), metadata)
+    if not row.get('Main Actors'):
+        row['Main Actors'] = metadata["Main Actors"]
+        print(f"Found actors: {metadata['Main Actors']}")
+    if not row.get('Countries'):
+        row['Countries'] = metadata["Countries"]
+        print(f"Found countries: {metadata['Countries']}")
+    return metadata
+
+def polite_delay(min_delay=2, max_delay=5):
+    sleep_time = random.uniform(min_delay, max_delay)
+    print(f"Sleeping for {sleep_time:.2f}s...")
+    time.sleep(sleep_time)
+
+def write_metrics(metrics_file, summary_file):
+    METRICS.write_prometheus(metrics_file)
+    METRICS.write_summary(summary_file)
+    summary = METRICS.summary()
+    fetch = summary['latency'].get('enrich_fetch_seconds', {})
+    print(f"{summary['requests']} requests in {summary['seconds']:.0f}s ({summary['requests_per_second']:.2f}/s), "
+          f"fetch p90 {fetch.get('p90', 0):.2f}s, errors: {summary['errors'] or 'none'}. Metrics saved to {summary_file}")
+
+# Sharding: each machine enriches the titles of its shard and appends the results
+# to its own file, then merge_shards() applies every shard file to ratings-plus.csv
+SHARDS_DIR = os.path.join(DATA_DIR, 'shards')
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected i/N, e.g. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"the shard index must be between 0 and N-1, got {value}")
+    return index, count
+
+def shard_of(const, count):
+    """
+    Stable across machines and Python versions, unlike hash().
+    """
+    return int(hashlib.sha256(const.encode('utf-8')).hexdigest()[:8], 16) % count
+
+def shard_file(shard, shards_dir=SHARDS_DIR, kind='enrich', ext='jsonl'):
+    index, count = shard
+    return os.path.join(shards_dir, f"{kind}-{index}-of-{count}.{ext}")
+
+def read_shard_records(path):
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Last line of an interrupted run
+                continue
+    return records
+
+def enrich_shard(ratings_file, shard, shards_dir, policies, budget, delay, metrics_file=METRICS_FILE, source=None):
+    """
+    Enriches the titles of one shard. ratings_file is only read: every result is appended
+    to the shard file with a timestamp, so a stopped run resumes where it left off.
+    """
+    index, count = shard
+    with data_io.open_data(ratings_file, 'r') as f:
+        rows = [row for row in csv.DictReader(f) if shard_of(title_key(row) or '', count) == index]
+
+    os.makedirs(shards_dir, exist_ok=True)
+    output_path = shard_file(shard, shards_dir)
+    failures_path = shard_file(shard, shards_dir, kind='failures', ext='json')
+    failures = load_failures(failures_path)
+    done = {record['Const'] for record in read_shard_records(output_path)} if os.path.exists(output_path) else set()
+    processed_count = 0
+    try:
+        source = source or HtmlSource()
+        queue = [i for i in schedule(rows, policies, failures) if title_key(rows[i]) not in done]
+        with open(output_path, 'a', encoding='utf-8') as out:
+            for batch in batches(queue, source.batch_size):
+                if budget.exhausted():
+                    print("Budget exhausted, stopping.")
+                    break
+                budget.spend()
+                METRICS.maybe_write_prometheus(metrics_file, METRICS_INTERVAL)
+                results = enrich_batch([rows[i] for i in batch], failures, source=source)
+                fetched_at = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='microseconds')
+                with METRICS.timer('enrich_write_seconds'):
+                    for i, metadata in zip(batch, results):
+                        # A record marks the title done for good: never write one without the fields
+                        if not metadata or not has_fields(rows[i]):
+                            continue
+                        record = {
+                            'Const': title_key(rows[i]),
+                            'Main Actors': rows[i]['Main Actors'],
+                            'Countries': rows[i]['Countries'],
+                            'Poster': metadata.get('Poster', ''),
+                            'Headshots': metadata.get('Headshots', {}),
+                            'fetched_at': fetched_at,
+                        }
+                        out.write(json.dumps(record, sort_keys=True) + "\n")
+                        processed_count += 1
+                    out.flush()
+                if any(results):
+                    polite_delay(*delay)
+    except KeyboardInterrupt:
+        print("Stopping early...")
+    finally:
+        save_failures(failures, failures_path)
+        print(f"Done. {processed_count} movies of shard {index}/{count} saved to {output_path}.")
+
+def load_shard_results(paths):
+    """
+    Const -> most recent record across the shard files. Records with the same timestamp
+    are ordered by content, so the result never depends on the order of the files.
+    """
+    latest = {}
+    for path in paths:
+        for record in read_shard_records(path):
+            key = (record.get('fetched_at', ''), json.dumps(record, sort_keys=True))
+            if record.get('Const') and (record['Const'] not in latest or key > latest[record['Const']][0]):
+                latest[record['Const']] = (key, record)
+    return {const: record for const, (key, record) in sorted(latest.items(), key=lambda item: item[1][0])}
+
+def merge_shards(paths, ratings_file=None):
+    """
+    Applies the shard results to ratings_file (default: data/ratings-plus.csv) and
+    their image URLs to data/posters.json. Returns the number of updated rows.
+    """
+    ratings_file = ratings_file or RATINGS_FILE
+    results = load_shard_results(paths)
+
+    with data_io.open_data(ratings_file, 'r') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    for column in ("Main Actors", "Countries"):
+        if column not in header:
+            header.append(column)
+    for row in rows:
+        while len(row) < len(header):
+            row.append("")
+
+    const_index = header.index("Const")
+    merged_count = 0
+    for row in rows:
+        record = results.get(row[const_index])
+        if not record:
+            continue
+        for column in ("Main Actors", "Countries"):
+            if record.get(column):
+                row[header.index(column)] = record[column]
+        merged_count += 1
+
+    temp_file = ratings_file + '.tmp'
+    with data_io.open_data(temp_file, 'w', newline='', compression=data_io.compression_of(ratings_file)) as f_out:
+        writer = csv.writer(f_out)
+        writer.writerows([header] + rows)
+    shutil.move(temp_file, ratings_file)
+
+    images = posters.load_index()
+    for const, record in results.items():
+        posters.record_images(images, const, record)
+    posters.save_index(images)
+    return merged_count
+
+def enrich_db(db_path, policies, budget, metrics_file=METRICS_FILE, delay=(2, 5), source=None):
+    """
+    Same as the CSV flow, on the SQLite store (see ratings_db.py): every enriched movie
+    is saved with its own UPSERT, so no file is rewritten and stopping loses nothing.
+    """
+    import ratings_db
+
+    conn = ratings_db.connect(db_path)
+    failures = load_failures()
+    images = posters.load_index()
+    processed_count = 0
+    try:
+        missing = "(m.main_actors IS NULL OR m.countries IS NULL) AND m.url IS NOT NULL"
+        rows = list(ratings_db.select_rows(conn, missing))
+        source = source or HtmlSource()
+        for batch in batches(schedule(rows, policies, failures), source.batch_size):
+            if budget.exhausted():
+                print("Budget exhausted, stopping.")
+                break
+            budget.spend()
+            updated = [rows[i] for i, metadata in zip(batch, enrich_batch([rows[i] for i in batch], failures, images, source))
+                       if metadata]
+            if updated:
+                with METRICS.timer('enrich_write_seconds'):
+                    with conn:
+                        ratings_db.upsert_rows(conn, updated)
+                processed_count += len(updated)
+                polite_delay(*delay)
+            METRICS.maybe_write_prometheus(metrics_file, METRICS_INTERVAL)
+    except KeyboardInterrupt:
+        print("Stopping early...")
+    finally:
+        conn.close()
+        save_failures(failures)
+        posters.save_index(images)
+        print(f"Done. {processed_count} movies updated in {db_path}.")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Enrich the ratings with main actors and countries.")
+    parser.add_argument('--db', help="Enrich the movies in this SQLite database (see ratings_db.py) instead of the CSV")
+    parser.add_argument('--priority', type=parse_priority, default=parse_priority(DEFAULT_PRIORITY),
+                        help=f"Comma separated policies deciding which titles go first, among {', '.join(PRIORITY_POLICIES)} "
+                             f"(default: {DEFAULT_PRIORITY})")
+    parser.add_argument('--max-time', type=float, default=None, help="Stop after this many seconds")
+    parser.add_argument('--max-requests', type=int, default=None, help="Stop after this many fetches")
+    parser.add_argument('--metrics-file', default=METRICS_FILE, help="Prometheus text file, updated during the run")
+    parser.add_argument('--summary-file', default=SUMMARY_FILE, help="JSON summary of the run, written at exit")
+    parser.add_argument('--min-delay', type=float, default=2, help="Shortest pause between two fetches, in seconds")
+    parser.add_argument('--max-delay', type=float, default=5, help="Longest pause between two fetches, in seconds")
+    parser.add_argument('--shard', type=parse_shard, default=None,
+                        help="Only enrich shard i of N (0 <= i < N) and save the results in the shards folder")
+    parser.add_argument('--merge', nargs='*', metavar='SHARD_FILE', default=None,
+                        help="Merge shard files (default: all of them in the shards folder) into the ratings file")
+    parser.add_argument('--shards-dir', default=SHARDS_DIR, help="Folder of the shard files (default: data/shards)")
+    parser.add_argument('--ratings-file', default=None, help="Ratings file to enrich, optionally .gz or .zst (default: data/ratings-plus.csv)")
+    parser.add_argument('--source', choices=SOURCES, default='html',
+                        help="html: scrape one IMDb page per title; bulk: ask --source-url for many titles per request; "
+                             "local: read them from --source-file")
+    parser.add_argument('--source-url', help="Bulk JSON endpoint")
+    parser.add_argument('--source-file', help="JSON file in the bulk endpoint's format")
+    parser.add_argument('--batch-size', type=int, default=None, help="Titles per request for the bulk and local sources")
+    parser.add_argument('--live-stats', metavar='STATS_FILE',
+                        help="Keep this stats file up to date during the run (e.g. stats.json), see live_stats.py")
+    parser.add_argument('--live-interval', type=float, default=None,
+                        help="Seconds between two partial stats snapshots (default: 30)")
+    args = parser.parse_args(argv)
+    if args.db and (args.shard or args.merge is not None):
+        parser.error("--shard and --merge work on the CSV file, not with --db")
+    if args.live_stats and (args.db or args.shard or args.merge is not None):
+        parser.error("--live-stats only works with the CSV file, without --shard or --merge")
+    try:
+        source = make_source(args.source, args.source_url, args.source_file, args.batch_size)
+    except ValueError as e:
+        parser.error(str(e))
+    budget = Budget(args.max_time, args.max_requests)
+    delay = (args.min_delay, args.max_delay)
+
+    if args.merge is not None:
+        paths = args.merge or sorted(glob.glob(os.path.join(args.shards_dir, 'enrich-*-of-*.jsonl')))
+        merged_count = merge_shards(paths, args.ratings_file)
+        print(f"Merged {len(paths)} shard files: {merged_count} movies updated.")
+        return
+
+    # Fresh counters for every run
+    global METRICS
+    METRICS = enrich_metrics.MetricsRegistry()
+
+    if args.shard:
+        # One metrics file per shard, so shards running on the same machine don't overwrite each other
+        suffix = f"-{args.shard[0]}-of-{args.shard[1]}"
+        metrics_file = args.metrics_file.replace('.prom', suffix + '.prom')
+        summary_file = args.summary_file.replace('.json', suffix + '.json')
+        try:
+            enrich_shard(args.ratings_file or RATINGS_FILE, args.shard, args.shards_dir, args.priority,
+                         budget, delay, metrics_file, source)
+        finally:
+            write_metrics(metrics_file, summary_file)
+        return
 
-    if not os.path.exists(RATINGS_FILE):
+    if args.db:
+        try:
+            enrich_db(args.db, args.priority, budget, args.metrics_file, delay, source)
+        finally:
+            write_metrics(args.metrics_file, args.summary_file)
+        return
+
+    # A ratings file ending in .gz or .zst is read and rewritten compressed
+    ratings_file = args.ratings_file or RATINGS_FILE
+    temp_file = TEMP_FILE if ratings_file == RATINGS_FILE else ratings_file + '.tmp'
+    compression = data_io.compression_of(ratings_file)
+
+    if not os.path.exists(ratings_file):
         if os.path.exists(SOURCE_FILE):
-            print(f"{RATINGS_FILE} not found. Copying from {SOURCE_FILE}...")
-            shutil.copy(SOURCE_FILE, RATINGS_FILE)
+            print(f"{ratings_file} not found. Copying from {SOURCE_FILE}...")
+            data_io.copy_data(SOURCE_FILE, ratings_file)
         else:
-            print(f"File not found: {RATINGS_FILE} and source {SOURCE_FILE} is missing too.")
+            print(f"File not found: {ratings_file} and source {SOURCE_FILE} is missing too.")
             return
 
     # Check headers to see if we need to add the new column
-    with open(RATINGS_FILE, 'r', encoding='utf-8') as f:
+    with data_io.open_data(ratings_file, 'r') as f:
         reader = csv.reader(f)
         header = next(reader)
         rows = list(reader)
 
-    headers_changed = False
     if "Main Actors" not in header:
         print("Adding 'Main Actors' column...")
         header.append("Main Actors")
-        headers_changed = True
         
     if "Countries" not in header:
         print("Adding 'Countries' column...")
         header.append("Countries")
-        headers_changed = True
 
-    if headers_changed:
-        # Add empty value to all existing rows for newly added columns
-        # We need to be careful to match the index
-        for row in rows:
-            while len(row) < len(header):
-                row.append("")
-    
-    actor_col_index = header.index("Main Actors")
-    country_col_index = header.index("Countries")
-    url_col_index = header.index("URL")
-    
+    # Add empty values for newly added columns (and short rows)
+    for row in rows:
+        while len(row) < len(header):
+            row.append("")
+
+    records = [dict(zip(header, row)) for row in rows]
+    failures = load_failures()
+    images = posters.load_index()
     processed_count = 0
-    updated_rows = []
+
+    live = None
+    if args.live_stats:
+        import live_stats
+        live = live_stats.LiveStats(args.live_stats, args.live_interval or live_stats.SNAPSHOT_INTERVAL).start()
+        # The rows already enriched count right away, the others are updated as they are fetched
+        live.submit(records)
     
     try:
-        updated_rows.append(header)
-        for row in rows:
-            # Ensure row has enough columns
-            while len(row) < len(header):
-                row.append("")
-                
-            current_actors = row[actor_col_index]
-            current_countries = row[country_col_index]
-            url = row[url_col_index]
-            
-            # We want to fetch if EITHER is missing, but efficient to do one request
-            if (not current_actors or not current_countries) and url:
-                metadata = get_metadata(url)
+        queue = schedule(records, args.priority, failures)
+        METRICS.inc('enrich_titles_total', len(records) - len(queue), result='skipped')
+        saved_count = 0
+        for batch in batches(queue, source.batch_size):
+            if budget.exhausted():
+                print("Budget exhausted, stopping.")
+                break
+            budget.spend()
+            METRICS.maybe_write_prometheus(args.metrics_file, METRICS_INTERVAL)
+            results = enrich_batch([records[i] for i in batch], failures, images, source)
+            for index, metadata in zip(batch, results):
                 if metadata:
-                    if not current_actors:
-                         row[actor_col_index] = metadata["Main Actors"]
-                         print(f"Found actors: {metadata['Main Actors']}")
-                    if not current_countries:
-                         row[country_col_index] = metadata["Countries"]
-                         print(f"Found countries: {metadata['Countries']}")
-                    
+                    rows[index] = [records[index][column] for column in header]
                     processed_count += 1
-                    # Polite delay
-                    sleep_time = random.uniform(2, 5)
-                    print(f"Sleeping for {sleep_time:.2f}s...")
-                    time.sleep(sleep_time)
-                else:
-                    print(f"Could not find metadata for {url}")
-            
-            # updated_rows.append(row) # No longer needed
-            
+            if not any(results):
+                continue
+            if live:
+                live.submit([records[index] for index, metadata in zip(batch, results) if metadata])
+            polite_delay(*delay)
+
             # Save progress every 5 updates to avoid losing too much if stopped
-            if processed_count > 0 and processed_count % 5 == 0:
+            if processed_count - saved_count >= 5:
+                 saved_count = processed_count
                  print("Saving progress...")
-                 with open(TEMP_FILE, 'w', encoding='utf-8', newline='') as f_out:
-                    writer = csv.writer(f_out)
-                    writer.writerows([header] + rows) 
-                 shutil.copy(TEMP_FILE, RATINGS_FILE)
+                 with METRICS.timer('enrich_write_seconds'):
+                     with data_io.open_data(temp_file, 'w', newline='', compression=compression) as f_out:
+                        writer = csv.writer(f_out)
+                        writer.writerows([header] + rows) 
+                     shutil.copy(temp_file, ratings_file)
+                 save_failures(failures)
+                 posters.save_index(images)
 
     except KeyboardInterrupt:
         print("Stopping early...")
     finally:
         # Final save
         print("Saving final changes...")
-        with open(TEMP_FILE, 'w', encoding='utf-8', newline='') as f_out:
-            writer = csv.writer(f_out)
-            writer.writerows([header] + rows)
-        shutil.move(TEMP_FILE, RATINGS_FILE)
+        with METRICS.timer('enrich_write_seconds'):
+            with data_io.open_data(temp_file, 'w', newline='', compression=compression) as f_out:
+                writer = csv.writer(f_out)
+                writer.writerows([header] + rows)
+            shutil.move(temp_file, ratings_file)
+        save_failures(failures)
+        posters.save_index(images)
+        write_metrics(args.metrics_file, args.summary_file)
+        if live:
+            live.close()
+            print(f"Stats written to {args.live_stats} ({live.snapshots} snapshots).")
         print("Done.")
 
 if __name__ == "__main__":
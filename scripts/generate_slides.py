@@ -1,15 +1,215 @@
+import argparse
+import asyncio
+import atexit
+import contextlib
+import hashlib
 import json
 import os
-from jinja2 import Environment, FileSystemLoader
-from playwright.sync_api import sync_playwright
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data_io
+import posters
+import svg_charts
+import vendor_assets
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Compiled templates are kept here across runs
+JINJA_CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'jinja')
+# Fingerprints of the last render, stored next to the outputs
+FINGERPRINT_FILE = '.render-fingerprint.json'
+
+# One Jinja2 environment per template directory, shared by every render in this process
+_environments = {}
+
+def get_environment(template_dir):
+    template_dir = os.path.abspath(template_dir)
+    if template_dir not in _environments:
+        os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+        _environments[template_dir] = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR),
+        )
+    return _environments[template_dir]
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def render_fingerprint(*parts):
+    """
+    Hash of the stats content, the template content and the render options.
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+def load_fingerprints(output_path):
+    path = os.path.join(os.path.dirname(os.path.abspath(output_path)), FINGERPRINT_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(os.path.basename(output_path), {})
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+# Serialises the fingerprint updates of this process; fingerprint_lock adds a file lock for the others
+_fingerprint_lock = threading.Lock()
+
+@contextlib.contextmanager
+def fingerprint_lock(path):
+    with _fingerprint_lock, open(f"{path}.lock", 'a') as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            # No advisory locks on Windows: only renders from this process are serialised
+            fcntl = None
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def save_fingerprints(output_path, fingerprints):
+    """
+    Sets the given keys ('html', 'pdf', 'png') of this output's entry in the fingerprint
+    file, keeping the others. Other renders may share the folder (the HTML and PDF of
+    the same deck, batch decks): the file is re-read and updated under a lock, and
+    replaced in one rename, so it is never half-written.
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(output_path)), FINGERPRINT_FILE)
+    with fingerprint_lock(path):
+        data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                data = {}
+        data.setdefault(os.path.basename(output_path), {}).update(fingerprints)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
+
+# Long-lived browser, reused by every PDF render in this process
+_playwright = None
+_browser = None
+_context = None
+
+def get_browser_context():
+    global _playwright, _browser, _context
+    if _context is None:
+        # Playwright is only imported when a browser is actually needed
+        from playwright.sync_api import sync_playwright
+        _playwright = sync_playwright().start()
+        _browser = _playwright.chromium.launch()
+        # 1920x1080 to match our print styles
+        _context = _browser.new_context(viewport={'width': 1920, 'height': 1080})
+        atexit.register(close_browser)
+    return _context
+
+def close_browser():
+    global _playwright, _browser, _context
+    if _browser is not None:
+        _browser.close()
+        _playwright.stop()
+    _playwright = _browser = _context = None
+
+def render_pdf(html_path, pdf_path, timeout=30000):
+    """
+    Prints the HTML file to PDF. The page is opened in print mode, where the template
+    disables chart animations and sets window.__slidesReady once every chart is drawn.
+    """
+    page = get_browser_context().new_page()
+    try:
+        file_url = f"file://{os.path.abspath(html_path)}?print"
+        page.goto(file_url, wait_until="load")
+        page.wait_for_function("window.__slidesReady === true", timeout=timeout)
+        page.pdf(path=pdf_path, width="1920px", height="1080px", print_background=True)
+    finally:
+        page.close()
+
+def render_pdf_weasyprint(html_path, pdf_path):
+    """
+    Prints the HTML file to PDF without a browser. WeasyPrint doesn't run JavaScript,
+    so the slides must be rendered with static (SVG) charts.
+    """
+    # Imported here: WeasyPrint needs the Pango system libraries, and only this engine uses it
+    from weasyprint import HTML
+    HTML(filename=html_path).write_pdf(pdf_path)
+
+async def _screenshot_slides(file_url, output_dir, pool_size, timeout):
+    from playwright.async_api import async_playwright
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        context = await browser.new_context(viewport={'width': 1920, 'height': 1080})
+
+        async def open_page():
+            page = await context.new_page()
+            # Print styles give every slide a fixed 1920x1080 box
+            await page.emulate_media(media='print')
+            await page.goto(file_url, wait_until="load")
+            await page.wait_for_function("window.__slidesReady === true", timeout=timeout)
+            return page
+
+        first_page = await open_page()
+        slide_count = await first_page.locator('.slide').count()
+        extra_pages = await asyncio.gather(*(open_page() for _ in range(min(pool_size, slide_count) - 1)))
+
+        queue = asyncio.Queue()
+        for index in range(slide_count):
+            queue.put_nowait(index)
+        paths = []
+
+        async def worker(page):
+            while not queue.empty():
+                index = queue.get_nowait()
+                path = os.path.join(output_dir, f"slide-{index + 1:02d}.png")
+                await page.locator('.slide').nth(index).screenshot(path=path)
+                paths.append(path)
+
+        await asyncio.gather(*(worker(page) for page in [first_page, *extra_pages]))
+        await browser.close()
+    return sorted(paths)
+
+def make_thumbnail(path, width):
+    from PIL import Image
+    thumbnail_path = path.replace('.png', '.thumb.png')
+    with Image.open(path) as image:
+        image.thumbnail((width, width * image.height // image.width), Image.LANCZOS)
+        image.save(thumbnail_path, optimize=True)
+    return thumbnail_path
+
+def export_slide_images(html_path, output_dir, pool_size=4, thumbnail_width=480, timeout=30000):
+    """
+    Saves every slide as a 1920x1080 PNG plus a downscaled thumbnail in output_dir.
+    Slides are shared between pool_size pages of one browser context, so the
+    wall-clock time depends on the pool size rather than on the number of slides.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    file_url = f"file://{os.path.abspath(html_path)}?print"
+
+    # The async API runs in its own thread, so it doesn't clash with the sync browser used for the PDF
+    with ThreadPoolExecutor(max_workers=pool_size) as executor:
+        paths = executor.submit(asyncio.run, _screenshot_slides(file_url, output_dir, pool_size, timeout)).result()
+        thumbnails = list(executor.map(make_thumbnail, paths, [thumbnail_width] * len(paths)))
+    return paths, thumbnails
 
 def load_stats(stats_path):
-    with open(stats_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    # stats.json, or a compressed stats.json.gz / stats.json.zst
+    return data_io.load_json(stats_path)
 
-def generate_slides(stats_path, template_dir, template_file, output_path, generate_pdf=True):
-    stats = load_stats(stats_path)
-    
+def build_context(stats, static_charts=False, images=None):
+    """
+    Template variables for the stats. Also used by stats_server.py, which renders the
+    slides from the stats it keeps in memory.
+    """
     # Prepare data for template
     total_days_watched = stats.get('total_days_watched', 0)
     avg_runtime_minutes = stats.get('avg_runtime_minutes', 0)
@@ -46,47 +246,164 @@ def generate_slides(stats_path, template_dir, template_file, output_path, genera
         'global_avg_rating': stats.get('global_avg_rating', 0),
         'global_avg_rating': stats.get('global_avg_rating', 0),
         'decades_data': stats.get('decades_data', []),
-        'votes_data': stats.get('votes_data', [])
+        'votes_data': stats.get('votes_data', []),
+        'popularity_tiers': stats.get('popularity', {}).get('tiers', []),
+        'popularity_median_votes': stats.get('popularity', {}).get('median_votes', 0),
+        'static_charts': static_charts,
+        'images': images or {}
     }
+
+    if static_charts:
+        context['decades_chart_svg'] = svg_charts.decades_chart_svg(context['decades_data'])
+        context['votes_chart_svg'] = svg_charts.votes_chart_svg(context['votes_data'])
+
+    return context
+
+def output_fingerprints(stats_path, template_dir, template_file, bundle=None, static_charts=False, pdf_engine='chromium',
+                        thumbnails=False):
+    """
+    (html, pdf, png) fingerprints of a render with these inputs and options, as
+    recorded by generate_slides (pdf_engine 'weasyprint' implies static_charts).
+    """
+    options = {'bundle': bundle, 'static_charts': static_charts or pdf_engine == 'weasyprint'}
+    if thumbnails:
+        # Digests of the posters index and the image cache; the images themselves
+        # are only resolved once a render is needed
+        options['images'] = posters.inputs_fingerprint()
+    html = render_fingerprint(
+        file_digest(stats_path),
+        file_digest(os.path.join(template_dir, template_file)),
+        options,
+    )
+    return html, render_fingerprint(html, {'pdf_engine': pdf_engine}), render_fingerprint(html, 'png')
+
+def generate_slides(stats_path, template_dir, template_file, output_path, generate_pdf=True, generate_html=True,
+                    bundle=None, static_charts=False, pdf_engine='chromium', force=False, export_png=False, png_pool_size=4,
+                    thumbnails=False):
+    """
+    bundle: None to load assets from CDNs, 'inline' to embed them in the HTML,
+    or 'hashed' to publish them next to the HTML with content-hashed names.
+    static_charts: draw the charts as inline SVG instead of Chart.js, so the slides need no JavaScript.
+    pdf_engine: 'chromium' (Playwright) or 'weasyprint', which implies static_charts.
+    export_png: also save each slide as PNG with a thumbnail, in a 'png' folder next to the output.
+    thumbnails: show posters and headshots next to the favorites, embedded in the HTML (see posters.py).
+    Outputs are only rewritten when the stats, the template or the options changed, unless force is set.
+    """
+    if pdf_engine not in ('chromium', 'weasyprint'):
+        raise ValueError(f"Unknown PDF engine: {pdf_engine}")
+    if pdf_engine == 'weasyprint':
+        static_charts = True
+
+    pdf_path = output_path.replace('.html', '.pdf')
+    png_dir = os.path.join(os.path.dirname(os.path.abspath(output_path)), 'png')
+
+    def fingerprints():
+        return output_fingerprints(stats_path, template_dir, template_file, bundle, static_charts, pdf_engine, thumbnails)
+
+    html_fingerprint, pdf_fingerprint, png_fingerprint = fingerprints()
+    previous = {} if force else load_fingerprints(output_path)
+
+    write_html = generate_html and not (previous.get('html') == html_fingerprint and os.path.exists(output_path))
+    write_pdf = generate_pdf and not (previous.get('pdf') == pdf_fingerprint and os.path.exists(pdf_path))
+    write_png = export_png and not (previous.get('png') == png_fingerprint and os.path.isdir(png_dir))
+    if not write_html and not write_pdf and not write_png:
+        print("Slides are up to date, nothing to render.")
+        return
+
+    stats = load_stats(stats_path)
+    images = {}
+    if thumbnails:
+        images = posters.slide_images(stats)
+        # Downloads update the image cache: record the fingerprint of the state rendered
+        html_fingerprint, pdf_fingerprint, png_fingerprint = fingerprints()
+    context = build_context(stats, static_charts, images)
+
+    if bundle == 'inline':
+        context['asset_tags'] = vendor_assets.inline_assets(include_scripts=not static_charts)
+    elif bundle == 'hashed':
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        context['asset_tags'] = vendor_assets.publish_hashed_assets(output_dir, include_scripts=not static_charts)
+    elif bundle:
+        raise ValueError(f"Unknown bundle mode: {bundle}")
     
-    env = Environment(loader=FileSystemLoader(template_dir))
-    template = env.get_template(template_file)
+    template = get_environment(template_dir).get_template(template_file)
     rendered_html = template.render(context)
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(rendered_html)
+    # When only the PDF is wanted, render into a scratch file next to the output so
+    # relative paths still resolve, and leave the published index.html untouched.
+    html_path = output_path if generate_html else output_path.replace('.html', '.pdf-render.html')
+    if write_html or not generate_html:
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(rendered_html)
+    if bundle == 'hashed' and write_html:
+        # The published HTML no longer references the older assets
+        vendor_assets.prune_hashed_assets(output_dir, include_scripts=not static_charts)
         
     # Generate PDF
-    if generate_pdf:
-        pdf_path = output_path.replace('.html', '.pdf')
+    if write_pdf:
         print(f"Generating PDF at {pdf_path}...")
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            # 1920x1080 to match our print styles
-            page = browser.new_page(viewport={'width': 1920, 'height': 1080})
-            
-            # Convert path to file URL
-            file_url = f"file://{output_path}"
-            page.goto(file_url, wait_until="networkidle")
-            
-            # Wait for Chart.js animations to complete
-            page.wait_for_timeout(2000)
-            
-            page.pdf(path=pdf_path, width="1920px", height="1080px", print_background=True)
-            browser.close()
+        if pdf_engine == 'weasyprint':
+            render_pdf_weasyprint(html_path, pdf_path)
+        else:
+            render_pdf(html_path, pdf_path)
+    elif generate_pdf:
+        print("PDF is up to date.")
     else:
         print("Skipping PDF generation as requested.")
 
-if __name__ == "__main__":
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    stats_file = os.path.join(base_dir, 'stats.json')
-    slides_dir = os.path.join(base_dir, 'slides')
+    if write_png:
+        print(f"Exporting slide images to {png_dir}...")
+        export_slide_images(html_path, png_dir, pool_size=png_pool_size)
+
+    if not generate_html:
+        os.remove(html_path)
+
+    # Only the outputs written by this render: the other keys may be updated concurrently
+    fingerprints = {}
+    if write_html:
+        fingerprints['html'] = html_fingerprint
+    if write_pdf:
+        fingerprints['pdf'] = pdf_fingerprint
+    if write_png:
+        fingerprints['png'] = png_fingerprint
+    save_fingerprints(output_path, fingerprints)
+
+def env_flag(name):
+    return os.environ.get(name, '').lower() == 'true'
+
+def main(argv=None, prog=None):
+    # Every option defaults to its environment variable, so CI and pipeline.py keep working unchanged
+    parser = argparse.ArgumentParser(prog=prog, description="Generate the HTML slides and their PDF from the statistics.")
+    parser.add_argument('--stats-file', default=os.environ.get('STATS_FILE') or os.path.join(BASE_DIR, 'stats.json'),
+                        help="Statistics to present, optionally .gz or .zst (STATS_FILE)")
+    parser.add_argument('--skip-pdf', action='store_true', default=env_flag('SKIP_PDF'), help="Only write the HTML (SKIP_PDF)")
+    parser.add_argument('--skip-html', action='store_true', default=env_flag('SKIP_HTML'), help="Only write the PDF (SKIP_HTML)")
+    parser.add_argument('--bundle', choices=['inline', 'hashed'], default=os.environ.get('BUNDLE_ASSETS', '').lower() or None,
+                        help="Build slides that need no network, see vendor_assets.py (BUNDLE_ASSETS)")
+    parser.add_argument('--static-charts', action='store_true', default=env_flag('STATIC_CHARTS'),
+                        help="Draw the charts as inline SVG (STATIC_CHARTS)")
+    parser.add_argument('--pdf-engine', choices=['chromium', 'weasyprint'], default=os.environ.get('PDF_ENGINE', 'chromium').lower(),
+                        help="Print the PDF with a headless Chromium or with WeasyPrint (PDF_ENGINE)")
+    parser.add_argument('--force', action='store_true', default=env_flag('FORCE_RENDER'),
+                        help="Rewrite the outputs even if nothing changed (FORCE_RENDER)")
+    parser.add_argument('--export-png', action='store_true', default=env_flag('EXPORT_PNG'),
+                        help="Also save every slide as PNG plus thumbnail (EXPORT_PNG)")
+    parser.add_argument('--png-pool-size', type=int, default=int(os.environ.get('PNG_POOL_SIZE', '4')),
+                        help="Pages rendering PNGs in parallel (PNG_POOL_SIZE)")
+    parser.add_argument('--thumbnails', action='store_true', default=env_flag('THUMBNAILS'),
+                        help="Show posters and headshots next to the favorites (THUMBNAILS)")
+    args = parser.parse_args(argv)
+
+    slides_dir = os.path.join(BASE_DIR, 'slides')
     template_name = 'template.html'
     output_file = os.path.join(slides_dir, 'index.html')
-    
-    # Check for SKIP_PDF env var
-    skip_pdf = os.environ.get('SKIP_PDF', '').lower() == 'true'
-    
-    generate_slides(stats_file, slides_dir, template_name, output_file, generate_pdf=not skip_pdf)
+
+    generate_slides(args.stats_file, slides_dir, template_name, output_file, generate_pdf=not args.skip_pdf,
+                    generate_html=not args.skip_html, bundle=args.bundle, static_charts=args.static_charts,
+                    pdf_engine=args.pdf_engine, force=args.force, export_png=args.export_png,
+                    png_pool_size=args.png_pool_size, thumbnails=args.thumbnails)
     print(f"Slides generated at {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import importlib
+import os
+import re
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Subcommand -> (module, help). Modules are imported only when their command runs,
+# and heavy dependencies (requests, bs4, Playwright, Pillow...) are imported by the
+# modules only on the code paths that need them.
+COMMANDS = {
+    'enrich': ('enrich_ratings', "Enrich the ratings with main actors and countries"),
+    'check-ratings': ('check_ratings', "Validate data/ratings-plus.csv"),
+    'analyze': ('analyze_data', "Generate stats.json from the ratings"),
+    'check-stats': ('check_stats', "Validate stats.json"),
+    'db': ('ratings_db', "Import, export and query the SQLite ratings store"),
+    'posters': ('posters', "Download and resize the posters shown on the slides"),
+    'storage': ('data_io', "Compare the size and read/write time of the data files per compression"),
+    'slides': ('generate_slides', "Generate the HTML and PDF presentation"),
+    'batch': ('batch_slides', "Render the presentation for many stats files"),
+    'pipeline': ('pipeline', "Run every step, skipping unchanged ones"),
+    'preview': ('preview_server', "Serve the slides with live reload"),
+    'serve': ('stats_server', "Serve the stats and the slides over HTTP, cached until the ratings change"),
+}
+
+# There is no console script: the repo isn't an installable package, so the CLI is
+# run as `python scripts/imdb_ratings.py` and only uses this name in its usage lines
+PROG = 'imdb-ratings'
+
+# Commands that must start fast: their whole import chain must stay free of the heavy modules
+LIGHT_COMMANDS = ['check-ratings', 'analyze', 'check-stats']
+HEAVY_MODULES = ['requests', 'bs4', 'playwright', 'jinja2', 'PIL', 'weasyprint']
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+\d+\s+\|\s+\d+\s+\|\s*(\S+)')
+
+
+def measure_imports(command):
+    """
+    Imports the CLI and the command's module in a fresh interpreter with -X importtime.
+    Returns the set of imported top-level modules.
+    """
+    module = COMMANDS[command][0]
+    code = f"import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); import imdb_ratings, {module}"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, check=True)
+
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            modules.add(match.group(1).split('.')[0])
+    return modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog=PROG, description="IMDb ratings analysis and presentation.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        # Options (including --help) are left to the command's own parser
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    args, rest = parser.parse_known_args(argv)
+
+    module = importlib.import_module(COMMANDS[args.command][0])
+    return module.main(rest, prog=f"{PROG} {args.command}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analyze_data
+import data_io
+import stats_schema
+
+SNAPSHOT_INTERVAL = 30  # seconds
+
+
+class LiveStats:
+    """
+    Keeps the stats up to date while enrich_ratings.py runs. The enrichment puts rows on
+    a queue (all of them at the start, then each title it enriches); a background thread
+    parses them into the latest version of each film and publishes a partial stats file
+    at most every `interval` seconds. The first snapshot goes out as soon as the initial
+    rows are parsed, without waiting for any fetch.
+    """
+    def __init__(self, stats_file, interval=SNAPSHOT_INTERVAL):
+        self.stats_file = stats_file
+        self.interval = interval
+        self.queue = queue.Queue()
+        # Row key -> parsed film, in the order of the ratings file
+        self.films = {}
+        self.snapshots = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def submit(self, rows):
+        """
+        Queues ratings rows (dicts, as read by csv.DictReader). A row with the key of an
+        earlier one replaces it, e.g. once its actors and countries are fetched.
+        """
+        self.queue.put([dict(row) for row in rows])
+
+    def close(self):
+        """
+        Parses what is left in the queue and writes the final stats, which are the
+        same as a run of analyze_data.py on the enriched file.
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self.publish(final=True)
+
+    def run(self):
+        next_snapshot = time.monotonic()
+        pending = False
+        while True:
+            timeout = max(0, next_snapshot - time.monotonic()) if pending else None
+            try:
+                rows = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                rows = []
+            if rows is None:
+                return
+            for row in rows:
+                self.add(row)
+            pending = pending or bool(rows)
+            if pending and time.monotonic() >= next_snapshot:
+                self.publish()
+                pending = False
+                next_snapshot = time.monotonic() + self.interval
+
+    def add(self, row):
+        key = row.get('Const') or row.get('URL')
+        film = analyze_data.parse_film(row)
+        if film is None:
+            self.films.pop(key, None)
+        else:
+            self.films[key] = film
+
+    def publish(self, final=False):
+        films = list(self.films.values())
+        stats = analyze_data.build_stats(films)
+        if not final:
+            stats['progress'] = {
+                'movies': len(films),
+                'enriched': sum(1 for film in films if film.get('Main Actors') or film.get('Countries')),
+            }
+        errors = stats_schema.validate(stats)
+        if errors:
+            print("Live stats do not match the schema, snapshot skipped: " + " ".join(errors))
+            return
+
+        # Written next to the stats file and renamed, so readers never see a half-written file
+        temp_file = f"{self.stats_file}.{os.getpid()}.tmp"
+        data_io.dump_json(stats, temp_file, compression=data_io.compression_of(self.stats_file))
+        os.replace(temp_file, self.stats_file)
+        self.snapshots += 1
@@ -0,0 +1,249 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+STATE_FILE = BASE_DIR / '.pipeline-state.json'
+
+PYTHON = sys.executable
+
+# generate_slides.py options, read from the environment: a change re-renders the slides
+SLIDES_OPTIONS = ['STATS_FILE', 'BUNDLE_ASSETS', 'STATIC_CHARTS', 'PDF_ENGINE', 'THUMBNAILS', 'EXPORT_PNG', 'FORCE_RENDER']
+SLIDES_INPUTS = [
+    'stats.json', 'slides/template.html', 'data/posters.json',
+    'scripts/generate_slides.py', 'scripts/data_io.py', 'scripts/posters.py', 'scripts/svg_charts.py',
+    'scripts/vendor_assets.py',
+]
+
+# Each stage declares the files it reads and writes (its script and every sibling
+# module it imports included) and the environment variables it reads. A stage runs
+# once all of its dependencies are done, and is skipped when its inputs, outputs and
+# options match the ones recorded after its last successful run.
+STAGES = [
+    {
+        'name': 'enrich',
+        'command': [PYTHON, 'scripts/enrich_ratings.py'],
+        'inputs': ['data/ratings.csv', 'scripts/enrich_ratings.py', 'scripts/data_io.py', 'scripts/enrich_metrics.py',
+                   'scripts/posters.py'],
+        'outputs': ['data/ratings-plus.csv'],
+        'deps': [],
+    },
+    {
+        'name': 'check_ratings',
+        'command': [PYTHON, 'scripts/check_ratings.py'],
+        'inputs': ['data/ratings-plus.csv', 'scripts/check_ratings.py', 'scripts/data_io.py'],
+        'outputs': [],
+        'deps': ['enrich'],
+    },
+    {
+        'name': 'analyze',
+        'command': [PYTHON, 'scripts/analyze_data.py'],
+        'inputs': ['data/ratings-plus.csv', 'scripts/analyze_data.py', 'scripts/data_io.py', 'scripts/stats_schema.py',
+                   'scripts/quantile_sketch.py'],
+        'outputs': ['stats.json'],
+        'deps': ['check_ratings'],
+    },
+    {
+        'name': 'check_stats',
+        'command': [PYTHON, 'scripts/check_stats.py'],
+        'inputs': ['stats.json', 'scripts/check_stats.py', 'scripts/data_io.py', 'scripts/stats_schema.py'],
+        'outputs': [],
+        'deps': ['analyze'],
+    },
+    {
+        'name': 'slides_html',
+        'command': [PYTHON, 'scripts/generate_slides.py'],
+        'env': {'SKIP_PDF': 'true'},
+        'options': SLIDES_OPTIONS,
+        'inputs': SLIDES_INPUTS,
+        'outputs': ['slides/index.html'],
+        'deps': ['check_stats'],
+    },
+    {
+        # After the HTML, not next to it: both renders share the fingerprint file and
+        # the published assets of the slides folder
+        'name': 'slides_pdf',
+        'command': [PYTHON, 'scripts/generate_slides.py'],
+        'env': {'SKIP_HTML': 'true'},
+        'options': SLIDES_OPTIONS,
+        'inputs': SLIDES_INPUTS,
+        'outputs': ['slides/index.pdf'],
+        'deps': ['slides_html'],
+    },
+]
+
+
+def load_state(state_file):
+    if not state_file.exists():
+        return {'files': {}, 'stages': {}}
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {'files': {}, 'stages': {}}
+
+
+def save_state(state, state_file):
+    tmp_file = state_file.with_name(state_file.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, state_file)
+
+
+def file_hash(path, file_cache):
+    """
+    Returns the sha256 of a file, or None if it doesn't exist.
+    Hashes are cached by (mtime, size), so unchanged files are never re-read.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    key = str(path)
+    cached = file_cache.get(key)
+    if cached and cached['mtime_ns'] == st.st_mtime_ns and cached['size'] == st.st_size:
+        return cached['sha256']
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    digest = h.hexdigest()
+    file_cache[key] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha256': digest}
+    return digest
+
+
+def hash_files(paths, base_dir, file_cache):
+    return {p: file_hash(base_dir / p, file_cache) for p in paths}
+
+
+def stage_env(stage):
+    return dict(os.environ, **stage.get('env', {}))
+
+
+def stage_options(stage):
+    """
+    Values of the environment variables the stage reads (None when unset).
+    """
+    env = stage_env(stage)
+    return {name: env.get(name) for name in stage.get('options', [])}
+
+
+def is_up_to_date(stage, state, base_dir):
+    previous = state['stages'].get(stage['name'])
+    if not previous:
+        return False
+    if previous.get('options', {}) != stage_options(stage):
+        return False
+    if previous['inputs'] != hash_files(stage['inputs'], base_dir, state['files']):
+        return False
+    outputs = hash_files(stage['outputs'], base_dir, state['files'])
+    if any(digest is None for digest in outputs.values()):
+        return False
+    return previous['outputs'] == outputs
+
+
+def run_stage(stage, base_dir):
+    env = stage_env(stage)
+    start = time.perf_counter()
+    result = subprocess.run(stage['command'], cwd=base_dir, env=env, capture_output=True, text=True)
+    return result, time.perf_counter() - start
+
+
+def run_pipeline(stages=STAGES, base_dir=BASE_DIR, state_file=None, force=False, skip=(), max_workers=4):
+    """
+    Runs the stages as a DAG, in parallel where dependencies allow.
+    Returns a dict of stage name -> 'ran', 'skipped', 'failed' or 'blocked'.
+    """
+    base_dir = Path(base_dir)
+    state_file = Path(state_file) if state_file else base_dir / STATE_FILE.name
+    state = load_state(state_file)
+    by_name = {stage['name']: stage for stage in stages}
+    status = {}
+    running = {}
+
+    def ready_stages():
+        for stage in stages:
+            name = stage['name']
+            if name in status or name in running.values():
+                continue
+            deps = [status.get(dep) for dep in stage['deps']]
+            if any(dep in ('failed', 'blocked') for dep in deps):
+                status[name] = 'blocked'
+                print(f"[pipeline] {name}: blocked by a failed dependency")
+            elif all(dep in ('ran', 'skipped') for dep in deps):
+                yield stage
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            # Skipped stages unblock their dependents immediately, so keep scheduling until nothing changes
+            scheduled = True
+            while scheduled:
+                scheduled = False
+                for stage in list(ready_stages()):
+                    scheduled = True
+                    name = stage['name']
+                    if name in skip:
+                        status[name] = 'skipped'
+                        print(f"[pipeline] {name}: skipped (excluded)")
+                    elif not force and is_up_to_date(stage, state, base_dir):
+                        status[name] = 'skipped'
+                        print(f"[pipeline] {name}: skipped (up to date)")
+                    else:
+                        print(f"[pipeline] {name}: running...")
+                        running[executor.submit(run_stage, stage, base_dir)] = name
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                stage = by_name[name]
+                result, elapsed = future.result()
+                if result.stdout:
+                    print(result.stdout, end='')
+                if result.returncode != 0:
+                    if result.stderr:
+                        print(result.stderr, end='', file=sys.stderr)
+                    status[name] = 'failed'
+                    state['stages'].pop(name, None)
+                    print(f"[pipeline] {name}: failed with exit code {result.returncode}")
+                else:
+                    status[name] = 'ran'
+                    state['stages'][name] = {
+                        'inputs': hash_files(stage['inputs'], base_dir, state['files']),
+                        'outputs': hash_files(stage['outputs'], base_dir, state['files']),
+                        'options': stage_options(stage),
+                    }
+                    print(f"[pipeline] {name}: done in {elapsed:.2f}s")
+                save_state(state, state_file)
+
+    save_state(state, state_file)
+    return status
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Run the ratings pipeline, skipping stages whose inputs haven't changed.")
+    parser.add_argument('--force', action='store_true', help="Run every stage even if it is up to date")
+    parser.add_argument('--skip', action='append', default=[], choices=[s['name'] for s in STAGES],
+                        help="Stage to exclude (can be repeated), e.g. --skip enrich --skip slides_pdf")
+    parser.add_argument('--jobs', type=int, default=4, help="Maximum number of stages running in parallel")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_pipeline(force=args.force, skip=args.skip, max_workers=args.jobs)
+    print(f"[pipeline] finished in {time.perf_counter() - start:.2f}s")
+
+    if any(result in ('failed', 'blocked') for result in results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
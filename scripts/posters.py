@@ -0,0 +1,291 @@
+import argparse
+import asyncio
+import base64
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RATINGS_FILE = os.path.join(BASE_DIR, 'data', 'ratings-plus.csv')
+STATS_FILE = os.path.join(BASE_DIR, 'stats.json')
+# Poster and headshot URLs found on the title pages fetched by enrich_ratings.py
+POSTERS_FILE = os.path.join(BASE_DIR, 'data', 'posters.json')
+# Downloaded images, named by the hash of their content, and their thumbnails
+CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'images')
+
+# Twice the size shown on the slides, so the PDF stays sharp
+THUMBNAIL_SIZE = (80, 120)
+CONCURRENCY = 8
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
+}
+
+
+def load_index(path=None):
+    """
+    {"titles": {Const: poster URL}, "people": {name: headshot URL},
+     "no_poster": [Const whose title page has no poster, so backfill_index skips it]}
+    """
+    try:
+        with open(path or POSTERS_FILE, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        index = {}
+    if not isinstance(index, dict):
+        index = {}
+    index.setdefault('titles', {})
+    index.setdefault('people', {})
+    index.setdefault('no_poster', [])
+    return index
+
+
+def save_index(index, path=None):
+    with open(path or POSTERS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+
+
+def record_images(index, const, metadata):
+    """
+    Stores the image URLs returned by enrich_ratings.get_metadata for a title.
+    """
+    if metadata.get('Poster'):
+        index['titles'][const] = metadata['Poster']
+        if const in index.get('no_poster', []):
+            index['no_poster'].remove(const)
+    index['people'].update(metadata.get('Headshots') or {})
+
+
+def title_consts(ratings_file=RATINGS_FILE):
+    """
+    Original Title -> Const, as the stats only list the original titles.
+    """
+    return {title: row['Const'] for title, row in title_rows(ratings_file).items()}
+
+
+def title_rows(ratings_file=RATINGS_FILE):
+    """
+    Original Title -> first ratings row with that title.
+    """
+    rows = {}
+    with open(ratings_file, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            rows.setdefault(row['Original Title'], row)
+    return rows
+
+
+def file_digest(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def inputs_fingerprint(ratings_file=RATINGS_FILE, index_file=None, cache_dir=CACHE_DIR, size=THUMBNAIL_SIZE):
+    """
+    Changes whenever slide_images() could return something else for the same stats:
+    a new URL in the index, a new title in the ratings, or a new image in the cache.
+    Only hashes a few files, so callers can check it before resolving any image.
+    """
+    return hashlib.sha256(json.dumps([
+        file_digest(index_file or POSTERS_FILE),
+        file_digest(ratings_file),
+        file_digest(os.path.join(cache_dir, 'urls.json')),
+        list(size),
+    ]).encode('utf-8')).hexdigest()
+
+
+def wanted_images(stats, index, consts):
+    """
+    Slot ("directors:Sergio Leone") -> image URL, for the genres, directors and actors on the slides.
+    Actors get their headshot; everyone else (and actors without one) the poster of their first movie.
+    """
+    wanted = {}
+    favorites = stats.get('favorites', {})
+    for category in ('genres', 'directors', 'actors'):
+        for item in favorites.get(category, []):
+            url = index['people'].get(item['name']) if category == 'actors' else None
+            if not url:
+                url = next((index['titles'][consts[title]] for title in item.get('movies', [])
+                            if consts.get(title) in index['titles']), None)
+            if url:
+                wanted[f"{category}:{item['name']}"] = url
+    return wanted
+
+
+def original_path(cache_dir, digest):
+    return os.path.join(cache_dir, 'originals', digest)
+
+
+def thumbnail_path(cache_dir, digest, size):
+    return os.path.join(cache_dir, 'thumbs', f"{digest}-{size[0]}x{size[1]}.jpg")
+
+
+def load_url_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'urls.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+async def download_images(urls, cache_dir=CACHE_DIR, concurrency=CONCURRENCY):
+    """
+    Downloads the URLs that are not in the cache yet, concurrently. Images are stored
+    by content hash, so the same picture behind different URLs is kept once.
+    Returns {url: content hash} for every URL available in the cache.
+    """
+    import requests
+
+    url_index = load_url_index(cache_dir)
+    missing = [url for url in dict.fromkeys(urls)
+               if url not in url_index or not os.path.exists(original_path(cache_dir, url_index[url]))]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(url):
+        async with semaphore:
+            try:
+                response = await asyncio.to_thread(requests.get, url, headers=HEADERS, timeout=20)
+                response.raise_for_status()
+            except Exception as e:
+                print(f"Could not download {url}: {e}")
+                return
+        digest = hashlib.sha256(response.content).hexdigest()
+        if not os.path.exists(original_path(cache_dir, digest)):
+            write_atomic(original_path(cache_dir, digest), response.content)
+        url_index[url] = digest
+
+    if missing:
+        print(f"Downloading {len(missing)} images...")
+        await asyncio.gather(*(fetch(url) for url in missing))
+        write_atomic(os.path.join(cache_dir, 'urls.json'), json.dumps(url_index, indent=2, sort_keys=True).encode('utf-8'))
+    return {url: url_index[url] for url in urls if url in url_index}
+
+
+def make_thumbnail(source, destination, size):
+    """
+    Crops the image to the thumbnail's aspect ratio and downscales it. Runs in a worker process.
+    """
+    from PIL import Image, ImageOps
+    with Image.open(source) as image:
+        thumbnail = ImageOps.fit(image.convert('RGB'), size, Image.LANCZOS)
+    temp_path = f"{destination}.{os.getpid()}.tmp"
+    thumbnail.save(temp_path, 'JPEG', quality=85, optimize=True)
+    os.replace(temp_path, destination)
+    return destination
+
+
+def build_thumbnails(digests, cache_dir=CACHE_DIR, size=THUMBNAIL_SIZE, workers=None):
+    """
+    Returns {content hash: thumbnail path}. Only images without a thumbnail at this size are encoded.
+    """
+    paths = {digest: thumbnail_path(cache_dir, digest, size) for digest in set(digests)}
+    todo = [digest for digest, path in paths.items() if not os.path.exists(path)]
+    if todo:
+        os.makedirs(os.path.join(cache_dir, 'thumbs'), exist_ok=True)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                digest: executor.submit(make_thumbnail, original_path(cache_dir, digest), paths[digest], size)
+                for digest in todo
+            }
+            for digest, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Could not resize image {digest}: {e}")
+                    del paths[digest]
+    return paths
+
+
+def data_uri(path):
+    with open(path, 'rb') as f:
+        return f"data:image/jpeg;base64,{base64.b64encode(f.read()).decode('ascii')}"
+
+
+def slide_images(stats, ratings_file=RATINGS_FILE, index_file=None, cache_dir=CACHE_DIR,
+                 size=THUMBNAIL_SIZE, concurrency=CONCURRENCY, workers=None):
+    """
+    Slot -> thumbnail as a data URI, ready to be embedded in the slides. Images already
+    in the cache are neither downloaded nor re-encoded again.
+    """
+    wanted = wanted_images(stats, load_index(index_file), title_consts(ratings_file))
+    if not wanted:
+        return {}
+
+    # asyncio.run in its own thread, so this also works when called from a running event loop
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        digests = executor.submit(asyncio.run, download_images(list(wanted.values()), cache_dir, concurrency)).result()
+    thumbnails = build_thumbnails(digests.values(), cache_dir, size, workers)
+
+    images = {}
+    for slot, url in wanted.items():
+        path = thumbnails.get(digests.get(url))
+        if path:
+            images[slot] = data_uri(path)
+    return images
+
+
+def backfill_index(stats, ratings_file=RATINGS_FILE, index_file=None, fetch=None, delay=(2, 5)):
+    """
+    The URLs are only recorded when enrich_ratings.py fetches a title page, so titles
+    enriched before posters.json existed have none. Fetches the pages of the movies on
+    the slides that still have no poster, with the enrichment's polite delay between
+    two fetches, and records their URLs. Pages without a poster are recorded too, so
+    they are not fetched again. Returns the number of titles fetched.
+    """
+    import enrich_ratings
+    fetch = fetch or enrich_ratings.get_metadata
+
+    index = load_index(index_file)
+    rows = title_rows(ratings_file)
+    missing = {}
+    for category in ('genres', 'directors', 'actors'):
+        for item in stats.get('favorites', {}).get(category, []):
+            for title in item.get('movies', []):
+                row = rows.get(title)
+                if row and row['Const'] not in index['titles'] and row['Const'] not in index['no_poster']:
+                    missing[row['Const']] = row['URL']
+
+    for i, (const, url) in enumerate(missing.items()):
+        if i:
+            enrich_ratings.polite_delay(*delay)
+        metadata = fetch(url)
+        if metadata:
+            record_images(index, const, metadata)
+            if not metadata.get('Poster'):
+                index['no_poster'].append(const)
+    if missing:
+        save_index(index, index_file)
+    return len(missing)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Download and resize the posters and headshots shown on the slides.")
+    parser.add_argument('--stats', default=STATS_FILE)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help="Parallel downloads")
+    parser.add_argument('--workers', type=int, default=None, help="Resizing processes (default: CPU count)")
+    parser.add_argument('--backfill', action='store_true',
+                        help="First fetch the title pages of the movies on the slides that have no poster URL yet")
+    args = parser.parse_args(argv)
+
+    with open(args.stats, 'r', encoding='utf-8') as f:
+        stats = json.load(f)
+    if args.backfill:
+        print(f"Fetched {backfill_index(stats)} title pages for their image URLs")
+    images = slide_images(stats, concurrency=args.concurrency, workers=args.workers)
+    print(f"{len(images)} images ready in {CACHE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
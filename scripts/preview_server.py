@@ -0,0 +1,189 @@
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_slides
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RATINGS_FILE = os.path.join(BASE_DIR, 'data', 'ratings-plus.csv')
+STATS_FILE = os.path.join(BASE_DIR, 'stats.json')
+SLIDES_DIR = os.path.join(BASE_DIR, 'slides')
+TEMPLATE_FILE = 'template.html'
+OUTPUT_FILE = os.path.join(SLIDES_DIR, 'index.html')
+
+# What to redo when a watched file changes: the ratings need a new stats.json,
+# stats and template only need the HTML to be rendered again.
+WATCHED_FILES = {
+    RATINGS_FILE: 'analyze',
+    STATS_FILE: 'render',
+    os.path.join(SLIDES_DIR, TEMPLATE_FILE): 'render',
+}
+
+# Files the analyze step writes itself: their new mtime is not an edit
+ANALYZE_OUTPUTS = [STATS_FILE]
+
+POLL_INTERVAL = 0.05  # seconds
+EVENTS_PATH = '/__events'
+
+RELOAD_SCRIPT = f"""<script>
+    new EventSource('{EVENTS_PATH}').onmessage = () => window.location.reload();
+</script>
+"""
+
+
+class Reloader:
+    """
+    Counts rebuilds and wakes up the browsers waiting for the next one.
+    """
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+
+def file_mtimes(paths):
+    return {path: os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in paths}
+
+
+def changed_steps(before, after, watched=WATCHED_FILES):
+    return {watched[path] for path in watched if before.get(path) != after.get(path)}
+
+
+def rebuild(steps):
+    """
+    Runs the steps needed after a change. Analysis rewrites stats.json, which always implies a render.
+    """
+    if 'analyze' in steps:
+        result = subprocess.run([sys.executable, os.path.join('scripts', 'analyze_data.py')], cwd=BASE_DIR)
+        if result.returncode != 0:
+            print("Analysis failed, keeping the previous slides.")
+            return False
+    generate_slides.generate_slides(STATS_FILE, SLIDES_DIR, TEMPLATE_FILE, OUTPUT_FILE, generate_pdf=False)
+    return True
+
+
+def watch(reloader, stop_event, watched=WATCHED_FILES, interval=POLL_INTERVAL, analyze_outputs=ANALYZE_OUTPUTS):
+    mtimes = file_mtimes(watched)
+    while not stop_event.is_set():
+        time.sleep(interval)
+        current = file_mtimes(watched)
+        steps = changed_steps(mtimes, current, watched)
+        if not steps:
+            continue
+        start = time.perf_counter()
+        try:
+            rebuilt = rebuild(steps)
+        except Exception as e:
+            # e.g. a template syntax error while editing: keep watching for the fix
+            print(f"Rebuild failed, keeping the previous slides: {e}")
+            rebuilt = False
+        if rebuilt:
+            print(f"Rebuilt ({', '.join(sorted(steps))}) in {(time.perf_counter() - start) * 1000:.0f} ms")
+            reloader.notify()
+        # The snapshot taken before the rebuild stays the baseline, so edits saved while
+        # it ran trigger another one. Only our own stats.json write is absorbed.
+        mtimes = current
+        if 'analyze' in steps:
+            mtimes.update(file_mtimes([path for path in analyze_outputs if path in watched]))
+
+
+def inject_reload_script(html):
+    if '</body>' in html:
+        head, tail = html.rsplit('</body>', 1)
+        return head + RELOAD_SCRIPT + '</body>' + tail
+    return html + RELOAD_SCRIPT
+
+
+def make_handler(reloader):
+    class PreviewHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=SLIDES_DIR, **kwargs)
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == EVENTS_PATH:
+                self.send_events()
+            elif path in ('/', '/index.html'):
+                self.send_index()
+            else:
+                super().do_GET()
+
+        def send_index(self):
+            with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
+                body = inject_reload_script(f.read()).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_events(self):
+            # Server-sent events: one "reload" message per rebuild
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            version = reloader.version
+            try:
+                while True:
+                    new_version = reloader.wait(version, timeout=15)
+                    if new_version != version:
+                        version = new_version
+                        self.wfile.write(b"data: reload\n\n")
+                    else:
+                        self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    return PreviewHandler
+
+
+def serve(port):
+    reloader = Reloader()
+    stop_event = threading.Event()
+
+    rebuild({'render'})
+    watcher = threading.Thread(target=watch, args=(reloader, stop_event), daemon=True)
+    watcher.start()
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(reloader))
+    server.daemon_threads = True
+    print(f"Preview at http://127.0.0.1:{port}/ (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping preview server...")
+    finally:
+        stop_event.set()
+        server.server_close()
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Serve the slides and rebuild them when the data or the template change.")
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+    serve(args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Mergeable streaming quantile sketch (a merging t-digest).
+
+Values are summarised as centroids (mean, weight). Centroids are kept small near
+the tails and larger around the median, so the sketch never holds more than
+`compression` centroids whatever the number of values, and digests built separately (per user,
+per run) can be merged into one with the same accuracy.
+
+Each centroid can also carry sums of other quantities of its values (e.g. the
+ratings of the movies with that many votes). The sums are added up when centroids
+merge, which gives per-quantile-range aggregates without keeping the values.
+"""
+import math
+
+COMPRESSION = 100
+# Values buffered before they are merged into the centroids
+BUFFER_FACTOR = 5
+
+
+class TDigest:
+
+    def __init__(self, compression=COMPRESSION):
+        self.compression = compression
+        self.centroids = []  # [mean, weight, sums], sorted by mean
+        self.buffer = []
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1, **sums):
+        value = float(value)
+        self.buffer.append([value, weight, sums])
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= self.compression * BUFFER_FACTOR:
+            self.compress()
+
+    def merge(self, other):
+        """
+        Adds every value summarised by the other digest. Returns self.
+        """
+        self.buffer.extend([mean, weight, dict(sums)] for mean, weight, sums in other.centroids + other.buffer)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.compress()
+        return self
+
+    @property
+    def count(self):
+        return sum(c[1] for c in self.centroids) + sum(c[1] for c in self.buffer)
+
+    def scale(self, q):
+        # k1 scale function: a centroid spans at most one unit of k, so centroids are
+        # smallest at the tails, and there are never more than `compression` of them
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def scale_inverse(self, k):
+        k = max(-self.compression / 4, min(self.compression / 4, k))
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def compress(self):
+        """
+        Merges neighbouring centroids while each spans at most one unit of the scale
+        function. With few values every value keeps its own centroid, so the
+        quantiles are exact.
+        """
+        items = sorted(self.centroids + self.buffer, key=lambda c: c[0])
+        self.buffer = []
+        if not items:
+            self.centroids = []
+            return
+        total = sum(c[1] for c in items)
+        merged = [[items[0][0], items[0][1], dict(items[0][2])]]
+        before = 0  # weight of the centroids before the last one
+        limit = self.scale_inverse(self.scale(0) + 1)
+        for mean, weight, sums in items[1:]:
+            last = merged[-1]
+            if (before + last[1] + weight) / total <= limit:
+                last[1] += weight
+                last[0] += (mean - last[0]) * weight / last[1]
+                for key, value in sums.items():
+                    last[2][key] = last[2].get(key, 0) + value
+            else:
+                before += last[1]
+                limit = self.scale_inverse(self.scale(before / total) + 1)
+                merged.append([mean, weight, dict(sums)])
+        self.centroids = merged
+
+    def quantile(self, q):
+        """
+        Value below which a fraction q of the values fall, interpolated between the
+        centroids (and the min/max at the ends). None for an empty digest.
+        """
+        self.compress()
+        if not self.centroids:
+            return None
+        total = self.count
+        target = q * total
+        cumulative = 0
+        for i, (mean, weight, _) in enumerate(self.centroids):
+            center = cumulative + weight / 2
+            if target < center:
+                if i == 0:
+                    return self.min + (mean - self.min) * target / center
+                previous_mean, previous_weight, _ = self.centroids[i - 1]
+                previous_center = cumulative - previous_weight / 2
+                return previous_mean + (mean - previous_mean) * (target - previous_center) / (center - previous_center)
+            cumulative += weight
+        mean, weight, _ = self.centroids[-1]
+        center = total - weight / 2
+        return min(self.max, mean + (self.max - mean) * (target - center) / (total - center))
+
+    def to_dict(self):
+        self.compress()
+        return {
+            'compression': self.compression,
+            'min': self.min if self.centroids else None,
+            'max': self.max if self.centroids else None,
+            'centroids': self.centroids,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(data.get('compression', COMPRESSION))
+        digest.centroids = [[mean, weight, dict(sums)] for mean, weight, sums in data.get('centroids', [])]
+        if digest.centroids:
+            digest.min = data['min']
+            digest.max = data['max']
+        return digest
@@ -0,0 +1,326 @@
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analyze_data
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_FILE = os.path.join(BASE_DIR, 'data', 'ratings.db')
+RATINGS_FILE = os.path.join(BASE_DIR, 'data', 'ratings-plus.csv')
+
+# CSV column -> (table, column), in the order of data/ratings-plus.csv
+COLUMNS = [
+    ('Const', 'movies', 'const'),
+    ('Your Rating', 'ratings', 'your_rating'),
+    ('Date Rated', 'ratings', 'date_rated'),
+    ('Title', 'movies', 'title'),
+    ('Original Title', 'movies', 'original_title'),
+    ('URL', 'movies', 'url'),
+    ('Title Type', 'movies', 'title_type'),
+    ('IMDb Rating', 'movies', 'imdb_rating'),
+    ('Runtime (mins)', 'movies', 'runtime'),
+    ('Year', 'movies', 'year'),
+    ('Genres', 'movies', 'genres'),
+    ('Num Votes', 'movies', 'num_votes'),
+    ('Release Date', 'movies', 'release_date'),
+    ('Directors', 'movies', 'directors'),
+    ('Main Actors', 'movies', 'main_actors'),
+    ('Countries', 'movies', 'countries'),
+]
+CSV_HEADER = [name for name, _, _ in COLUMNS]
+MOVIE_COLUMNS = [column for _, table, column in COLUMNS if table == 'movies']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    const TEXT PRIMARY KEY,
+    title TEXT,
+    original_title TEXT,
+    url TEXT,
+    title_type TEXT,
+    imdb_rating REAL,
+    runtime INTEGER,
+    year INTEGER,
+    genres TEXT,
+    num_votes INTEGER,
+    release_date TEXT,
+    directors TEXT,
+    main_actors TEXT,
+    countries TEXT
+);
+CREATE TABLE IF NOT EXISTS ratings (
+    const TEXT PRIMARY KEY REFERENCES movies(const) ON DELETE CASCADE,
+    your_rating INTEGER,
+    date_rated TEXT,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS movie_person (
+    const TEXT NOT NULL REFERENCES movies(const) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS movie_country (
+    const TEXT NOT NULL REFERENCES movies(const) ON DELETE CASCADE,
+    country TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS movie_genre (
+    const TEXT NOT NULL REFERENCES movies(const) ON DELETE CASCADE,
+    genre TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_movies_title_type ON movies(title_type);
+CREATE INDEX IF NOT EXISTS idx_movies_year ON movies(year);
+CREATE INDEX IF NOT EXISTS idx_ratings_date_rated ON ratings(date_rated);
+CREATE INDEX IF NOT EXISTS idx_ratings_position ON ratings(position);
+CREATE INDEX IF NOT EXISTS idx_movie_person_name ON movie_person(role, name);
+CREATE INDEX IF NOT EXISTS idx_movie_person_const ON movie_person(const);
+CREATE INDEX IF NOT EXISTS idx_movie_country_country ON movie_country(country);
+CREATE INDEX IF NOT EXISTS idx_movie_country_const ON movie_country(const);
+CREATE INDEX IF NOT EXISTS idx_movie_genre_genre ON movie_genre(genre);
+CREATE INDEX IF NOT EXISTS idx_movie_genre_const ON movie_genre(const);
+"""
+
+# Same rows as analyze_data.load_data: films with a numeric rating and runtime
+FILMS_FILTER = (
+    "m.title_type = 'Film' AND typeof(r.your_rating) IN ('integer', 'real') "
+    "AND typeof(m.runtime) = 'integer'"
+)
+
+# Category -> (link table, name column, role), with the names split like analyze_data does
+CATEGORIES = {
+    'genres': ('movie_genre', 'genre', None),
+    'directors': ('movie_person', 'name', 'director'),
+    'actors': ('movie_person', 'name', 'actor'),
+}
+
+
+def get_countries(row):
+    countries = (row.get('Countries') or '').split(',')
+    return [c.strip() for c in countries if c.strip()]
+
+
+def connect(db_path=DB_FILE):
+    """
+    Opens (and creates if needed) the ratings database.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def to_db(value):
+    # Empty CSV cells are stored as NULL; numeric columns get their type from the column affinity
+    return value if value not in ('', None) else None
+
+
+def to_csv(column, value):
+    if value is None:
+        return ''
+    if column == 'imdb_rating' and isinstance(value, (int, float)):
+        # IMDb ratings always have one decimal (e.g. 8.0)
+        return f"{value:.1f}"
+    return str(value)
+
+
+def upsert_rows(conn, rows):
+    """
+    Inserts or updates CSV rows (dicts keyed by the CSV header) and their links.
+    New movies are appended after the existing ones; updated movies keep their place.
+    Call it inside a transaction (`with conn:`).
+    """
+    rows = [row for row in rows if row.get('Const')]
+    if not rows:
+        return 0
+    next_position = conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM ratings").fetchone()[0]
+
+    movies, ratings, persons, countries, genres = [], [], [], [], []
+    for i, row in enumerate(rows):
+        const = row['Const']
+        if any(name not in row for name in CSV_HEADER):
+            # e.g. a new IMDb export has no Main Actors/Countries: keep what was already enriched
+            existing = get_row(conn, const)
+            row = {**dict.fromkeys(CSV_HEADER, ''), **(existing or {}), **row}
+        movies.append([const] + [to_db(row.get(name)) for name, table, column in COLUMNS
+                                 if table == 'movies' and column != 'const'])
+        ratings.append((const, to_db(row.get('Your Rating')), to_db(row.get('Date Rated')), next_position + i))
+        persons.extend((const, name, 'director', p) for p, name in enumerate(analyze_data.get_directors(row)))
+        persons.extend((const, name, 'actor', p) for p, name in enumerate(analyze_data.get_actors(row)))
+        countries.extend((const, name, p) for p, name in enumerate(get_countries(row)))
+        genres.extend((const, name, p) for p, name in enumerate(analyze_data.get_genres(row)))
+
+    placeholders = ', '.join('?' * len(MOVIE_COLUMNS))
+    updates = ', '.join(f"{c} = excluded.{c}" for c in MOVIE_COLUMNS if c != 'const')
+    conn.executemany(
+        f"INSERT INTO movies ({', '.join(MOVIE_COLUMNS)}) VALUES ({placeholders}) "
+        f"ON CONFLICT(const) DO UPDATE SET {updates}",
+        movies,
+    )
+    conn.executemany(
+        "INSERT INTO ratings (const, your_rating, date_rated, position) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(const) DO UPDATE SET your_rating = excluded.your_rating, date_rated = excluded.date_rated",
+        ratings,
+    )
+
+    consts = [(row['Const'],) for row in rows]
+    for table in ('movie_person', 'movie_country', 'movie_genre'):
+        conn.executemany(f"DELETE FROM {table} WHERE const = ?", consts)
+    conn.executemany("INSERT INTO movie_person (const, name, role, position) VALUES (?, ?, ?, ?)", persons)
+    conn.executemany("INSERT INTO movie_country (const, country, position) VALUES (?, ?, ?)", countries)
+    conn.executemany("INSERT INTO movie_genre (const, genre, position) VALUES (?, ?, ?)", genres)
+    return len(rows)
+
+
+def upsert_row(conn, row):
+    """
+    Saves a single row in its own transaction.
+    """
+    with conn:
+        upsert_rows(conn, [row])
+
+
+def import_csv(conn, csv_path=RATINGS_FILE):
+    """
+    Bulk imports an IMDb export (data/ratings.csv) or an enriched file (data/ratings-plus.csv).
+    Missing columns (e.g. Main Actors and Countries in the IMDb export) are stored as NULL.
+    """
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    with conn:
+        return upsert_rows(conn, rows)
+
+
+def select_rows(conn, where='', params=()):
+    """
+    Yields the stored movies as CSV rows (dicts keyed by the CSV header), in file order.
+    """
+    columns = ', '.join(f"{'r' if table == 'ratings' else 'm'}.{column}" for _, table, column in COLUMNS)
+    query = (
+        f"SELECT {columns} FROM movies m JOIN ratings r ON r.const = m.const "
+        f"{'WHERE ' + where if where else ''} ORDER BY r.position"
+    )
+    for record in conn.execute(query, params):
+        yield {name: to_csv(column, record[column]) for name, _, column in COLUMNS}
+
+
+def get_row(conn, const):
+    return next(select_rows(conn, "m.const = ?", (const,)), None)
+
+
+def rated_between(conn, start, end):
+    """
+    Movies rated from start to end included (ISO dates, e.g. '2025-11-01' and '2025-11-30').
+    """
+    return list(select_rows(conn, "r.date_rated BETWEEN ? AND ?", (start, end)))
+
+
+def export_csv(conn, csv_path=RATINGS_FILE):
+    """
+    Writes the database back to the ratings-plus.csv format.
+    """
+    temp_path = csv_path + '.tmp'
+    count = 0
+    with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_HEADER)
+        writer.writeheader()
+        for row in select_rows(conn):
+            writer.writerow(row)
+            count += 1
+    os.replace(temp_path, csv_path)
+    return count
+
+
+def load_films(conn):
+    """
+    Same result as analyze_data.load_data, read from the database.
+    """
+    movies = []
+    for row in select_rows(conn, FILMS_FILTER):
+        row['Your Rating'] = float(row['Your Rating'])
+        row['Runtime (mins)'] = int(row['Runtime (mins)'])
+        movies.append(row)
+    return movies
+
+
+def category_stats(conn, category, min_count=3):
+    """
+    Same result as analyze_data.process_category for 'genres', 'directors' or 'actors',
+    with the counts and sums computed by SQLite.
+    """
+    table, name_column, role = CATEGORIES[category]
+    role_filter = "AND l.role = ?" if role else ""
+    params = (role,) if role else ()
+    source = (
+        f"FROM {table} l JOIN movies m ON m.const = l.const JOIN ratings r ON r.const = l.const "
+        f"WHERE {FILMS_FILTER} {role_filter}"
+    )
+
+    # Groups come out in order of first appearance, like the dict in process_category
+    groups = conn.execute(
+        f"SELECT l.{name_column} AS name, COUNT(*) AS count, SUM(r.your_rating) AS sum_rating, "
+        f"SUM(r.your_rating >= 7) AS liked_count, MIN(r.position * 1000 + l.position) AS first_seen "
+        f"{source} GROUP BY l.{name_column} HAVING COUNT(*) >= ? ORDER BY first_seen",
+        params + (min_count,),
+    ).fetchall()
+    if not groups:
+        return []
+
+    titles = defaultdict(list)
+    names = [g['name'] for g in groups]
+    placeholders = ', '.join('?' * len(names))
+    for record in conn.execute(
+        f"SELECT l.{name_column} AS name, m.original_title {source} AND l.{name_column} IN ({placeholders}) "
+        f"ORDER BY r.position, l.position",
+        params + tuple(names),
+    ):
+        titles[record['name']].append(record['original_title'] or '')
+
+    return [
+        {
+            'name': g['name'],
+            'count': g['count'],
+            'approval_rate': (g['liked_count'] / g['count']) * 100,
+            'avg_rating': g['sum_rating'] / g['count'],
+            'movies': titles[g['name']],
+        }
+        for g in groups
+    ]
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="SQLite store for the ratings (import, export and lookups).")
+    parser.add_argument('--db', default=DB_FILE, help="Database file (default: data/ratings.db)")
+    subparsers = parser.add_subparsers(dest='action', required=True)
+    import_parser = subparsers.add_parser('import', help="Import a ratings CSV (IMDb export or ratings-plus.csv)")
+    import_parser.add_argument('csv', nargs='?', default=RATINGS_FILE)
+    export_parser = subparsers.add_parser('export', help="Write the database to the ratings-plus.csv format")
+    export_parser.add_argument('csv', nargs='?', default=RATINGS_FILE)
+    rated_parser = subparsers.add_parser('rated', help="List the movies rated between two dates")
+    rated_parser.add_argument('start', help="First day (YYYY-MM-DD)")
+    rated_parser.add_argument('end', help="Last day (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    try:
+        if args.action == 'import':
+            count = import_csv(conn, args.csv)
+            print(f"Imported {count} ratings from {args.csv} into {args.db}")
+        elif args.action == 'export':
+            count = export_csv(conn, args.csv)
+            print(f"Exported {count} ratings from {args.db} to {args.csv}")
+        else:
+            for row in rated_between(conn, args.start, args.end):
+                print(f"{row['Date Rated']}  {row['Your Rating']:>2}  {row['Title']} ({row['Year']})")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Shared definition of the stats.json structure.
+
+The same schema is enforced by analyze_data.py on the in-memory stats before
+writing, and by check_stats.py while streaming an external stats file.
+Both go through validate_events(), which consumes ijson-style
+(event, value) pairs, so there is a single set of rules.
+"""
+
+NUMBER = {'type': 'number'}
+INTEGER = {'type': 'integer'}
+STRING = {'type': 'string'}
+
+ITEM = {
+    'type': 'object',
+    'required': ['name', 'count', 'approval_rate', 'avg_rating', 'movies'],
+    'properties': {
+        'name': STRING,
+        'count': INTEGER,
+        'approval_rate': NUMBER,
+        'avg_rating': NUMBER,
+        'movies': {'type': 'array', 'items': STRING},
+    },
+}
+
+ITEM_LIST = {'type': 'array', 'items': ITEM}
+
+DECADE = {
+    'type': 'object',
+    'required': ['decade', 'count', 'avg_rating'],
+    'properties': {'decade': STRING, 'count': INTEGER, 'avg_rating': NUMBER},
+}
+
+VOTE = {
+    'type': 'object',
+    'required': ['vote', 'my_count', 'imdb_count'],
+    'properties': {'vote': INTEGER, 'my_count': INTEGER, 'imdb_count': INTEGER},
+}
+
+TIER = {
+    'type': 'object',
+    'required': ['name', 'min_votes', 'max_votes', 'count', 'approval_rate', 'avg_rating', 'divergence'],
+    'properties': {
+        'name': STRING,
+        'min_votes': INTEGER,
+        'max_votes': INTEGER,
+        'count': INTEGER,
+        'approval_rate': NUMBER,
+        'avg_rating': NUMBER,
+        'avg_imdb_rating': NUMBER,
+        'divergence': NUMBER,
+    },
+}
+
+STATS_SCHEMA = {
+    'type': 'object',
+    'required': [
+        'total_days_watched', 'avg_runtime_minutes', 'favorites',
+        'least_favorites', 'most_watched_genres', 'decades_data'
+    ],
+    'properties': {
+        'total_movies': INTEGER,
+        'global_avg_rating': NUMBER,
+        'total_days_watched': NUMBER,
+        'avg_runtime_minutes': NUMBER,
+        'favorites': {
+            'type': 'object',
+            'required': ['genres', 'directors', 'actors'],
+            'properties': {'genres': ITEM_LIST, 'directors': ITEM_LIST, 'actors': ITEM_LIST},
+        },
+        'least_favorites': {
+            'type': 'object',
+            'required': ['genres'],
+            'properties': {'genres': ITEM_LIST},
+        },
+        'most_watched_genres': ITEM_LIST,
+        'decades_data': {'type': 'array', 'items': DECADE},
+        'votes_data': {'type': 'array', 'items': VOTE},
+        # Only in the partial snapshots written while enrich_ratings.py runs (--live-stats)
+        'progress': {
+            'type': 'object',
+            'required': ['movies', 'enriched'],
+            'properties': {'movies': INTEGER, 'enriched': INTEGER},
+        },
+        'popularity': {
+            'type': 'object',
+            'required': ['median_votes', 'tiers'],
+            'properties': {'median_votes': INTEGER, 'tiers': {'type': 'array', 'items': TIER}},
+        },
+    },
+}
+
+
+def value_type(event, value):
+    """
+    Maps a parser event to the schema type name of the value.
+    """
+    if event == 'start_map':
+        return 'object'
+    if event == 'start_array':
+        return 'array'
+    if event == 'number':
+        return 'integer' if isinstance(value, int) else 'number'
+    return event  # 'string', 'boolean' or 'null'
+
+
+def matches(expected, actual):
+    if expected == 'number':
+        return actual in ('number', 'integer')
+    return expected == actual
+
+
+def iter_events(data):
+    """
+    Yields (event, value) pairs for an in-memory structure, like ijson.basic_parse.
+    """
+    if isinstance(data, dict):
+        yield 'start_map', None
+        for key, value in data.items():
+            yield 'map_key', key
+            yield from iter_events(value)
+        yield 'end_map', None
+    elif isinstance(data, (list, tuple)):
+        yield 'start_array', None
+        for value in data:
+            yield from iter_events(value)
+        yield 'end_array', None
+    elif data is None:
+        yield 'null', None
+    elif isinstance(data, bool):
+        yield 'boolean', data
+    elif isinstance(data, (int, float)):
+        yield 'number', data
+    else:
+        yield 'string', data
+
+
+def validate_events(events, schema=STATS_SCHEMA, root='stats'):
+    """
+    Validates a stream of (event, value) pairs against the schema.
+    Only the current path is kept in memory. Returns a list of error messages.
+    """
+    errors = []
+    stack = []
+
+    for event, value in events:
+        if event == 'map_key':
+            stack[-1]['key'] = value
+            stack[-1]['seen'].add(value)
+            continue
+
+        if event in ('end_map', 'end_array'):
+            frame = stack.pop()
+            if event == 'end_map' and frame['schema']:
+                for key in frame['schema'].get('required', []):
+                    if key not in frame['seen']:
+                        errors.append(f"'{frame['path']}' is missing key '{key}'.")
+            continue
+
+        # Find the schema and path of the value being opened or read
+        if not stack:
+            node, path = schema, root
+        else:
+            frame = stack[-1]
+            if frame['kind'] == 'object':
+                path = f"{frame['path']}.{frame['key']}"
+                node = frame['schema']['properties'].get(frame['key']) if frame['schema'] else None
+            else:
+                path = f"{frame['path']}[{frame['index']}]"
+                frame['index'] += 1
+                node = frame['schema'].get('items') if frame['schema'] else None
+
+        actual = value_type(event, value)
+        if node and not matches(node['type'], actual):
+            errors.append(f"'{path}' must be {node['type']}, got {actual}.")
+            node = None  # don't validate the children of a mistyped value
+
+        if actual in ('object', 'array'):
+            stack.append({
+                'kind': actual,
+                'schema': node,
+                'path': path,
+                'key': None,
+                'seen': set(),
+                'index': 0,
+            })
+
+    return errors
+
+
+def validate(data, schema=STATS_SCHEMA):
+    """
+    Validates an in-memory stats structure. Returns a list of error messages.
+    """
+    return validate_events(iter_events(data), schema)
@@ -0,0 +1,242 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analyze_data
+import generate_slides
+import stats_schema
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RATINGS_FILE = os.path.join(BASE_DIR, 'data', 'ratings-plus.csv')
+SLIDES_DIR = os.path.join(BASE_DIR, 'slides')
+TEMPLATE_FILE = 'template.html'
+
+POLL_INTERVAL = 1  # seconds between two checks of the ratings file
+GZIP_LEVEL = 9  # compressed once per ratings change, so the best ratio is affordable
+
+
+class Response:
+    """
+    A body ready to be sent, with its gzip version and a strong ETag for each.
+    """
+    def __init__(self, body, content_type):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        self.content_type = content_type
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # Strong ETags identify the exact bytes, so the two encodings need their own
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+
+
+def json_response(data):
+    return Response(json.dumps(data, separators=(',', ':')).encode('utf-8'), 'application/json')
+
+
+def build_responses(movies, template_dir=SLIDES_DIR, template_file=TEMPLATE_FILE, static_charts=False, bundle=None):
+    """
+    Path -> Response for /stats, /stats/{section} and /slides, computed from the films
+    in memory. The slides are rendered with generate_slides.build_context.
+    """
+    stats = analyze_data.build_stats(movies)
+    errors = stats_schema.validate(stats)
+    if errors:
+        raise ValueError("Generated stats do not match the schema: " + " ".join(errors))
+
+    responses = {'/stats': json_response(stats)}
+    for section, value in stats.items():
+        responses[f'/stats/{section}'] = json_response(value)
+
+    context = generate_slides.build_context(stats, static_charts)
+    if bundle == 'inline':
+        import vendor_assets
+        context['asset_tags'] = vendor_assets.inline_assets(include_scripts=not static_charts)
+    elif bundle:
+        raise ValueError(f"Unknown bundle mode: {bundle}")
+    html = generate_slides.get_environment(template_dir).get_template(template_file).render(context)
+    responses['/slides'] = Response(html.encode('utf-8'), 'text/html; charset=utf-8')
+    return responses
+
+
+class StatsCache:
+    """
+    Loads the ratings once and keeps the precomputed responses. They are rebuilt only
+    when the content of the ratings file changes (a new mtime with the same content
+    keeps them), and swapped in one assignment, so requests never wait for a rebuild.
+    """
+    def __init__(self, ratings_file=RATINGS_FILE, **render_options):
+        self.ratings_file = ratings_file
+        self.render_options = render_options
+        self.responses = {}
+        self.digest = None
+        self.stat = None
+        self.builds = 0
+
+    def file_stat(self):
+        try:
+            st = os.stat(self.ratings_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def refresh(self):
+        """
+        Rebuilds the responses if the ratings file changed. Returns True after a rebuild.
+        A ratings file that can't be analyzed keeps the previous responses.
+        """
+        stat = self.file_stat()
+        if stat == self.stat or stat is None:
+            return False
+        self.stat = stat
+        digest = generate_slides.file_digest(self.ratings_file)
+        if digest == self.digest:
+            return False
+        try:
+            responses = build_responses(analyze_data.load_data(self.ratings_file), **self.render_options)
+        except Exception as e:
+            print(f"Could not analyze {self.ratings_file}, keeping the previous stats: {e}")
+            return False
+        self.responses = responses
+        self.digest = digest
+        self.builds += 1
+        return True
+
+    def watch(self, stop_event, interval=POLL_INTERVAL):
+        while not stop_event.wait(interval):
+            start = time.perf_counter()
+            if self.refresh():
+                print(f"Ratings changed, stats rebuilt in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def accepts_gzip(header):
+    for part in (header or '').split(','):
+        coding, _, params = part.partition(';')
+        if coding.strip() in ('gzip', '*'):
+            quality = params.strip().partition('q=')[2]
+            try:
+                return float(quality or 1) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def etag_matches(header, etag):
+    """
+    If-None-Match uses the weak comparison: W/"x" matches "x" (proxies that
+    re-encode a response may weaken its ETag).
+    """
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in header.split(',')]
+    return etag in [tag[2:] if tag.startswith('W/') else tag for tag in tags]
+
+
+def make_handler(cache):
+    class StatsHandler(BaseHTTPRequestHandler):
+        # Keep-alive connections: no TCP handshake per request. Without Nagle's algorithm
+        # the body isn't held back waiting for the ACK of the headers.
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self.send_cached(head=False)
+
+        def do_HEAD(self):
+            self.send_cached(head=True)
+
+        def send_cached(self, head):
+            path = self.path.split('?', 1)[0].rstrip('/') or '/'
+            response = cache.responses.get(path)
+            if response is None:
+                self.send_not_found(head)
+                return
+
+            if accepts_gzip(self.headers.get('Accept-Encoding')):
+                body, etag, encoding = response.gzip_body, response.gzip_etag, 'gzip'
+            else:
+                body, etag, encoding = response.body, response.etag, None
+
+            if etag_matches(self.headers.get('If-None-Match'), etag):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Vary', 'Accept-Encoding')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', response.content_type)
+            self.send_header('Content-Length', str(len(body)))
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            # Always revalidate: a 304 costs no body and the data may change at any time
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+
+        def send_not_found(self, head):
+            body = json.dumps({'error': 'not found', 'paths': sorted(cache.responses)}).encode('utf-8')
+            self.send_response(404)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StatsHandler
+
+
+def serve(port, host='127.0.0.1', ratings_file=RATINGS_FILE, **render_options):
+    cache = StatsCache(ratings_file, **render_options)
+    start = time.perf_counter()
+    if not cache.refresh():
+        print(f"Could not load {ratings_file}.")
+        return
+    print(f"Stats computed in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    stop_event = threading.Event()
+    watcher = threading.Thread(target=cache.watch, args=(stop_event,), daemon=True)
+    watcher.start()
+
+    server = ThreadingHTTPServer((host, port), make_handler(cache))
+    server.daemon_threads = True
+    print(f"Serving /stats, /stats/<section> and /slides at http://{host}:{port}/ (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping stats server...")
+    finally:
+        stop_event.set()
+        server.server_close()
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Serve the stats and the slides, recomputed only when the ratings change.")
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--ratings-file', default=RATINGS_FILE, help="Ratings CSV, optionally .gz or .zst")
+    parser.add_argument('--static-charts', action='store_true', help="Draw the charts as inline SVG")
+    parser.add_argument('--bundle', choices=['inline'], default=None,
+                        help="Embed the vendored assets in the slides (see vendor_assets.py)")
+    args = parser.parse_args(argv)
+    serve(args.port, args.host, args.ratings_file, static_charts=args.static_charts, bundle=args.bundle)
+
+
+if __name__ == "__main__":
+    main()
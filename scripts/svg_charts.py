@@ -0,0 +1,183 @@
+import math
+from html import escape
+
+# Same size, colors and font as the Chart.js charts in slides/template.html
+WIDTH = 936
+HEIGHT = 436
+MARGIN_TOP = 50
+MARGIN_RIGHT = 70
+MARGIN_BOTTOM = 40
+MARGIN_LEFT = 70
+
+CYAN = '#05d9e8'
+PINK = '#ff2a6d'
+PURPLE = '#d93ef8'
+TEXT_COLOR = '#ffffff'
+GRID_COLOR = 'rgba(255,255,255,0.1)'
+FONT_FAMILY = "'Outfit', sans-serif"
+
+# Chart.js defaults: categoryPercentage 0.8, barPercentage 0.9
+CATEGORY_PERCENTAGE = 0.8
+BAR_PERCENTAGE = 0.9
+
+
+def nice_scale(max_value, ticks=5):
+    """
+    Returns (axis max, step) with a round step (1, 2 or 5 times a power of ten).
+    """
+    if max_value <= 0:
+        return ticks, 1
+    raw_step = max_value / ticks
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw_step)
+    if step >= 1:
+        step = int(step)
+    return math.ceil(max_value / step) * step, step
+
+
+def fmt(value):
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+def gradient(gradient_id, color):
+    return (
+        f'<linearGradient id="{gradient_id}" x1="0" y1="0" x2="0" y2="1">'
+        f'<stop offset="0" stop-color="{color}"/>'
+        f'<stop offset="1" stop-color="{color}" stop-opacity="0.2"/>'
+        '</linearGradient>'
+    )
+
+
+def legend(items):
+    """
+    items: list of (label, color). Drawn centered above the plot, like Chart.js.
+    """
+    # Rough text width estimate, good enough to space the items
+    widths = [40 + len(label) * 7 for label, _ in items]
+    x = (WIDTH - sum(widths)) / 2
+    parts = []
+    for (label, color), width in zip(items, widths):
+        parts.append(f'<rect x="{fmt(x)}" y="12" width="30" height="12" rx="2" fill="{color}"/>')
+        parts.append(f'<text x="{fmt(x + 36)}" y="22" font-size="12">{escape(label)}</text>')
+        x += width
+    return ''.join(parts)
+
+
+def y_axis(max_value, step, x, anchor, grid=True, title=None, y_min=0):
+    plot_height = HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+    parts = []
+    value = y_min
+    while value <= max_value + 1e-9:
+        y = MARGIN_TOP + plot_height * (1 - (value - y_min) / (max_value - y_min))
+        if grid:
+            parts.append(f'<line x1="{MARGIN_LEFT}" y1="{fmt(y)}" x2="{WIDTH - MARGIN_RIGHT}" y2="{fmt(y)}" stroke="{GRID_COLOR}"/>')
+        parts.append(f'<text x="{fmt(x)}" y="{fmt(y + 4)}" font-size="12" text-anchor="{anchor}">{fmt(value)}</text>')
+        value += step
+    if title:
+        title_x = 16 if anchor == 'end' else WIDTH - 16
+        title_y = MARGIN_TOP + plot_height / 2
+        parts.append(
+            f'<text x="{title_x}" y="{fmt(title_y)}" font-size="12" text-anchor="middle" '
+            f'transform="rotate(-90 {title_x} {fmt(title_y)})">{escape(title)}</text>'
+        )
+    return ''.join(parts)
+
+
+def x_labels(labels, band):
+    parts = []
+    for i, label in enumerate(labels):
+        x = MARGIN_LEFT + band * (i + 0.5)
+        parts.append(f'<text x="{fmt(x)}" y="{HEIGHT - MARGIN_BOTTOM + 20}" font-size="12" text-anchor="middle">{escape(str(label))}</text>')
+    return ''.join(parts)
+
+
+def bars(series, band, max_value, fills):
+    """
+    series: list of value lists, drawn as grouped bars in each category.
+    """
+    plot_height = HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+    group_width = band * CATEGORY_PERCENTAGE
+    slot = group_width / len(series)
+    bar_width = slot * BAR_PERCENTAGE
+    parts = []
+    for s, values in enumerate(series):
+        for i, value in enumerate(values):
+            height = plot_height * value / max_value if max_value else 0
+            x = MARGIN_LEFT + band * i + (band - group_width) / 2 + slot * s + (slot - bar_width) / 2
+            y = MARGIN_TOP + plot_height - height
+            parts.append(
+                f'<rect x="{fmt(x)}" y="{fmt(y)}" width="{fmt(bar_width)}" height="{fmt(height)}" rx="4" fill="{fills[s]}">'
+                f'<title>{fmt(value)}</title></rect>'
+            )
+    return ''.join(parts)
+
+
+def svg(chart_id, title, defs, body):
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" id="{chart_id}" viewBox="0 0 {WIDTH} {HEIGHT}" '
+        f'width="100%" height="100%" role="img" aria-label="{escape(title)}" '
+        f'font-family="{escape(FONT_FAMILY)}" fill="{TEXT_COLOR}">'
+        f'<defs>{defs}</defs>{body}</svg>'
+    )
+
+
+def decades_chart_svg(decades_data):
+    """
+    Bar chart of movies watched per decade, with the average rating as a line on a 5-10 right axis.
+    """
+    labels = [d['decade'] for d in decades_data]
+    counts = [d['count'] for d in decades_data]
+    ratings = [d['avg_rating'] for d in decades_data]
+
+    plot_width = WIDTH - MARGIN_LEFT - MARGIN_RIGHT
+    plot_height = HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+    band = plot_width / max(1, len(labels))
+    max_count, step = nice_scale(max(counts, default=0))
+
+    points = []
+    for i, rating in enumerate(ratings):
+        clamped = min(10, max(5, rating))
+        x = MARGIN_LEFT + band * (i + 0.5)
+        y = MARGIN_TOP + plot_height * (1 - (clamped - 5) / 5)
+        points.append((x, y, rating))
+
+    line = ''
+    if points:
+        path = ' '.join(f"{fmt(x)},{fmt(y)}" for x, y, _ in points)
+        line = f'<polyline points="{path}" fill="none" stroke="{PINK}" stroke-width="3" stroke-linejoin="round"/>'
+        line += ''.join(
+            f'<circle cx="{fmt(x)}" cy="{fmt(y)}" r="4" fill="{PINK}"><title>{rating:.1f}</title></circle>'
+            for x, y, rating in points
+        )
+
+    body = (
+        legend([('Count of Movies Watched', CYAN), ('Avg Rating', PINK)])
+        + y_axis(max_count, step, MARGIN_LEFT - 8, 'end', title='Count of Movies Watched')
+        + y_axis(10, 1, WIDTH - MARGIN_RIGHT + 8, 'start', grid=False, title='Avg Rating', y_min=5)
+        + bars([counts], band, max_count, ['url(#decadesBars)'])
+        + line
+        + x_labels(labels, band)
+    )
+    return svg('yearsChart', 'Movies by decade', gradient('decadesBars', CYAN), body)
+
+
+def votes_chart_svg(votes_data):
+    """
+    Grouped bars: how many movies I rated with each vote, next to the IMDb rating distribution.
+    """
+    labels = [v['vote'] for v in votes_data]
+    mine = [v['my_count'] for v in votes_data]
+    imdb = [v['imdb_count'] for v in votes_data]
+
+    plot_width = WIDTH - MARGIN_LEFT - MARGIN_RIGHT
+    band = plot_width / max(1, len(labels))
+    max_count, step = nice_scale(max(mine + imdb, default=0))
+
+    body = (
+        legend([('Count of movies I rated with this vote', CYAN), ('Count of movies rated on IMDb with this vote', PURPLE)])
+        + y_axis(max_count, step, MARGIN_LEFT - 8, 'end')
+        + bars([mine, imdb], band, max_count, ['url(#votesMine)', 'url(#votesImdb)'])
+        + x_labels(labels, band)
+    )
+    defs = gradient('votesMine', CYAN) + gradient('votesImdb', PURPLE)
+    return svg('votesChart', 'Vote distribution', defs, body)
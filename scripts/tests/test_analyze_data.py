@@ -28,5 +28,55 @@ class TestAnalyzeData(unittest.TestCase):
         # Liked: A(8), C(9) -> 2 liked
         self.assertAlmostEqual(stat['approval_rate'], (2/3)*100)
 
+    def test_popularity_tiers(self):
+        movies = [
+            {'Your Rating': rating, 'IMDb Rating': str(imdb), 'Num Votes': str(votes)}
+            for votes, rating, imdb in [(100, 9.0, 7.0), (200, 8.0, 7.0), (1000, 5.0, 6.0), (2000, 6.0, 6.0),
+                                        (50000, 7.0, 8.0), (60000, 4.0, 8.0), (900000, 8.0, 8.5), (950000, 9.0, 8.5)]
+        ] + [{'Your Rating': 6.0, 'IMDb Rating': '', 'Num Votes': ''}]
+        popularity = analyze_data.popularity_stats(analyze_data.popularity_digest(movies))
+        tiers = popularity['tiers']
+        self.assertEqual([t['name'] for t in tiers], [name for name, _ in analyze_data.POPULARITY_TIERS])
+        self.assertEqual([t['count'] for t in tiers], [2, 2, 2, 2])
+        self.assertEqual(tiers[0]['min_votes'], 100)
+        self.assertEqual(tiers[-1]['max_votes'], 950000)
+        self.assertAlmostEqual(tiers[0]['approval_rate'], 100)
+        self.assertAlmostEqual(tiers[0]['divergence'], 1.5)
+        self.assertAlmostEqual(tiers[2]['divergence'], -2.5)
+        self.assertAlmostEqual(tiers[3]['avg_imdb_rating'], 8.5)
+        self.assertEqual(popularity['median_votes'], 26000)
+
+        # Two halves built separately and merged give the same tiers
+        first, second = analyze_data.popularity_digest(movies[::2]), analyze_data.popularity_digest(movies[1::2])
+        self.assertEqual(analyze_data.popularity_stats(first.merge(second)), popularity)
+        self.assertEqual(analyze_data.popularity_stats(analyze_data.popularity_digest([])), {'median_votes': 0, 'tiers': []})
+
+    def test_popularity_tiers_split_centroids(self):
+        # Far more movies than centroids: a centroid straddling a boundary is shared
+        # between two tiers, so every tier gets a quarter of the movies
+        movies = [{'Your Rating': 7 if i % 3 else 5, 'IMDb Rating': '7.0', 'Num Votes': str(i * 37 % 1009 + 1)}
+                  for i in range(1000)]
+        digest = analyze_data.popularity_digest(movies)
+        self.assertLess(len(digest.to_dict()['centroids']), 1000)
+        tiers = analyze_data.popularity_stats(digest)['tiers']
+        self.assertEqual([t['count'] for t in tiers], [250, 250, 250, 250])
+        self.assertAlmostEqual(sum(t['approval_rate'] * t['count'] for t in tiers) / 1000, 66.6, places=1)
+
+    def test_popularity_tier_counts_add_up(self):
+        self.assertEqual(analyze_data.largest_remainder([194.5, 194.5, 194.5, 194.5]), [195, 195, 194, 194])
+        movies = [{'Your Rating': 7, 'IMDb Rating': '7.0', 'Num Votes': str(i * 37 % 1009 + 1)} for i in range(778)]
+        tiers = analyze_data.popularity_stats(analyze_data.popularity_digest(movies))['tiers']
+        self.assertEqual(sum(t['count'] for t in tiers), 778)
+        self.assertLessEqual(max(t['count'] for t in tiers) - min(t['count'] for t in tiers), 1)
+
+    def test_build_stats_merges_popularity_sketches(self):
+        movies = [{'Your Rating': 8, 'IMDb Rating': '7.0', 'Num Votes': str(votes), 'Runtime (mins)': 100, 'Year': '2000',
+                   'Genres': 'Drama', 'Directors': 'X', 'Main Actors': '', 'Countries': '', 'Original Title': f'Movie {votes}'}
+                  for votes in (10, 20, 30, 40)]
+        own = analyze_data.TDigest()
+        stats = analyze_data.build_stats(movies, popularity=own, merge_popularity=[analyze_data.popularity_digest(movies)])
+        self.assertEqual(own.count, 4)
+        self.assertEqual(sum(t['count'] for t in stats['popularity']['tiers']), 8)
+
 if __name__ == '__main__':
     unittest.main()
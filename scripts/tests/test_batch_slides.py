@@ -0,0 +1,169 @@
+import asyncio
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import batch_slides
+
+STATS = {
+    "total_days_watched": 10.5,
+    "avg_runtime_minutes": 100.2,
+    "most_watched_genres": [{"name": "Genre1", "count": 10}],
+    "favorites": {"genres": [], "directors": [], "actors": []},
+    "least_favorites": {"genres": []}
+}
+
+class FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+        browser.pages += 1
+
+    async def goto(self, url, wait_until):
+        self.url = url
+
+    async def wait_for_function(self, expression):
+        pass
+
+    async def pdf(self, path, **kwargs):
+        # The deck called "slow" never finishes printing
+        await asyncio.sleep(5 if '/slow/' in self.url else 0.01)
+        with open(path, 'w') as f:
+            f.write("%PDF")
+
+    async def close(self):
+        pass
+
+class FakeAsyncPlaywright:
+    def __init__(self, broken_pages=0):
+        self.chromium = self
+        self.contexts = 0
+        self.pages = 0
+        # The first `broken_pages` pages fail to open, as if the browser had crashed
+        self.broken_pages = broken_pages
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def launch(self):
+        return self
+
+    async def new_context(self, viewport):
+        self.contexts += 1
+        return self
+
+    async def new_page(self):
+        if self.broken_pages:
+            self.broken_pages -= 1
+            raise RuntimeError("Target closed")
+        return FakePage(self)
+
+    async def close(self):
+        pass
+
+class TestBatchSlides(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.test_dir, 'template.html'), 'w') as f:
+            f.write("Days: {{ total_days_watched|int }}")
+        manifest = []
+        for name in ['alice', 'bob', 'slow']:
+            stats_file = os.path.join(self.test_dir, f'{name}.json')
+            with open(stats_file, 'w') as f:
+                json.dump(STATS, f)
+            manifest.append({'stats': f'{name}.json', 'output_dir': f'decks/{name}'})
+        manifest.append({'stats': 'missing.json', 'output_dir': 'decks/missing'})
+        self.manifest_path = os.path.join(self.test_dir, 'manifest.json')
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def run_batch(self, **kwargs):
+        jobs = batch_slides.load_manifest(self.manifest_path)
+        with patch('sys.stdout', new=MagicMock()):
+            return asyncio.run(batch_slides.run_batch(jobs, template_dir=self.test_dir, workers=2, **kwargs))
+
+    def test_load_manifest(self):
+        jobs = batch_slides.load_manifest(self.manifest_path)
+        self.assertEqual([job['id'] for job in jobs], ['alice', 'bob', 'slow', 'missing'])
+        self.assertEqual(jobs[0]['stats'], os.path.join(self.test_dir, 'alice.json'))
+
+    def test_html_only(self):
+        results = self.run_batch(generate_pdf=False)
+        self.assertEqual([r['status'] for r in results], ['ok', 'ok', 'ok', 'failed'])
+        with open(results[0]['html']) as f:
+            self.assertEqual(f.read(), "Days: 10")
+        self.assertIsNone(results[0]['pdf'])
+
+    def test_pdfs_with_timeout(self):
+        fake = FakeAsyncPlaywright()
+        with patch('playwright.async_api.async_playwright', return_value=fake):
+            results = self.run_batch(contexts=2, timeout=0.5)
+
+        self.assertEqual(fake.contexts, 2)
+        by_id = {r['id']: r for r in results}
+        self.assertEqual(by_id['alice']['status'], 'ok')
+        self.assertTrue(os.path.exists(by_id['bob']['pdf']))
+        self.assertEqual(by_id['slow']['status'], 'timeout')
+        self.assertIsNone(by_id['slow']['pdf'])
+        self.assertEqual(by_id['missing']['status'], 'failed')
+        self.assertNotIn('pdf_seconds', by_id['missing'])
+
+    def test_unchanged_decks_are_not_printed_again(self):
+        fake = FakeAsyncPlaywright()
+        with patch('playwright.async_api.async_playwright', return_value=fake):
+            self.run_batch(contexts=2, timeout=0.5)
+            printed = fake.pages
+            results = self.run_batch(contexts=2, timeout=0.5)
+        # Only the deck that timed out is printed again
+        self.assertEqual(fake.pages - printed, 1)
+        by_id = {r['id']: r for r in results}
+        self.assertTrue(by_id['alice']['pdf_skipped'])
+        self.assertEqual(by_id['alice']['status'], 'ok')
+        self.assertEqual(by_id['slow']['status'], 'timeout')
+
+        # A new stats file invalidates its deck only
+        with open(os.path.join(self.test_dir, 'bob.json'), 'w') as f:
+            json.dump(dict(STATS, total_days_watched=20), f)
+        with patch('playwright.async_api.async_playwright', return_value=fake):
+            printed = fake.pages
+            results = self.run_batch(contexts=2, timeout=0.5)
+        self.assertEqual(fake.pages - printed, 2)  # bob and slow
+        self.assertNotIn('pdf_skipped', {r['id']: r for r in results}['bob'])
+
+    def test_page_that_fails_to_open_is_recorded(self):
+        fake = FakeAsyncPlaywright(broken_pages=2)
+        with patch('playwright.async_api.async_playwright', return_value=fake):
+            results = self.run_batch(contexts=1, timeout=0.5)
+
+        # The single printer records the failures and goes on with the other decks
+        self.assertEqual(sum(1 for r in results if r.get('error') == "PDF: Target closed"), 2)
+        self.assertEqual([r['id'] for r in results if 'pdf_seconds' in r], ['alice', 'bob', 'slow'])
+
+    def test_duplicate_ids_are_rejected(self):
+        with open(self.manifest_path, 'w') as f:
+            json.dump([{'stats': 'alice.json', 'output_dir': 'team1/alice'},
+                       {'stats': 'bob.json', 'output_dir': 'team2/alice'}], f)
+        with self.assertRaises(ValueError):
+            batch_slides.load_manifest(self.manifest_path)
+
+        with open(self.manifest_path, 'w') as f:
+            json.dump([{'stats': 'alice.json', 'output_dir': 'team1/alice', 'id': 'team1-alice'},
+                       {'stats': 'bob.json', 'output_dir': 'team2/alice', 'id': 'team2-alice'}], f)
+        results = self.run_batch(generate_pdf=False)
+        self.assertEqual([r['id'] for r in results], ['team1-alice', 'team2-alice'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,10 @@
 import unittest
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, MagicMock
 import sys
 import os
+import json
+import shutil
+import tempfile
 from pathlib import Path
 
 # Add the scripts directory to sys.path so we can import the module
@@ -9,102 +12,112 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 import check_ratings
 
+HEADERS = ",".join(check_ratings.REQUIRED_COLUMNS)
+VALID_ROW = "tt1074638,8,Skyfall,http://url,Film,7.8,143,2012,Action,Sam Mendes,Daniel Craig,UK"
+
 class TestCheckRatings(unittest.TestCase):
-    
-    @patch('check_ratings.RATINGS_FILE')
-    def test_file_not_exists(self, mock_file):
-        mock_file.exists.return_value = False
-        
-        with patch('sys.stdout', new=MagicMock()) as mock_stdout:
-            with self.assertRaises(SystemExit) as cm:
-                check_ratings.validate_ratings()
-            
-            self.assertEqual(cm.exception.code, 1)
-            # Verify the error message was printed
-            # mock_stdout.write.assert_called() # Hard to check exact string with print being complex
-
-    @patch('check_ratings.RATINGS_FILE')
-    def test_csv_empty(self, mock_file):
-        mock_file.exists.return_value = True
-        
-        # Mock opening an empty file (or file with just header effectively empty for DictReader if no rows?)
-        # Actually DictReader needs fieldnames.
-        
-        with patch('builtins.open', mock_open(read_data="")):
-            with patch('sys.stdout', new=MagicMock()):
-                with self.assertRaises(SystemExit) as cm:
-                    check_ratings.validate_ratings()
-                self.assertEqual(cm.exception.code, 1)
-
-    @patch('check_ratings.RATINGS_FILE')
-    def test_missing_columns(self, mock_file):
-        mock_file.exists.return_value = True
-        
-        # Mock CSV with missing columns
-        csv_data = "Const,Your Rating\n1,10"
-        
-        with patch('builtins.open', mock_open(read_data=csv_data)):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ratings_file = Path(self.test_dir) / 'ratings-plus.csv'
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_csv(self, content):
+        with open(self.ratings_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def run_validation(self, **kwargs):
+        with patch('check_ratings.RATINGS_FILE', self.ratings_file):
             with patch('sys.stdout', new=MagicMock()):
-                with self.assertRaises(SystemExit) as cm:
-                    check_ratings.validate_ratings()
-                self.assertEqual(cm.exception.code, 1)
-
-    @patch('check_ratings.RATINGS_FILE')
-    def test_valid_csv(self, mock_file):
-        mock_file.exists.return_value = True
-        
-        # Valid CSV data
-        headers = ",".join(check_ratings.REQUIRED_COLUMNS)
-        row1 = "tt1074638,8,Skyfall,http://url,Film,7.8,143,2012,Action,Sam Mendes,Daniel Craig,UK"
-        csv_data = f"{headers}\n{row1}"
-        
-        with patch('builtins.open', mock_open(read_data=csv_data)):
-            with patch('sys.stdout', new=MagicMock()) as mock_stdout:
-                check_ratings.validate_ratings()
-                # Should not raise SystemExit
-                # Could check for success message
-
-    @patch('check_ratings.RATINGS_FILE')
-    def test_invalid_rating(self, mock_file):
-        mock_file.exists.return_value = True
-        
-        headers = ",".join(check_ratings.REQUIRED_COLUMNS)
+                return check_ratings.validate_ratings(**kwargs)
+
+    def test_file_not_exists(self):
+        with self.assertRaises(SystemExit) as cm:
+            self.run_validation()
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_csv_empty(self):
+        self.write_csv("")
+        with self.assertRaises(SystemExit) as cm:
+            self.run_validation()
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_missing_columns(self):
+        self.write_csv("Const,Your Rating\n1,10")
+        with self.assertRaises(SystemExit) as cm:
+            self.run_validation()
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_valid_csv(self):
+        self.write_csv(f"{HEADERS}\n{VALID_ROW}")
+        report = self.run_validation()
+        self.assertTrue(report['valid'])
+        self.assertEqual(report['rows'], 1)
+
+    def test_invalid_rating(self):
         # Rating 11 is invalid
         row1 = "tt1074638,11,Skyfall,http://url,Film,7.8,143,2012,Action,Sam Mendes,Daniel Craig,UK"
-        csv_data = f"{headers}\n{row1}"
-        
-        with patch('builtins.open', mock_open(read_data=csv_data)):
-            with patch('sys.stdout', new=MagicMock()) as mock_stdout:
-                # The script does not exit on warning, it just prints warning
-                check_ratings.validate_ratings()
-                
-                # Verify warning was printed (optional, but good practice)
-                # We can check if any print call contained "Warning"
-
-    @patch('check_ratings.RATINGS_FILE')
-    def test_non_integer_rating(self, mock_file):
-        mock_file.exists.return_value = True
-        
-        headers = ",".join(check_ratings.REQUIRED_COLUMNS)
-        # Rating 'bad' is invalid
+        self.write_csv(f"{HEADERS}\n{row1}")
+        # The script does not exit on warning, it just reports it
+        report = self.run_validation()
+        self.assertEqual(report['rules']['Your Rating.range']['count'], 1)
+
+    def test_non_integer_rating(self):
         row1 = "tt1074638,bad,Skyfall,http://url,Film,7.8,143,2012,Action,Sam Mendes,Daniel Craig,UK"
-        csv_data = f"{headers}\n{row1}"
-        
-        with patch('builtins.open', mock_open(read_data=csv_data)):
-            with patch('sys.stdout', new=MagicMock()):
-                check_ratings.validate_ratings()
+        self.write_csv(f"{HEADERS}\n{row1}")
+        report = self.run_validation()
+        self.assertEqual(report['rules']['Your Rating.type']['count'], 1)
 
-    @patch('check_ratings.RATINGS_FILE')
-    def test_invalid_year(self, mock_file):
-        mock_file.exists.return_value = True
-        
-        headers = ",".join(check_ratings.REQUIRED_COLUMNS)
+    def test_invalid_year(self):
         row1 = "tt1074638,8,Skyfall,http://url,Film,7.8,143,bad_year,Action,Sam Mendes,Daniel Craig,UK"
-        csv_data = f"{headers}\n{row1}"
-        
-        with patch('builtins.open', mock_open(read_data=csv_data)):
-            with patch('sys.stdout', new=MagicMock()):
-                check_ratings.validate_ratings()
+        self.write_csv(f"{HEADERS}\n{row1}")
+        report = self.run_validation()
+        self.assertEqual(report['rules']['Year.type']['count'], 1)
+
+    def test_url_runtime_and_imdb_rating(self):
+        row1 = "tt1074638,8,Skyfall,not-a-url,Film,12.5,0,2012,Action,Sam Mendes,Daniel Craig,UK"
+        self.write_csv(f"{HEADERS}\n{row1}")
+        report = self.run_validation()
+        self.assertIn('URL.pattern', report['rules'])
+        self.assertIn('IMDb Rating.range', report['rules'])
+        self.assertIn('Runtime (mins).range', report['rules'])
+
+    def test_chunked_matches_single_pass(self):
+        rows = [f"tt{i:07d},{i % 12},Movie,http://url,Film,7.0,100,2000,Drama,Dir,Actor,IT" for i in range(200)]
+        rows.append("tt0000005,8,Dupe,http://url,Film,7.0,100,2000,Drama,Dir,Actor,IT")
+        self.write_csv(HEADERS + "\n" + "\n".join(rows) + "\n")
+
+        single = check_ratings.build_report(self.ratings_file, workers=1)
+        chunked = check_ratings.build_report(self.ratings_file, workers=2, chunk_size=512)
+
+        self.assertEqual(single['rows'], 201)
+        self.assertEqual(json.dumps(single, sort_keys=True), json.dumps(chunked, sort_keys=True))
+
+        duplicates = chunked['rules']['Const.duplicate']
+        self.assertEqual(duplicates['count'], 1)
+        self.assertEqual(duplicates['samples'][0], {'row': 201, 'first_row': 6})
+        # Ratings 0 and 11 are out of range; samples are capped
+        self.assertLessEqual(len(chunked['rules']['Your Rating.range']['samples']), check_ratings.MAX_SAMPLES)
+        self.assertGreater(chunked['rules']['Your Rating.range']['count'], check_ratings.MAX_SAMPLES)
+
+    def test_unicode_line_separators_in_a_title(self):
+        rows = [f"tt{i:07d},8,Movie\u2028Part\x85{i}\x1c,http://url,Film,7.0,100,2000,Drama,Dir,Actor,IT" for i in range(50)]
+        self.write_csv(HEADERS + "\n" + "\n".join(rows) + "\n")
+
+        single = check_ratings.build_report(self.ratings_file, workers=1)
+        chunked = check_ratings.build_report(self.ratings_file, workers=1, chunk_size=512)
+
+        self.assertTrue(single['valid'])
+        self.assertEqual(single['rows'], 50)
+        self.assertEqual(chunked, single)
+
+    def test_compile_schema(self):
+        checks = dict(check_ratings.compile_schema({'Year': {'type': 'int', 'min': 1900}, 'Const': {'required': True}}))
+        self.assertIsNone(checks['Year'](''))
+        self.assertEqual(checks['Year']('1800'), 'range')
+        self.assertEqual(checks['Const'](''), 'required')
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,9 @@
 import unittest
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, MagicMock
 import sys
 import json
+import shutil
+import tempfile
 from pathlib import Path
 
 # Add scripts directory to sys.path so we can import the module
@@ -12,33 +14,42 @@ sys.path.append(str(Path(__file__).parent.parent))
 import check_stats
 
 class TestCheckStats(unittest.TestCase):
-    
-    @patch('check_stats.STATS_FILE')
-    def test_file_not_exists(self, mock_file):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.stats_file = Path(self.test_dir) / 'stats.json'
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_stats(self, content):
+        with open(self.stats_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return patch('check_stats.STATS_FILE', self.stats_file)
+
+    def test_file_not_exists(self):
         """Test validation fails when stats.json does not exist."""
-        mock_file.exists.return_value = False
-        
-        with patch('sys.stdout', new=MagicMock()) as mock_stdout:
+        missing = Path(self.test_dir) / 'missing' / 'stats.json'
+
+        with patch('sys.stdout', new=MagicMock()) as mock_stdout, \
+                patch('check_stats.data_io.open_data') as mock_open_data:
             with self.assertRaises(SystemExit) as cm:
-                check_stats.validate_stats()
-            
+                check_stats.validate_stats(missing)
+
             self.assertEqual(cm.exception.code, 1)
+            mock_stdout.write.assert_any_call(f"Error: {missing} does not exist.")
+            mock_open_data.assert_not_called()
 
-    @patch('check_stats.STATS_FILE')
-    def test_invalid_json_format(self, mock_file):
+    def test_invalid_json_format(self):
         """Test validation fails when file contains invalid JSON."""
-        mock_file.exists.return_value = True
-        
-        with patch('builtins.open', mock_open(read_data="{ invalid json")):
+        with self.write_stats("{ invalid json"):
             with patch('sys.stdout', new=MagicMock()):
                 with self.assertRaises(SystemExit) as cm:
                     check_stats.validate_stats()
                 self.assertEqual(cm.exception.code, 1)
 
-    @patch('check_stats.STATS_FILE')
-    def test_missing_root_key(self, mock_file):
+    def test_missing_root_key(self):
         """Test validation fails when a required root key is missing."""
-        mock_file.exists.return_value = True
         data = {
             "total_days_watched": 10,
             # "avg_runtime_minutes" key is missing
@@ -48,16 +59,14 @@ class TestCheckStats(unittest.TestCase):
             "decades_data": []
         }
         
-        with patch('builtins.open', mock_open(read_data=json.dumps(data))):
+        with self.write_stats(json.dumps(data)):
              with patch('sys.stdout', new=MagicMock()):
                 with self.assertRaises(SystemExit) as cm:
                     check_stats.validate_stats()
                 self.assertEqual(cm.exception.code, 1)
 
-    @patch('check_stats.STATS_FILE')
-    def test_invalid_favorites_structure(self, mock_file):
+    def test_invalid_favorites_structure(self):
         """Test validation fails when sub-structure (favorites items) is invalid."""
-        mock_file.exists.return_value = True
         data = {
             "total_days_watched": 10,
             "avg_runtime_minutes": 100,
@@ -71,16 +80,14 @@ class TestCheckStats(unittest.TestCase):
             "decades_data": []
         }
         
-        with patch('builtins.open', mock_open(read_data=json.dumps(data))):
+        with self.write_stats(json.dumps(data)):
              with patch('sys.stdout', new=MagicMock()):
                 with self.assertRaises(SystemExit) as cm:
                     check_stats.validate_stats()
                 self.assertEqual(cm.exception.code, 1)
 
-    @patch('check_stats.STATS_FILE')
-    def test_valid_json(self, mock_file):
+    def test_valid_json(self):
         """Test validation passes with a correctly structured JSON."""
-        mock_file.exists.return_value = True
         
         valid_item = {
             "name": "Test",
@@ -103,7 +110,7 @@ class TestCheckStats(unittest.TestCase):
             "decades_data": []
         }
         
-        with patch('builtins.open', mock_open(read_data=json.dumps(data))):
+        with self.write_stats(json.dumps(data)):
              with patch('sys.stdout', new=MagicMock()) as mock_stdout:
                 check_stats.validate_stats()
                 # Should run to completion without SystemExit
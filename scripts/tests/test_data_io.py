@@ -0,0 +1,127 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import data_io
+import analyze_data
+import check_ratings
+import check_stats
+import enrich_ratings
+
+RATINGS_FILE = Path(__file__).parent.parent.parent / 'data' / 'ratings-plus.csv'
+
+def has_zstandard():
+    return 'zstd' in data_io.available_compressions()
+
+class TestDataIO(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.cwd = os.getcwd()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.test_dir)
+
+    def gzip_copy(self, source, name):
+        target = self.test_dir / name
+        data_io.copy_data(str(source), str(target))
+        return target
+
+    def test_compression_by_extension(self):
+        self.assertEqual(data_io.compression_of('data/ratings-plus.csv.gz'), 'gzip')
+        self.assertEqual(data_io.compression_of('stats.json.zst'), 'zstd')
+        self.assertIsNone(data_io.compression_of('stats.json'))
+        self.assertEqual(data_io.base_name('/tmp/stats.json.gz'), 'stats.json')
+
+    def test_gzip_round_trip(self):
+        path = self.test_dir / 'rows.csv.gz'
+        with data_io.open_data(path, 'w', newline='') as f:
+            csv.writer(f).writerows([['Const', 'Title'], ['tt1', 'Però']])
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+            self.assertEqual(f.read(), "Const,Title\r\ntt1,Però\r\n")
+        with data_io.open_data(path, 'r', newline='') as f:
+            self.assertEqual(list(csv.reader(f)), [['Const', 'Title'], ['tt1', 'Però']])
+
+    def test_dump_json_minified(self):
+        data = {'a': [1, 2], 'b': {'c': 'd'}}
+        data_io.dump_json(data, self.test_dir / 'pretty.json')
+        data_io.dump_json(data, self.test_dir / 'small.json.gz', minify=True)
+        self.assertEqual((self.test_dir / 'pretty.json').read_text(), json.dumps(data, indent=2))
+        self.assertEqual(gzip.decompress((self.test_dir / 'small.json.gz').read_bytes()), b'{"a":[1,2],"b":{"c":"d"}}')
+        self.assertEqual(data_io.load_json(self.test_dir / 'small.json.gz'), data)
+
+    @unittest.skipUnless(has_zstandard(), "zstandard is not installed")
+    def test_zstd_round_trip(self):
+        data_io.dump_json({'a': 1}, self.test_dir / 'stats.json.zst')
+        self.assertEqual(data_io.load_json(self.test_dir / 'stats.json.zst'), {'a': 1})
+
+    @unittest.skipIf(has_zstandard(), "zstandard is installed")
+    def test_zstd_needs_zstandard(self):
+        with self.assertRaises(RuntimeError):
+            data_io.open_data(self.test_dir / 'stats.json.zst', 'w')
+
+    def test_compare_formats(self):
+        stats_file = self.test_dir / 'stats.json'
+        stats_file.write_text(json.dumps({'movies': [{'title': f"Movie {i}", 'rating': i % 10} for i in range(200)]}))
+        results = data_io.compare_formats(str(stats_file))
+        formats = [r['format'] for r in results]
+        self.assertEqual(formats[:2], ['plain', 'gzip'])
+        self.assertIn('plain minified', formats)
+        self.assertEqual(results[0]['ratio'], 1.0)
+        sizes = {r['format']: r['bytes'] for r in results}
+        self.assertLess(sizes['plain minified'], sizes['plain'])
+        self.assertLess(sizes['gzip'], sizes['plain'])
+        self.assertIn('gzip minified', data_io.format_report(stats_file, results))
+
+    def test_compressed_ratings_and_stats(self):
+        ratings_gz = self.gzip_copy(RATINGS_FILE, 'ratings-plus.csv.gz')
+        self.assertEqual(analyze_data.load_data(str(ratings_gz)), analyze_data.load_data(str(RATINGS_FILE)))
+
+        # The compressed file is validated in one stream, with the same report
+        with patch('sys.stdout', new=MagicMock()):
+            plain_report = check_ratings.validate_ratings(workers=1)
+            gz_report = check_ratings.validate_ratings(ratings_file=ratings_gz)
+        self.assertEqual({k: v for k, v in gz_report.items() if k != 'file'},
+                         {k: v for k, v in plain_report.items() if k != 'file'})
+
+        os.chdir(self.test_dir)
+        analyze_data.main(['--ratings-file', str(ratings_gz), '--output', 'stats.json'])
+        analyze_data.main(['--ratings-file', str(ratings_gz), '--output', 'stats.json.gz', '--minify'])
+        self.assertEqual(data_io.load_json('stats.json.gz'), data_io.load_json('stats.json'))
+        self.assertLess(os.path.getsize('stats.json.gz'), os.path.getsize('stats.json'))
+        with patch('sys.stdout', new=MagicMock()):
+            check_stats.validate_stats(self.test_dir / 'stats.json.gz')
+            check_stats.validate_stats(str(self.test_dir / 'stats.json.gz'))
+
+    def test_enrich_keeps_the_file_compressed(self):
+        ratings_file = self.test_dir / 'ratings-plus.csv.gz'
+        with data_io.open_data(ratings_file, 'w', newline='') as f:
+            csv.writer(f).writerows([['Const', 'URL', 'Title'], ['tt0000001', 'http://url1', 'Movie1']])
+        source_file = self.test_dir / 'titles.json'
+        source_file.write_text(json.dumps({'titles': {'tt0000001': {'actors': ['Actor X'], 'countries': ['Italy']}}}))
+
+        with patch('enrich_ratings.FAILURES_FILE', str(self.test_dir / 'failures.json')), \
+             patch('posters.POSTERS_FILE', str(self.test_dir / 'posters.json')), \
+             patch('time.sleep'), patch('sys.stdout', new=MagicMock()):
+            enrich_ratings.main(['--ratings-file', str(ratings_file), '--source', 'local', '--source-file', str(source_file),
+                                 '--metrics-file', str(self.test_dir / 'metrics.prom'),
+                                 '--summary-file', str(self.test_dir / 'summary.json')])
+
+        with gzip.open(ratings_file, 'rt', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(rows[0]['Main Actors'], 'Actor X')
+        self.assertEqual(rows[0]['Countries'], 'Italy')
+        self.assertFalse(os.path.exists(str(ratings_file) + '.tmp'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import enrich_metrics
+import enrich_ratings
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"{status_code} error")
+        self.response = MagicMock(status_code=status_code)
+
+class ReadTimeout(TimeoutError):
+    pass
+
+class TestEnrichMetrics(unittest.TestCase):
+
+    def test_classify_error(self):
+        self.assertEqual(enrich_metrics.classify_error(HTTPError(403)), 'http_403')
+        self.assertEqual(enrich_metrics.classify_error(HTTPError(429)), 'http_429')
+        self.assertEqual(enrich_metrics.classify_error(HTTPError(503)), 'http_5xx')
+        self.assertEqual(enrich_metrics.classify_error(HTTPError(418)), 'http_other')
+        self.assertEqual(enrich_metrics.classify_error(ReadTimeout()), 'timeout')
+        self.assertEqual(enrich_metrics.classify_error(ConnectionResetError()), 'connection')
+        self.assertEqual(enrich_metrics.classify_error(ValueError()), 'other')
+
+    def test_histogram(self):
+        histogram = enrich_metrics.Histogram(buckets=(1, 2, 4))
+        for value in [0.5] * 8 + [3, 3.5]:
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [8, 0, 2, 0])
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.625)
+        self.assertGreater(histogram.quantile(0.99), 2)
+        self.assertLessEqual(histogram.quantile(0.99), 3.5)
+        self.assertEqual(histogram.summary()['count'], 10)
+
+    def test_prometheus_format(self):
+        registry = enrich_metrics.MetricsRegistry(buckets=(0.1, 1))
+        registry.inc('enrich_requests_total', 3)
+        registry.inc('enrich_errors_total', category='http_403')
+        registry.observe('enrich_fetch_seconds', 0.05)
+        registry.observe('enrich_fetch_seconds', 0.5)
+        text = registry.to_prometheus()
+        self.assertIn('# TYPE enrich_requests_total counter\nenrich_requests_total 3\n', text)
+        self.assertIn('enrich_errors_total{category="http_403"} 1\n', text)
+        self.assertIn('enrich_fetch_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('enrich_fetch_seconds_bucket{le="1"} 2\n', text)
+        self.assertIn('enrich_fetch_seconds_bucket{le="+Inf"} 2\n', text)
+        self.assertIn('enrich_fetch_seconds_count 2\n', text)
+
+        summary = registry.summary()
+        self.assertEqual(summary['requests'], 3)
+        self.assertEqual(summary['errors'], {'http_403': 1})
+        self.assertEqual(summary['latency']['enrich_fetch_seconds']['count'], 2)
+
+    def test_get_metadata_records_errors(self):
+        registry = enrich_metrics.MetricsRegistry()
+        with patch.object(enrich_ratings, 'METRICS', registry), patch('requests.get') as mock_get, \
+                patch('sys.stdout', new=MagicMock()):
+            mock_get.side_effect = HTTPError(403)
+            self.assertIsNone(enrich_ratings.get_metadata("http://fake.url"))
+
+            mock_get.side_effect = None
+            mock_get.return_value = MagicMock(status_code=200, content=b"<html><body>Nothing</body></html>")
+            metadata = enrich_ratings.get_metadata("http://fake.url")
+            # The page parsed to nothing: a failure once applied to the row
+            self.assertIsNone(enrich_ratings.apply_metadata({'Const': 'tt1', 'URL': "http://fake.url"}, metadata, {}))
+
+        summary = registry.summary()
+        self.assertEqual(summary['requests'], 2)
+        self.assertEqual(summary['errors'], {'http_403': 1, 'parse_miss': 1})
+        self.assertEqual(summary['latency']['enrich_fetch_seconds']['count'], 2)
+        self.assertEqual(summary['latency']['enrich_parse_seconds']['count'], 1)
+
+    def test_files_written(self):
+        test_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, test_dir)
+        registry = enrich_metrics.MetricsRegistry()
+        registry.inc('enrich_titles_total', result='enriched')
+
+        registry.write_prometheus(str(test_dir / 'nested' / 'metrics.prom'))
+        registry.write_summary(str(test_dir / 'nested' / 'summary.json'))
+        self.assertIn('enrich_titles_total{result="enriched"} 1', (test_dir / 'nested' / 'metrics.prom').read_text())
+        self.assertEqual(json.loads((test_dir / 'nested' / 'summary.json').read_text())['titles'], {'enriched': 1})
+
+    def test_prometheus_file_is_replaced_atomically(self):
+        test_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, test_dir)
+        path = str(test_dir / 'metrics.prom')
+        registry = enrich_metrics.MetricsRegistry()
+        registry.write_prometheus(path)
+
+        registry.inc('enrich_titles_total', result='enriched')
+        with patch('enrich_metrics.os.replace', wraps=os.replace) as mock_replace:
+            registry.write_prometheus(path)
+        temp_path, target = mock_replace.call_args.args
+        self.assertEqual(target, path)
+        self.assertEqual(os.path.dirname(temp_path), str(test_dir))
+        self.assertIn('enrich_titles_total{result="enriched"} 1', Path(path).read_text())
+        self.assertEqual(os.listdir(test_dir), ['metrics.prom'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,12 +2,19 @@ import unittest
 from unittest.mock import patch, MagicMock, mock_open
 import sys
 import os
+import csv
+import json
+import shutil
+import tempfile
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 
 import enrich_ratings
 
+# Keeps the metrics files out of the repository (open() is mocked in most tests)
+METRICS_ARGS = ['--metrics-file', '/tmp/fake_metrics.prom', '--summary-file', '/tmp/fake_summary.json']
+
 class TestEnrichRatings(unittest.TestCase):
 
     def test_get_countries_found(self):
@@ -40,6 +47,24 @@ class TestEnrichRatings(unittest.TestCase):
         actors = enrich_ratings.get_main_actors(soup)
         self.assertEqual(actors, "Actor One, Actor Two")
 
+    def test_get_poster_and_headshots(self):
+        html_content = """
+        <html>
+            <head><meta property="og:image" content="https://img/poster.jpg" /></head>
+            <div data-testid="title-cast-item">
+                <img src="https://img/actor-one.jpg" />
+                <a data-testid="title-cast-item__actor">Actor One</a>
+            </div>
+            <div data-testid="title-cast-item">
+                <a data-testid="title-cast-item__actor">Actor Two</a>
+            </div>
+        </html>
+        """
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html_content, 'html.parser')
+        self.assertEqual(enrich_ratings.get_poster_url(soup), "https://img/poster.jpg")
+        self.assertEqual(enrich_ratings.get_headshots(soup), {"Actor One": "https://img/actor-one.jpg"})
+
     def test_get_metadata_found(self):
         # Mock HTML with "Stars" and "Country of origin"
         html_content = """
@@ -101,11 +126,12 @@ class TestEnrichRatings(unittest.TestCase):
         
         m = mock_open(read_data=initial_csv)
         
-        with patch('builtins.open', m):
+        # open() is mocked, so the metrics temp file is never written: don't rename it
+        with patch('builtins.open', m), patch('enrich_metrics.os.replace') as mock_replace:
             with patch('enrich_ratings.get_metadata') as mock_get_metadata:
                 mock_get_metadata.return_value = {"Main Actors": "Actor X", "Countries": "Country Y"}
                 
-                enrich_ratings.main()
+                enrich_ratings.main(METRICS_ARGS)
                 
                 # Verify that get_metadata was called for the URL
                 mock_get_metadata.assert_called_with("http://url1")
@@ -116,6 +142,7 @@ class TestEnrichRatings(unittest.TestCase):
                 
                 # Check that shutil.move was called
                 mock_move.assert_called_with('/tmp/fake_ratings.csv.tmp', '/tmp/fake_ratings.csv')
+                self.assertEqual(mock_replace.call_args.args[1], '/tmp/fake_metrics.prom')
 
     @patch('enrich_ratings.RATINGS_FILE', '/tmp/fake_ratings.csv')
     @patch('enrich_ratings.SOURCE_FILE', '/tmp/fake_source.csv')
@@ -126,7 +153,7 @@ class TestEnrichRatings(unittest.TestCase):
         mock_exists.side_effect = [False, False]
         
         with patch('builtins.print') as mock_print:
-            enrich_ratings.main()
+            enrich_ratings.main(METRICS_ARGS)
             mock_print.assert_called_with("File not found: /tmp/fake_ratings.csv and source /tmp/fake_source.csv is missing too.")
 
     @patch('enrich_ratings.RATINGS_FILE', '/tmp/fake_ratings.csv')
@@ -155,13 +182,85 @@ class TestEnrichRatings(unittest.TestCase):
         initial_csv = "URL,Title\nhttp://url1,Movie1"
         m = mock_open(read_data=initial_csv)
         
-        with patch('builtins.open', m):
+        with patch('builtins.open', m), patch('enrich_metrics.os.replace'):
              with patch('enrich_ratings.get_metadata') as mock_get_metadata:
                 mock_get_metadata.return_value = {"Main Actors": "Actor", "Countries": "Country"}
-                enrich_ratings.main()
+                enrich_ratings.main(METRICS_ARGS)
                 
                 # Check that copy was called
                 mock_copy.assert_any_call('/tmp/fake_source.csv', '/tmp/fake_ratings.csv')
 
+    def test_schedule_priorities(self):
+        rows = [
+            {'Const': 'a', 'URL': 'u', 'Date Rated': '2024-01-01', 'Num Votes': '10', 'Main Actors': 'X', 'Countries': ''},
+            {'Const': 'b', 'URL': 'u', 'Date Rated': '2025-01-01', 'Num Votes': '5', 'Main Actors': '', 'Countries': ''},
+            {'Const': 'c', 'URL': 'u', 'Date Rated': '2025-06-01', 'Num Votes': '1', 'Main Actors': 'X', 'Countries': ''},
+            {'Const': 'd', 'URL': 'u', 'Date Rated': '2025-06-01', 'Num Votes': '1', 'Main Actors': 'X', 'Countries': 'Y'},
+            {'Const': 'e', 'URL': '', 'Date Rated': '2025-06-01', 'Num Votes': '1', 'Main Actors': '', 'Countries': ''},
+        ]
+        self.assertEqual(enrich_ratings.schedule(rows, ['missing', 'recent'], {}), [1, 2, 0])
+        self.assertEqual(enrich_ratings.schedule(rows, ['recent'], {}), [2, 1, 0])
+        self.assertEqual(enrich_ratings.schedule(rows, ['popular'], {}), [0, 1, 2])
+        # Past failures go last, whatever the policies say
+        self.assertEqual(enrich_ratings.schedule(rows, ['missing', 'recent'], {'b': 2}), [2, 0, 1])
+
+    def test_empty_metadata_is_a_failure(self):
+        row = {'Const': 'b', 'URL': 'u', 'Main Actors': '', 'Countries': ''}
+        failures = {}
+        with patch('sys.stdout', new=MagicMock()):
+            result = enrich_ratings.apply_metadata(row, {'Main Actors': '', 'Countries': '', 'Poster': 'http://p'}, failures)
+        self.assertIsNone(result)
+        self.assertEqual(failures, {'b': 1})
+        # So the title stops jumping the queue on every run
+        rows = [row, {'Const': 'c', 'URL': 'u', 'Date Rated': '', 'Num Votes': '1', 'Main Actors': '', 'Countries': ''}]
+        row.update({'Date Rated': '', 'Num Votes': '1'})
+        self.assertEqual(enrich_ratings.schedule(rows, ['missing'], failures), [1, 0])
+
+    def test_budget(self):
+        budget = enrich_ratings.Budget(max_requests=2)
+        self.assertFalse(budget.exhausted())
+        budget.spend()
+        budget.spend()
+        self.assertTrue(budget.exhausted())
+        self.assertTrue(enrich_ratings.Budget(max_time=0).exhausted())
+        self.assertFalse(enrich_ratings.Budget().exhausted())
+
+    @patch('time.sleep')
+    def test_main_budget_and_failures(self, mock_sleep):
+        test_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, test_dir)
+        ratings_file = test_dir / 'ratings-plus.csv'
+        failures_file = test_dir / 'enrich-failures.json'
+        with open(ratings_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Const', 'URL', 'Date Rated', 'Main Actors', 'Countries'])
+            writer.writerow(['old', 'http://old', '2020-01-01', '', ''])
+            writer.writerow(['new', 'http://new', '2025-01-01', '', ''])
+            writer.writerow(['mid', 'http://mid', '2023-01-01', '', ''])
+
+        def fake_metadata(url):
+            return None if url == 'http://new' else {"Main Actors": "Actor", "Countries": "Country"}
+
+        with patch('enrich_ratings.RATINGS_FILE', str(ratings_file)), \
+             patch('enrich_ratings.TEMP_FILE', str(ratings_file) + '.tmp'), \
+             patch('enrich_ratings.FAILURES_FILE', str(failures_file)), \
+             patch('posters.POSTERS_FILE', str(test_dir / 'posters.json')), \
+             patch('enrich_ratings.get_metadata', side_effect=fake_metadata) as mock_get_metadata, \
+             patch('sys.stdout', new=MagicMock()):
+            metrics_args = ['--metrics-file', str(test_dir / 'metrics.prom'), '--summary-file', str(test_dir / 'summary.json')]
+            enrich_ratings.main(['--max-requests', '2'] + metrics_args)
+            # Most recent first, and the budget stops before the oldest one
+            self.assertEqual([c.args[0] for c in mock_get_metadata.call_args_list], ['http://new', 'http://mid'])
+            self.assertEqual(json.loads(failures_file.read_text()), {'new': 1})
+
+            mock_get_metadata.reset_mock()
+            enrich_ratings.main(['--max-requests', '1'] + metrics_args)
+            # The failing title is pushed back behind the older one
+            mock_get_metadata.assert_called_once_with('http://old')
+
+        with open(ratings_file, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([r['Main Actors'] for r in rows], ['Actor', '', 'Actor'])
+
 if __name__ == '__main__':
     unittest.main()
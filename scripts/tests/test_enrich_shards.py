@@ -0,0 +1,160 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import csv
+import json
+import shutil
+import subprocess
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import enrich_ratings
+
+SCRIPT = str(Path(__file__).parent.parent / 'enrich_ratings.py')
+
+def title_page(const):
+    return f"""
+    <html>
+        <head><meta property="og:image" content="http://img/{const}.jpg" /></head>
+        <li><span>Stars</span><a class="ipc-metadata-list-item__list-content-item">Actor of {const}</a></li>
+        <li><span>Country of origin</span><a class="ipc-metadata-list-item__list-content-item">Country of {const}</a></li>
+    </html>
+    """
+
+class StandInImdb(BaseHTTPRequestHandler):
+    """
+    Serves a fake title page for /title/<const> and counts the requests.
+    """
+    requests = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        const = self.path.rstrip('/').rsplit('/', 1)[-1]
+        with self.lock:
+            StandInImdb.requests.append(const)
+        body = title_page(const).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestEnrichShards(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.shards_dir = self.test_dir / 'shards'
+        StandInImdb.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInImdb)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}/title"
+
+        self.consts = [f"tt{i:07d}" for i in range(12)]
+        self.ratings_file = self.test_dir / 'ratings-plus.csv'
+        with open(self.ratings_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Const', 'URL', 'Title', 'Main Actors', 'Countries'])
+            for const in self.consts:
+                writer.writerow([const, f"{base_url}/{const}", const, '', ''])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir)
+
+    def shard_command(self, index, count):
+        return [
+            sys.executable, SCRIPT, '--shard', f"{index}/{count}", '--ratings-file', str(self.ratings_file),
+            '--shards-dir', str(self.shards_dir), '--min-delay', '0', '--max-delay', '0',
+            '--metrics-file', str(self.test_dir / 'metrics.prom'), '--summary-file', str(self.test_dir / 'summary.json'),
+        ]
+
+    def test_shard_of_is_stable(self):
+        self.assertEqual(enrich_ratings.shard_of('tt1074638', 4), enrich_ratings.shard_of('tt1074638', 4))
+        shards = {enrich_ratings.shard_of(const, 3) for const in self.consts}
+        self.assertEqual(shards, {0, 1, 2})
+
+    def test_parse_shard(self):
+        self.assertEqual(enrich_ratings.parse_shard('1/4'), (1, 4))
+        for value in ('4/4', '-1/4', '1', 'a/b'):
+            with self.assertRaises(Exception):
+                enrich_ratings.parse_shard(value)
+
+    def test_shards_and_merge(self):
+        count = 3
+        processes = [subprocess.Popen(self.shard_command(i, count), stdout=subprocess.DEVNULL) for i in range(count)]
+        for process in processes:
+            self.assertEqual(process.wait(timeout=60), 0)
+
+        # Every title fetched exactly once, by the shard it belongs to
+        self.assertEqual(sorted(StandInImdb.requests), self.consts)
+        for i in range(count):
+            records = enrich_ratings.read_shard_records(enrich_ratings.shard_file((i, count), str(self.shards_dir)))
+            self.assertTrue(all(enrich_ratings.shard_of(r['Const'], count) == i for r in records))
+
+        # A shard that runs again has nothing left to do
+        subprocess.run(self.shard_command(0, count), stdout=subprocess.DEVNULL, check=True)
+        self.assertEqual(len(StandInImdb.requests), len(self.consts))
+
+        with patch('posters.POSTERS_FILE', str(self.test_dir / 'posters.json')), patch('sys.stdout', new=MagicMock()):
+            enrich_ratings.main(['--merge', '--shards-dir', str(self.shards_dir), '--ratings-file', str(self.ratings_file)])
+
+        with open(self.ratings_file, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([r['Main Actors'] for r in rows], [f"Actor of {c}" for c in self.consts])
+        self.assertEqual([r['Countries'] for r in rows], [f"Country of {c}" for c in self.consts])
+        posters_index = json.loads((self.test_dir / 'posters.json').read_text())
+        self.assertEqual(posters_index['titles']['tt0000003'], "http://img/tt0000003.jpg")
+
+    def test_empty_results_are_retried(self):
+        class EmptySource(enrich_ratings.MetadataSource):
+            calls = 0
+
+            def fetch_many(self, rows):
+                EmptySource.calls += 1
+                return {row['Const']: {'Main Actors': '', 'Countries': '', 'Poster': '', 'Headshots': {}} for row in rows}
+
+        def run_shard():
+            with patch('sys.stdout', new=MagicMock()):
+                enrich_ratings.enrich_shard(str(self.ratings_file), (0, 1), str(self.shards_dir), ['missing'],
+                                            enrich_ratings.Budget(), (0, 0), str(self.test_dir / 'metrics.prom'),
+                                            source=EmptySource())
+
+        run_shard()
+        output_path = enrich_ratings.shard_file((0, 1), str(self.shards_dir))
+        self.assertEqual(enrich_ratings.read_shard_records(output_path), [])
+        failures = enrich_ratings.load_failures(enrich_ratings.shard_file((0, 1), str(self.shards_dir), kind='failures', ext='json'))
+        self.assertEqual(failures, {const: 1 for const in self.consts})
+
+        # Nothing was marked done, so a resumed shard asks again
+        run_shard()
+        self.assertEqual(EmptySource.calls, 2 * len(self.consts))
+
+    def test_merge_resolves_conflicts_by_timestamp(self):
+        self.shards_dir.mkdir()
+        old = {'Const': 'tt0000001', 'Main Actors': 'Old', 'Countries': 'Old', 'fetched_at': '2025-01-01T00:00:00+00:00'}
+        new = {'Const': 'tt0000001', 'Main Actors': 'New', 'Countries': 'New', 'fetched_at': '2025-02-01T00:00:00+00:00'}
+        (self.shards_dir / 'a.jsonl').write_text(json.dumps(new) + "\n")
+        (self.shards_dir / 'b.jsonl').write_text(json.dumps(old) + "\n{\"Const\": \"trunc")
+        paths = [str(self.shards_dir / 'a.jsonl'), str(self.shards_dir / 'b.jsonl')]
+
+        self.assertEqual(enrich_ratings.load_shard_results(paths)['tt0000001']['Main Actors'], 'New')
+        self.assertEqual(enrich_ratings.load_shard_results(paths[::-1]), enrich_ratings.load_shard_results(paths))
+
+        with patch('posters.POSTERS_FILE', str(self.test_dir / 'posters.json')):
+            self.assertEqual(enrich_ratings.merge_shards(paths, str(self.ratings_file)), 1)
+        with open(self.ratings_file, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(rows[1]['Main Actors'], 'New')
+        self.assertEqual(rows[0]['Main Actors'], '')
+
+if __name__ == '__main__':
+    unittest.main()
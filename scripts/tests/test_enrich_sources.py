@@ -0,0 +1,128 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import csv
+import json
+import shutil
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import enrich_metrics
+import enrich_ratings
+
+TITLES = {
+    f"tt{i:07d}": {'actors': [f"Actor {i}", f"Actress {i}"], 'countries': ["Italy"], 'poster': f"http://img/{i}.jpg"}
+    for i in range(7)
+}
+
+class BulkEndpoint(BaseHTTPRequestHandler):
+    """
+    Stand-in bulk endpoint: answers with the requested titles it knows.
+    """
+    requests = []
+    status = 200
+
+    def do_POST(self):
+        ids = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['ids']
+        BulkEndpoint.requests.append(ids)
+        body = json.dumps({'titles': {i: TITLES[i] for i in ids if i in TITLES}}).encode('utf-8')
+        self.send_response(self.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestEnrichSources(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.ratings_file = self.test_dir / 'ratings-plus.csv'
+        # Eight titles, the last one unknown to the sources
+        self.consts = list(TITLES) + ['tt9999999']
+        with open(self.ratings_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Const', 'URL', 'Title', 'Main Actors', 'Countries'])
+            for const in self.consts:
+                writer.writerow([const, f"https://www.imdb.com/title/{const}", const, '', ''])
+
+        self.patches = [
+            patch('enrich_ratings.RATINGS_FILE', str(self.ratings_file)),
+            patch('enrich_ratings.TEMP_FILE', str(self.ratings_file) + '.tmp'),
+            patch('enrich_ratings.FAILURES_FILE', str(self.test_dir / 'failures.json')),
+            patch('posters.POSTERS_FILE', str(self.test_dir / 'posters.json')),
+            patch('time.sleep'),
+            patch('sys.stdout', new=MagicMock()),
+        ]
+        for p in self.patches:
+            p.start()
+        self.common_args = ['--metrics-file', str(self.test_dir / 'metrics.prom'),
+                            '--summary-file', str(self.test_dir / 'summary.json')]
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.test_dir)
+
+    def read_rows(self):
+        with open(self.ratings_file, newline='') as f:
+            return list(csv.DictReader(f))
+
+    def summary(self):
+        return json.loads((self.test_dir / 'summary.json').read_text())
+
+    def test_local_source(self):
+        source_file = self.test_dir / 'titles.json'
+        source_file.write_text(json.dumps({'titles': TITLES}))
+        with patch('enrich_ratings.get_metadata') as mock_get_metadata:
+            enrich_ratings.main(['--source', 'local', '--source-file', str(source_file), '--batch-size', '3']
+                                + self.common_args)
+            mock_get_metadata.assert_not_called()
+
+        rows = self.read_rows()
+        self.assertEqual(rows[0]['Main Actors'], "Actor 0, Actress 0")
+        self.assertEqual(rows[0]['Countries'], "Italy")
+        self.assertEqual(rows[-1]['Main Actors'], "")
+        summary = self.summary()
+        self.assertEqual(summary['requests'], 3)
+        self.assertEqual(summary['titles'], {'enriched': 7, 'failed': 1, 'skipped': 0})
+        self.assertEqual(summary['errors'], {'not_found': 1})
+        self.assertEqual(json.loads((self.test_dir / 'failures.json').read_text()), {'tt9999999': 1})
+        self.assertEqual(json.loads((self.test_dir / 'posters.json').read_text())['titles']['tt0000001'], "http://img/1.jpg")
+
+    def test_bulk_source(self):
+        BulkEndpoint.requests = []
+        BulkEndpoint.status = 200
+        server = ThreadingHTTPServer(('127.0.0.1', 0), BulkEndpoint)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/titles"
+
+        enrich_ratings.main(['--source', 'bulk', '--source-url', url, '--batch-size', '5'] + self.common_args)
+        self.assertEqual([len(ids) for ids in BulkEndpoint.requests], [5, 3])
+        self.assertEqual(sorted(sum(BulkEndpoint.requests, [])), sorted(self.consts))
+        self.assertEqual([r['Countries'] for r in self.read_rows()], ["Italy"] * 7 + [""])
+        self.assertEqual(self.summary()['requests'], 2)
+
+        # A failed request fails every title of the batch
+        BulkEndpoint.status = 503
+        enrich_ratings.main(['--source', 'bulk', '--source-url', url] + self.common_args)
+        self.assertEqual(self.summary()['errors'], {'http_5xx': 1})
+
+    def test_source_errors(self):
+        with self.assertRaises(ValueError):
+            enrich_ratings.make_source('bulk')
+        self.assertIsInstance(enrich_ratings.make_source('html'), enrich_ratings.HtmlSource)
+        with patch('sys.stderr', new=MagicMock()), self.assertRaises(SystemExit):
+            enrich_ratings.main(['--source', 'local'])
+
+if __name__ == '__main__':
+    unittest.main()
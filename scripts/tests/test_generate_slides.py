@@ -1,9 +1,79 @@
+import asyncio
 import unittest
+from unittest.mock import patch, MagicMock
+import sys
 import os
 import json
 import shutil
+from PIL import Image
+from scripts import generate_slides as slides_module
 from scripts.generate_slides import generate_slides
 
+class FakeSlide:
+    def __init__(self, page, index):
+        self.page = page
+        self.index = index
+
+    async def screenshot(self, path):
+        await asyncio.sleep(0.01)  # let the other pages take their turn, like a real render
+        self.page.screenshots.append(self.index)
+        Image.new('RGB', (1920, 1080), 'purple').save(path)
+
+class FakeLocator:
+    def __init__(self, page, slide_count):
+        self.page = page
+        self.slide_count = slide_count
+
+    async def count(self):
+        return self.slide_count
+
+    def nth(self, index):
+        return FakeSlide(self.page, index)
+
+class FakePage:
+    def __init__(self, slide_count):
+        self.slide_count = slide_count
+        self.screenshots = []
+
+    async def emulate_media(self, media):
+        pass
+
+    async def goto(self, url, wait_until):
+        self.url = url
+
+    async def wait_for_function(self, expression, timeout):
+        pass
+
+    def locator(self, selector):
+        return FakeLocator(self, self.slide_count)
+
+class FakeAsyncPlaywright:
+    """Stands in for async_playwright(): one browser, one context, pages with N slides."""
+    def __init__(self, slide_count):
+        self.slide_count = slide_count
+        self.pages = []
+        self.chromium = self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def launch(self):
+        return self
+
+    async def new_context(self, viewport):
+        return self
+
+    async def new_page(self):
+        page = FakePage(self.slide_count)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        pass
+
 class TestGenerateSlides(unittest.TestCase):
     def setUp(self):
         self.test_dir = 'test_slides_gen'
@@ -59,5 +129,139 @@ class TestGenerateSlides(unittest.TestCase):
         self.assertIn("Stats: 10, 100", content)
         self.assertIn("Most Watched: Genre1 Genre2", content)
 
+    def test_generate_slides_skip_html(self):
+        # Without HTML output, the PDF is printed from a scratch file that must not be left behind
+        pdf_file = self.output_file.replace('.html', '.pdf')
+        scratch_file = self.output_file.replace('.html', '.pdf-render.html')
+
+        def fake_render_pdf(html_path, pdf_path):
+            with open(html_path, 'r') as f:
+                self.assertIn("Stats: 10, 100", f.read())
+            with open(pdf_path, 'w') as f:
+                f.write("%PDF")
+
+        with patch.object(slides_module, 'render_pdf', side_effect=fake_render_pdf) as mock_render_pdf, \
+             patch('sys.stdout', new=MagicMock()):
+            generate_slides(self.stats_file, self.template_dir, self.template_file, self.output_file, generate_html=False)
+
+        mock_render_pdf.assert_called_once_with(scratch_file, pdf_file)
+        self.assertFalse(os.path.exists(self.output_file))
+        self.assertEqual(sorted(os.listdir(self.test_dir)),
+                         sorted([slides_module.FINGERPRINT_FILE, slides_module.FINGERPRINT_FILE + '.lock', 'index.pdf',
+                                 'stats.json', 'template.html']))
+
+    def test_fingerprints_of_other_outputs_are_kept(self):
+        other_output = os.path.join(self.test_dir, 'other.html')
+        slides_module.save_fingerprints(other_output, {'html': 'abc'})
+        with patch('sys.stdout', new=MagicMock()):
+            generate_slides(self.stats_file, self.template_dir, self.template_file, self.output_file, generate_pdf=False)
+
+        self.assertEqual(slides_module.load_fingerprints(other_output), {'html': 'abc'})
+        self.assertIn('html', slides_module.load_fingerprints(self.output_file))
+        self.assertFalse([name for name in os.listdir(self.test_dir) if name.endswith('.tmp')])
+
+    def test_concurrent_fingerprint_updates_keep_every_key(self):
+        from concurrent.futures import ThreadPoolExecutor
+        keys = [f"key{i}" for i in range(20)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda key: slides_module.save_fingerprints(self.output_file, {key: key}), keys))
+        self.assertEqual(slides_module.load_fingerprints(self.output_file), {key: key for key in keys})
+
+    def test_html_and_pdf_renders_keep_both_fingerprints(self):
+        # The PDF render started before the HTML one saved its fingerprint
+        with patch.object(slides_module, 'load_fingerprints', return_value={}), \
+             patch.object(slides_module, 'render_pdf'), patch('sys.stdout', new=MagicMock()):
+            generate_slides(self.stats_file, self.template_dir, self.template_file, self.output_file, generate_pdf=False)
+            generate_slides(self.stats_file, self.template_dir, self.template_file, self.output_file, generate_html=False)
+        self.assertEqual(set(slides_module.load_fingerprints(self.output_file)), {'html', 'pdf'})
+
+    def test_skips_render_when_fingerprint_unchanged(self):
+        with patch('sys.stdout', new=MagicMock()):
+            generate_slides(self.stats_file, self.template_dir, self.template_file, self.output_file, generate_pdf=False)
+        first_mtime = os.stat(self.output_file).st_mtime_ns
+
+        with patch.object(slides_module, 'load_stats') as mock_load_stats, patch('sys.stdout', new=MagicMock()):
+            generate_slides(self.stats_file, self.template_dir, self.template_file, self.output_file, generate_pdf=False)
+            mock_load_stats.assert_not_called()
+        self.assertEqual(os.stat(self.output_file).st_mtime_ns, first_mtime)
+
+        # A template change invalidates the fingerprint
+        with open(os.path.join(self.template_dir, self.template_file), 'a') as f:
+            f.write("\nChanged")
+        with patch('sys.stdout', new=MagicMock()):
+            generate_slides(self.stats_file, self.template_dir, self.template_file, self.output_file, generate_pdf=False)
+        with open(self.output_file, 'r') as f:
+            self.assertIn("Changed", f.read())
+
+    def test_export_slide_images(self):
+        fake = FakeAsyncPlaywright(slide_count=7)
+        png_dir = os.path.join(self.test_dir, 'png')
+        with patch('playwright.async_api.async_playwright', return_value=fake):
+            paths, thumbnails = slides_module.export_slide_images(self.output_file, png_dir, pool_size=3)
+
+        # Slides are spread over a pool of 3 pages
+        self.assertEqual(len(fake.pages), 3)
+        self.assertEqual(sorted(i for page in fake.pages for i in page.screenshots), list(range(7)))
+        self.assertTrue(all(page.screenshots for page in fake.pages))
+        self.assertTrue(fake.pages[0].url.endswith('index.html?print'))
+
+        self.assertEqual(len(paths), 7)
+        self.assertTrue(paths[0].endswith('slide-01.png'))
+        with Image.open(thumbnails[0]) as thumbnail:
+            self.assertEqual(thumbnail.size, (480, 270))
+
+    def test_environment_is_cached(self):
+        self.assertIs(slides_module.get_environment(self.template_dir), slides_module.get_environment(self.template_dir))
+
+    @patch('vendor_assets.inline_assets', return_value='<script>/* chart.js */</script>')
+    def test_generate_slides_inline_bundle(self, mock_inline_assets):
+        with open(os.path.join(self.template_dir, self.template_file), 'w') as f:
+            f.write("{% if asset_tags %}{{ asset_tags }}{% else %}<script src=\"https://cdn\"></script>{% endif %}")
+
+        generate_slides(self.stats_file, self.template_dir, self.template_file, self.output_file, generate_pdf=False, bundle='inline')
+
+        with open(self.output_file, 'r') as f:
+            self.assertEqual(f.read(), "<script>/* chart.js */</script>")
+
+    def test_weasyprint_engine_uses_static_charts(self):
+        with open(os.path.join(self.template_dir, self.template_file), 'w') as f:
+            f.write("{% if static_charts %}{{ votes_chart_svg }}{% else %}<canvas></canvas>{% endif %}")
+        self.stats_data['votes_data'] = [{'vote': 1, 'my_count': 2, 'imdb_count': 3}]
+        with open(self.stats_file, 'w') as f:
+            json.dump(self.stats_data, f)
+
+        weasyprint = MagicMock()
+        with patch.dict(sys.modules, {'weasyprint': weasyprint}), patch('sys.stdout', new=MagicMock()):
+            generate_slides(self.stats_file, self.template_dir, self.template_file, self.output_file, pdf_engine='weasyprint')
+
+        weasyprint.HTML.assert_called_once_with(filename=self.output_file)
+        weasyprint.HTML.return_value.write_pdf.assert_called_once_with(self.output_file.replace('.html', '.pdf'))
+        with open(self.output_file, 'r') as f:
+            content = f.read()
+        self.assertTrue(content.startswith('<svg'))
+        self.assertNotIn('<canvas>', content)
+
+    @patch('playwright.sync_api.sync_playwright')
+    def test_pdf_reuses_browser_and_waits_for_ready_flag(self, mock_sync_playwright):
+        playwright = mock_sync_playwright.return_value.start.return_value
+        browser = playwright.chromium.launch.return_value
+        page = browser.new_context.return_value.new_page.return_value
+
+        try:
+            with patch('sys.stdout', new=MagicMock()):
+                generate_slides(self.stats_file, self.template_dir, self.template_file, self.output_file)
+                # Forced, so the second render can't be skipped by the fingerprint check
+                generate_slides(self.stats_file, self.template_dir, self.template_file, self.output_file, force=True)
+
+            # One browser for both renders, one page per render
+            playwright.chromium.launch.assert_called_once()
+            self.assertEqual(page.pdf.call_count, 2)
+            page.wait_for_function.assert_called_with("window.__slidesReady === true", timeout=30000)
+            page.wait_for_timeout.assert_not_called()
+            self.assertTrue(page.goto.call_args[0][0].endswith('index.html?print'))
+        finally:
+            slides_module.close_browser()
+        browser.close.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main()
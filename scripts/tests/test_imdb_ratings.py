@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import imdb_ratings
+
+class TestImdbRatings(unittest.TestCase):
+
+    def test_light_commands_import_no_heavy_modules(self):
+        for command in imdb_ratings.LIGHT_COMMANDS:
+            with self.subTest(command=command):
+                modules = imdb_ratings.measure_imports(command)
+                self.assertEqual(modules & set(imdb_ratings.HEAVY_MODULES), set())
+
+    def test_heavy_dependencies_are_lazy(self):
+        # enrich and slides only import requests/bs4/Playwright when they actually fetch or print
+        for command in ['enrich', 'slides']:
+            with self.subTest(command=command):
+                modules = imdb_ratings.measure_imports(command)
+                self.assertNotIn('requests', modules)
+                self.assertNotIn('playwright', modules)
+
+    def test_dispatches_to_command_with_its_arguments(self):
+        import check_ratings
+        argv = list(sys.argv)
+        with patch.object(check_ratings, 'validate_ratings') as mock_validate:
+            imdb_ratings.main(['check-ratings', '--workers', '2'])
+        mock_validate.assert_called_once_with(workers=2, chunk_size=check_ratings.CHUNK_SIZE, output=None,
+                                              ratings_file=None)
+        self.assertEqual(sys.argv, argv)
+
+    def test_every_command_handles_help(self):
+        import generate_slides
+        with patch.object(generate_slides, 'generate_slides') as mock_generate:
+            for command in imdb_ratings.COMMANDS:
+                with self.subTest(command=command), patch('sys.stdout'):
+                    with self.assertRaises(SystemExit) as cm:
+                        imdb_ratings.main([command, '--help'])
+                    self.assertEqual(cm.exception.code, 0)
+        mock_generate.assert_not_called()
+
+    def test_command_usage_names_the_subcommand(self):
+        with patch('sys.stdout') as mock_stdout:
+            with self.assertRaises(SystemExit):
+                imdb_ratings.main(['check-stats', '--help'])
+        output = ''.join(call.args[0] for call in mock_stdout.write.call_args_list)
+        self.assertTrue(output.startswith('usage: imdb-ratings check-stats'))
+
+    def test_returns_the_command_exit_code(self):
+        import check_stats
+        with patch.object(check_stats, 'main', return_value=3) as mock_main:
+            self.assertEqual(imdb_ratings.main(['check-stats', 'stats.json']), 3)
+        mock_main.assert_called_once_with(['stats.json'], prog='imdb-ratings check-stats')
+
+    def test_unknown_command(self):
+        with patch('sys.stderr'):
+            with self.assertRaises(SystemExit):
+                imdb_ratings.main(['nope'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import csv
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import analyze_data
+import data_io
+import enrich_ratings
+import live_stats
+
+RATINGS_FILE = Path(__file__).parent.parent.parent / 'data' / 'ratings-plus.csv'
+
+class TestLiveStats(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.stats_file = self.test_dir / 'stats.json'
+        with open(RATINGS_FILE, newline='', encoding='utf-8') as f:
+            self.rows = list(csv.DictReader(f))[:40]
+        # Ten films still to enrich
+        self.missing = {}
+        for row in self.rows[:10]:
+            self.missing[row['Const']] = {'actors': row['Main Actors'].split(', '), 'countries': row['Countries'].split(', ')}
+            row['Main Actors'] = row['Countries'] = ''
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def wait_for_snapshot(self, live, count):
+        deadline = time.monotonic() + 5
+        while live.snapshots < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreaterEqual(live.snapshots, count)
+
+    def test_snapshots(self):
+        live = live_stats.LiveStats(str(self.stats_file), interval=3600).start()
+        live.submit(self.rows)
+        # The first snapshot doesn't wait for the interval
+        self.wait_for_snapshot(live, 1)
+        stats = json.loads(self.stats_file.read_text())
+        self.assertEqual(stats['progress'], {'movies': stats['total_movies'], 'enriched': stats['total_movies'] - 10})
+
+        # Updates within the interval only show up in the final stats
+        enriched = dict(self.rows[0], **{'Main Actors': 'Actor X', 'Countries': 'Italy'})
+        live.submit([enriched])
+        live.close()
+        self.assertEqual(live.snapshots, 2)
+        stats = json.loads(self.stats_file.read_text())
+        self.assertNotIn('progress', stats)
+        movies = [analyze_data.parse_film(dict(row)) for row in [enriched] + self.rows[1:]]
+        self.assertEqual(stats, json.loads(json.dumps(analyze_data.build_stats([m for m in movies if m]))))
+
+    def test_enrich_with_live_stats(self):
+        ratings_file = self.test_dir / 'ratings-plus.csv'
+        with open(ratings_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(self.rows[0]))
+            writer.writeheader()
+            writer.writerows(self.rows)
+        source_file = self.test_dir / 'titles.json'
+        source_file.write_text(json.dumps({'titles': self.missing}))
+        stats_file = self.test_dir / 'stats.json.gz'
+
+        with patch('enrich_ratings.FAILURES_FILE', str(self.test_dir / 'failures.json')), \
+             patch('posters.POSTERS_FILE', str(self.test_dir / 'posters.json')), \
+             patch('time.sleep'), patch('sys.stdout', new=MagicMock()):
+            enrich_ratings.main(['--ratings-file', str(ratings_file), '--source', 'local', '--source-file', str(source_file),
+                                 '--batch-size', '2', '--live-stats', str(stats_file), '--live-interval', '0',
+                                 '--metrics-file', str(self.test_dir / 'metrics.prom'),
+                                 '--summary-file', str(self.test_dir / 'summary.json')])
+
+        # The final live stats are those of the enriched file, and match the original data
+        stats = data_io.load_json(stats_file)
+        self.assertEqual(stats, json.loads(json.dumps(analyze_data.build_stats(analyze_data.load_data(str(ratings_file))))))
+        with open(RATINGS_FILE, newline='', encoding='utf-8') as f:
+            original = [analyze_data.parse_film(row) for row in list(csv.DictReader(f))[:40]]
+        self.assertEqual(stats['favorites']['actors'],
+                         json.loads(json.dumps(analyze_data.build_stats([m for m in original if m])))['favorites']['actors'])
+
+    def test_live_stats_needs_the_csv(self):
+        with patch('sys.stderr', new=MagicMock()), self.assertRaises(SystemExit):
+            enrich_ratings.main(['--db', 'ratings.db', '--live-stats', 'stats.json'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import ast
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pipeline
+
+def copy_stage(name, src, dst, deps=(), sleep=0):
+    # Each stage also records when it started and ended in <name>.times
+    code = (f"import shutil, time; start = time.time(); time.sleep({sleep}); shutil.copy({src!r}, {dst!r}); "
+            f"open({name + '.times'!r}, 'w').write(f'{{start}} {{time.time()}}')")
+    return {
+        'name': name,
+        'command': [sys.executable, '-c', code],
+        'inputs': [src],
+        'outputs': [dst],
+        'deps': list(deps),
+    }
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        with open(self.test_dir / 'a.txt', 'w') as f:
+            f.write("hello")
+        self.stages = [
+            copy_stage('first', 'a.txt', 'b.txt'),
+            copy_stage('left', 'b.txt', 'c.txt', deps=['first'], sleep=0.5),
+            copy_stage('right', 'b.txt', 'd.txt', deps=['first'], sleep=0.5),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def run_pipeline(self, **kwargs):
+        with patch('sys.stdout', new=MagicMock()):
+            return pipeline.run_pipeline(self.stages, base_dir=self.test_dir, **kwargs)
+
+    def test_runs_then_skips_unchanged(self):
+        status = self.run_pipeline()
+        self.assertEqual(status, {'first': 'ran', 'left': 'ran', 'right': 'ran'})
+        self.assertTrue((self.test_dir / 'd.txt').exists())
+
+        status = self.run_pipeline()
+        self.assertEqual(set(status.values()), {'skipped'})
+
+    def test_reruns_on_input_change(self):
+        self.run_pipeline()
+        with open(self.test_dir / 'a.txt', 'w') as f:
+            f.write("changed")
+        status = self.run_pipeline()
+        self.assertEqual(status['first'], 'ran')
+        self.assertEqual(status['left'], 'ran')
+        with open(self.test_dir / 'c.txt') as f:
+            self.assertEqual(f.read(), "changed")
+
+    def test_reruns_on_missing_output(self):
+        self.run_pipeline()
+        os.remove(self.test_dir / 'c.txt')
+        status = self.run_pipeline()
+        self.assertEqual(status, {'first': 'skipped', 'left': 'ran', 'right': 'skipped'})
+
+    def stage_times(self, name):
+        with open(self.test_dir / f'{name}.times') as f:
+            return [float(t) for t in f.read().split()]
+
+    def test_independent_stages_run_in_parallel(self):
+        self.run_pipeline()
+        # left and right both depend on first only, so they run at the same time
+        left_start, left_end = self.stage_times('left')
+        right_start, right_end = self.stage_times('right')
+        self.assertLess(left_start, right_end)
+        self.assertLess(right_start, left_end)
+        self.assertLessEqual(self.stage_times('first')[1], min(left_start, right_start))
+
+    def test_failure_blocks_dependents(self):
+        self.stages[0]['command'] = [sys.executable, '-c', 'import sys; sys.exit(2)']
+        with patch('sys.stderr', new=MagicMock()):
+            status = self.run_pipeline()
+        self.assertEqual(status, {'first': 'failed', 'left': 'blocked', 'right': 'blocked'})
+
+    def test_reruns_on_option_change(self):
+        self.stages[1]['options'] = ['STATIC_CHARTS']
+        with patch.dict(os.environ, {'STATIC_CHARTS': 'false'}):
+            self.run_pipeline()
+        with patch.dict(os.environ, {'STATIC_CHARTS': 'true'}):
+            status = self.run_pipeline()
+            self.assertEqual(status, {'first': 'skipped', 'left': 'ran', 'right': 'skipped'})
+            self.assertEqual(set(self.run_pipeline().values()), {'skipped'})
+
+    def test_stage_inputs_include_imported_modules(self):
+        scripts_dir = Path(pipeline.__file__).parent
+        siblings = {path.stem for path in scripts_dir.glob('*.py')}
+
+        def module_imports(name):
+            # Module-level imports only: lazy ones belong to options the stages don't use
+            tree = ast.parse((scripts_dir / f'{name}.py').read_text())
+            names = set()
+            for node in tree.body:
+                if isinstance(node, ast.Import):
+                    names.update(alias.name for alias in node.names)
+                elif isinstance(node, ast.ImportFrom) and node.module:
+                    names.add(node.module)
+            return names & siblings
+
+        for stage in pipeline.STAGES:
+            script = Path(stage['command'][1]).stem
+            todo, modules = [script], {script}
+            while todo:
+                for name in module_imports(todo.pop()) - modules:
+                    modules.add(name)
+                    todo.append(name)
+            with self.subTest(stage=stage['name']):
+                self.assertLessEqual({f'scripts/{name}.py' for name in modules}, set(stage['inputs']))
+
+    def test_pdf_is_printed_after_the_html(self):
+        stages = {stage['name']: stage for stage in pipeline.STAGES}
+        self.assertIn('slides_html', stages['slides_pdf']['deps'])
+
+if __name__ == '__main__':
+    unittest.main()
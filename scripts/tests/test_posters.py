@@ -0,0 +1,174 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import io
+import os
+import json
+import shutil
+import tempfile
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import posters
+import generate_slides
+
+def png_bytes(color, size=(300, 450)):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+STATS = {
+    'favorites': {
+        'genres': [{'name': 'Western', 'movies': ['Movie A', 'Movie B']}],
+        'directors': [{'name': 'Director X', 'movies': ['Movie B', 'Movie A']}],
+        'actors': [{'name': 'Actor Y', 'movies': ['Movie A']}, {'name': 'Actor Z', 'movies': ['Movie C']}],
+    }
+}
+
+class TestPosters(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.cache_dir = str(self.test_dir / 'cache')
+        self.ratings_file = self.test_dir / 'ratings-plus.csv'
+        self.ratings_file.write_text("Const,URL,Original Title\ntt1,http://imdb/tt1,Movie A\ntt2,http://imdb/tt2,Movie B\n"
+                                     "tt3,http://imdb/tt3,Movie C\n")
+        self.index_file = self.test_dir / 'posters.json'
+        posters.save_index({
+            'titles': {'tt1': 'http://img/a.jpg', 'tt2': 'http://img/b.jpg'},
+            'people': {'Actor Y': 'http://img/y.jpg'},
+        }, str(self.index_file))
+        self.images = {
+            'http://img/a.jpg': png_bytes('red'),
+            'http://img/b.jpg': png_bytes('blue'),
+            'http://img/y.jpg': png_bytes('red'),  # same picture as a.jpg
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def fake_get(self, url, **kwargs):
+        response = MagicMock()
+        response.content = self.images[url]
+        return response
+
+    def test_wanted_images(self):
+        index = posters.load_index(str(self.index_file))
+        wanted = posters.wanted_images(STATS, index, posters.title_consts(str(self.ratings_file)))
+        self.assertEqual(wanted, {
+            'genres:Western': 'http://img/a.jpg',
+            'directors:Director X': 'http://img/b.jpg',
+            'actors:Actor Y': 'http://img/y.jpg',
+        })
+
+    def test_record_images(self):
+        index = posters.load_index(str(self.test_dir / 'missing.json'))
+        posters.record_images(index, 'tt9', {'Poster': 'http://p', 'Headshots': {'A': 'http://h'}})
+        self.assertEqual(index, {'titles': {'tt9': 'http://p'}, 'people': {'A': 'http://h'}, 'no_poster': []})
+
+    def test_download_is_content_addressed_and_cached(self):
+        urls = list(self.images)
+        with patch('requests.get', side_effect=self.fake_get) as mock_get, patch('sys.stdout', new=MagicMock()):
+            digests = asyncio.run(posters.download_images(urls, self.cache_dir))
+            self.assertEqual(mock_get.call_count, 3)
+            self.assertEqual(digests['http://img/a.jpg'], digests['http://img/y.jpg'])
+            self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, 'originals'))), 2)
+
+            self.assertEqual(asyncio.run(posters.download_images(urls, self.cache_dir)), digests)
+            self.assertEqual(mock_get.call_count, 3)
+
+    def test_slide_images(self):
+        kwargs = {'ratings_file': str(self.ratings_file), 'index_file': str(self.index_file), 'cache_dir': self.cache_dir}
+        with patch('requests.get', side_effect=self.fake_get), patch('sys.stdout', new=MagicMock()):
+            images = posters.slide_images(STATS, **kwargs)
+        self.assertEqual(set(images), {'genres:Western', 'directors:Director X', 'actors:Actor Y'})
+        self.assertTrue(images['genres:Western'].startswith('data:image/jpeg;base64,'))
+
+        from PIL import Image
+        thumbs = os.path.join(self.cache_dir, 'thumbs')
+        # Two distinct pictures, so two thumbnails
+        self.assertEqual(len(os.listdir(thumbs)), 2)
+        for name in os.listdir(thumbs):
+            with Image.open(os.path.join(thumbs, name)) as image:
+                self.assertEqual(image.size, posters.THUMBNAIL_SIZE)
+
+        # Everything is cached: no download and no resizing
+        with patch('requests.get') as mock_get, patch('posters.ProcessPoolExecutor') as mock_pool:
+            self.assertEqual(posters.slide_images(STATS, **kwargs), images)
+            mock_get.assert_not_called()
+            mock_pool.assert_not_called()
+
+    def test_generate_slides_embeds_thumbnails(self):
+        stats_path = self.test_dir / 'stats.json'
+        stats_path.write_text(json.dumps({
+            'favorites': {'directors': [{'name': 'Director X', 'avg_rating': 8, 'count': 2, 'movies': ['A', 'B']}]}
+        }))
+        (self.test_dir / 'template.html').write_text(
+            "{% for d in favorite_directors %}{% if images['directors:' ~ d.name] %}"
+            "<img src=\"{{ images['directors:' ~ d.name] }}\">{% endif %}{% endfor %}"
+        )
+        output = self.test_dir / 'index.html'
+        with patch('posters.slide_images', return_value={'directors:Director X': 'data:image/jpeg;base64,AAAA'}), \
+             patch('sys.stdout', new=MagicMock()):
+            generate_slides.generate_slides(str(stats_path), str(self.test_dir), 'template.html', str(output),
+                                            generate_pdf=False, thumbnails=True)
+        self.assertEqual(output.read_text(), '<img src="data:image/jpeg;base64,AAAA">')
+
+    def test_backfill_index(self):
+        fetch = MagicMock(return_value={'Poster': 'http://img/c.jpg', 'Headshots': {'Actor Z': 'http://img/z.jpg'}})
+        fetched = posters.backfill_index(STATS, str(self.ratings_file), str(self.index_file), fetch=fetch)
+
+        # Only Movie C had no poster yet
+        self.assertEqual(fetched, 1)
+        fetch.assert_called_once_with('http://imdb/tt3')
+        index = posters.load_index(str(self.index_file))
+        self.assertEqual(index['titles']['tt3'], 'http://img/c.jpg')
+        self.assertEqual(index['people']['Actor Z'], 'http://img/z.jpg')
+        self.assertEqual(posters.backfill_index(STATS, str(self.ratings_file), str(self.index_file), fetch=fetch), 0)
+
+    def test_backfill_waits_between_fetches_and_remembers_misses(self):
+        posters.save_index({'titles': {}, 'people': {}}, str(self.index_file))
+        fetch = MagicMock(side_effect=lambda url: {'Poster': '' if url.endswith('tt2') else f'{url}.jpg', 'Headshots': {}})
+        with patch('time.sleep') as mock_sleep, patch('sys.stdout', new=MagicMock()):
+            self.assertEqual(posters.backfill_index(STATS, str(self.ratings_file), str(self.index_file), fetch=fetch), 3)
+            # A polite pause between two fetches, none before the first
+            self.assertEqual(mock_sleep.call_count, 2)
+
+            # tt2 has no poster: it is not fetched again
+            self.assertEqual(posters.backfill_index(STATS, str(self.ratings_file), str(self.index_file), fetch=fetch), 0)
+        index = posters.load_index(str(self.index_file))
+        self.assertEqual(index['no_poster'], ['tt2'])
+        self.assertEqual(sorted(index['titles']), ['tt1', 'tt3'])
+
+    def test_slides_up_to_date_resolve_no_images(self):
+        stats_path = self.test_dir / 'stats.json'
+        stats_path.write_text(json.dumps({
+            'favorites': {'directors': [{'name': 'Director X', 'avg_rating': 8, 'count': 2, 'movies': ['Movie A']}]}
+        }))
+        (self.test_dir / 'template.html').write_text("{{ images|length }}")
+        output = self.test_dir / 'index.html'
+
+        def render():
+            generate_slides.generate_slides(str(stats_path), str(self.test_dir), 'template.html', str(output),
+                                            generate_pdf=False, thumbnails=True)
+
+        kwargs = {'ratings_file': str(self.ratings_file), 'index_file': str(self.index_file), 'cache_dir': self.cache_dir}
+        inputs_fingerprint = posters.inputs_fingerprint
+        with patch('posters.inputs_fingerprint', side_effect=lambda: inputs_fingerprint(**kwargs)), \
+             patch('posters.slide_images', return_value={'directors:Director X': 'data:'}) as mock_slide_images, \
+             patch('sys.stdout', new=MagicMock()):
+            render()
+            render()
+            self.assertEqual(mock_slide_images.call_count, 1)
+
+            # A new URL in the index means new images
+            posters.save_index({'titles': {'tt3': 'http://img/c.jpg'}, 'people': {}}, str(self.index_file))
+            render()
+            self.assertEqual(mock_slide_images.call_count, 2)
+        self.assertEqual(output.read_text(), "1")
+
+if __name__ == '__main__':
+    unittest.main()
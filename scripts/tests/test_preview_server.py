@@ -0,0 +1,157 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import preview_server
+
+class TestPreviewServer(unittest.TestCase):
+
+    def test_changed_steps(self):
+        watched = {'ratings.csv': 'analyze', 'stats.json': 'render', 'template.html': 'render'}
+        before = {'ratings.csv': 1, 'stats.json': 1, 'template.html': 1}
+        self.assertEqual(preview_server.changed_steps(before, dict(before), watched), set())
+        self.assertEqual(preview_server.changed_steps(before, dict(before, **{'template.html': 2}), watched), {'render'})
+        self.assertEqual(preview_server.changed_steps(before, dict(before, **{'ratings.csv': 2}), watched), {'analyze'})
+
+    def test_inject_reload_script(self):
+        html = preview_server.inject_reload_script("<html><body><p>Hi</p></body></html>")
+        self.assertIn(preview_server.EVENTS_PATH, html)
+        self.assertTrue(html.endswith("</script>\n</body></html>"))
+
+    def test_watch_rebuilds_template_change(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            template = os.path.join(test_dir, 'template.html')
+            with open(template, 'w') as f:
+                f.write("v1")
+            reloader = preview_server.Reloader()
+            stop_event = threading.Event()
+            with patch('preview_server.rebuild', return_value=True) as mock_rebuild, patch('builtins.print'):
+                watcher = threading.Thread(target=preview_server.watch, args=(reloader, stop_event, {template: 'render'}, 0.01))
+                watcher.start()
+                time.sleep(0.05)  # let the watcher record the initial mtimes
+                with open(template, 'w') as f:
+                    f.write("version 2")
+                version = reloader.wait(0, timeout=2)
+                stop_event.set()
+                watcher.join()
+            self.assertEqual(version, 1)
+            mock_rebuild.assert_called_with({'render'})
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_watch_sees_edits_saved_during_a_rebuild(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            ratings = os.path.join(test_dir, 'ratings.csv')
+            stats = os.path.join(test_dir, 'stats.json')
+            template = os.path.join(test_dir, 'template.html')
+            for path in (ratings, stats, template):
+                with open(path, 'w') as f:
+                    f.write("v1")
+            watched = {ratings: 'analyze', stats: 'render', template: 'render'}
+
+            def slow_rebuild(steps):
+                if 'analyze' in steps:
+                    with open(stats, 'w') as f:
+                        f.write(f"stats {mock_rebuild.call_count}")
+                if mock_rebuild.call_count == 1:
+                    # Edited while the first analysis runs
+                    with open(template, 'w') as f:
+                        f.write("edited during the rebuild")
+                return True
+
+            reloader = preview_server.Reloader()
+            stop_event = threading.Event()
+            with patch('preview_server.rebuild', side_effect=slow_rebuild) as mock_rebuild, patch('builtins.print'):
+                watcher = threading.Thread(target=preview_server.watch,
+                                           args=(reloader, stop_event, watched, 0.01, [stats]))
+                watcher.start()
+                time.sleep(0.05)
+                with open(ratings, 'w') as f:
+                    f.write("new ratings")
+                version = reloader.wait(reloader.wait(0, timeout=2), timeout=2)
+                time.sleep(0.1)
+                # An analysis alone: its stats.json write triggers nothing more
+                with open(ratings, 'w') as f:
+                    f.write("newer ratings")
+                version = reloader.wait(version, timeout=2)
+                time.sleep(0.1)
+                stop_event.set()
+                watcher.join()
+            self.assertEqual(version, 3)
+            self.assertEqual([c.args[0] for c in mock_rebuild.call_args_list], [{'analyze'}, {'render'}, {'analyze'}])
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_watch_survives_a_failed_rebuild(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            template = os.path.join(test_dir, 'template.html')
+            with open(template, 'w') as f:
+                f.write("v1")
+            reloader = preview_server.Reloader()
+            stop_event = threading.Event()
+            with patch('preview_server.rebuild', side_effect=[Exception("TemplateSyntaxError"), True]) as mock_rebuild, \
+                 patch('builtins.print'):
+                watcher = threading.Thread(target=preview_server.watch, args=(reloader, stop_event, {template: 'render'}, 0.01))
+                watcher.start()
+                time.sleep(0.05)
+                with open(template, 'w') as f:
+                    f.write("{% broken")
+                deadline = time.monotonic() + 2
+                while mock_rebuild.call_count < 1 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertTrue(watcher.is_alive())
+                self.assertEqual(reloader.version, 0)
+
+                time.sleep(0.05)
+                with open(template, 'w') as f:
+                    f.write("fixed template")
+                version = reloader.wait(0, timeout=2)
+                stop_event.set()
+                watcher.join()
+            self.assertEqual(version, 1)
+            self.assertEqual(mock_rebuild.call_count, 2)
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_serves_index_and_events(self):
+        test_dir = tempfile.mkdtemp()
+        output_file = os.path.join(test_dir, 'index.html')
+        with open(output_file, 'w') as f:
+            f.write("<html><body>Slides</body></html>")
+
+        reloader = preview_server.Reloader()
+        with patch('preview_server.SLIDES_DIR', test_dir), patch('preview_server.OUTPUT_FILE', output_file):
+            server = ThreadingHTTPServer(('127.0.0.1', 0), preview_server.make_handler(reloader))
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            try:
+                with urllib.request.urlopen(f"{url}/") as response:
+                    body = response.read().decode('utf-8')
+                self.assertIn("Slides", body)
+                self.assertIn("EventSource", body)
+
+                with urllib.request.urlopen(f"{url}{preview_server.EVENTS_PATH}", timeout=5) as events:
+                    threading.Timer(0.1, reloader.notify).start()
+                    self.assertEqual(events.readline(), b"data: reload\n")
+            finally:
+                server.shutdown()
+                server.server_close()
+                shutil.rmtree(test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import sys
+import json
+import random
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from quantile_sketch import TDigest
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def test_exact_with_few_values(self):
+        digest = TDigest()
+        for value in [4, 1, 3, 2]:
+            digest.add(value)
+        self.assertEqual(digest.quantile(0), 1)
+        self.assertEqual(digest.quantile(0.5), 2.5)
+        self.assertEqual(digest.quantile(1), 4)
+        self.assertEqual(len(digest.centroids), 4)
+        self.assertIsNone(TDigest().quantile(0.5))
+
+    def test_accuracy_and_size(self):
+        rng = random.Random(42)
+        values = [rng.lognormvariate(11, 1.5) for _ in range(20000)]
+        digest = TDigest()
+        for value in values:
+            digest.add(value)
+        digest.compress()
+        self.assertLessEqual(len(digest.centroids), digest.compression)
+        ordered = sorted(values)
+        for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+            estimate = digest.quantile(q)
+            rank = sum(1 for v in ordered if v <= estimate) / len(ordered)
+            self.assertAlmostEqual(rank, q, delta=0.01)
+
+    def test_merge_keeps_counts_and_sums(self):
+        rng = random.Random(7)
+        parts = [TDigest() for _ in range(3)]
+        everything = TDigest()
+        for i in range(3000):
+            value = rng.randint(1, 10 ** 6)
+            parts[i % 3].add(value, liked=i % 2)
+            everything.add(value, liked=i % 2)
+
+        merged = TDigest()
+        for part in parts:
+            # Round trip through JSON, as sketches saved by other runs are
+            merged.merge(TDigest.from_dict(json.loads(json.dumps(part.to_dict()))))
+        self.assertEqual(merged.count, 3000)
+        self.assertEqual(sum(c[2].get('liked', 0) for c in merged.centroids), 1500)
+        self.assertEqual((merged.min, merged.max), (everything.min, everything.max))
+        for q in (0.25, 0.5, 0.75):
+            self.assertAlmostEqual(merged.quantile(q), everything.quantile(q), delta=0.02 * 10 ** 6)
+
+if __name__ == '__main__':
+    unittest.main()
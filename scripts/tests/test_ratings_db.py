@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import analyze_data
+import enrich_ratings
+import ratings_db
+
+DATA_DIR = Path(__file__).parent.parent.parent / 'data'
+
+class TestRatingsDb(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.conn = ratings_db.connect(str(self.test_dir / 'ratings.db'))
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_round_trip(self):
+        count = ratings_db.import_csv(self.conn, str(DATA_DIR / 'ratings-plus.csv'))
+        output = self.test_dir / 'ratings-plus.csv'
+        self.assertEqual(ratings_db.export_csv(self.conn, str(output)), count)
+        self.assertEqual(output.read_bytes(), (DATA_DIR / 'ratings-plus.csv').read_bytes())
+
+    def test_imdb_export_keeps_enrichment(self):
+        ratings_db.import_csv(self.conn, str(DATA_DIR / 'ratings-plus.csv'))
+        ratings_db.import_csv(self.conn, str(DATA_DIR / 'ratings.csv'))
+        row = ratings_db.get_row(self.conn, 'tt1074638')
+        self.assertEqual(row['Main Actors'], "Daniel Craig, Javier Bardem, Naomie Harris")
+        actors = self.conn.execute(
+            "SELECT name FROM movie_person WHERE const = ? AND role = 'actor' ORDER BY position", ('tt1074638',)
+        ).fetchall()
+        self.assertEqual([a['name'] for a in actors], ["Daniel Craig", "Javier Bardem", "Naomie Harris"])
+
+    def test_same_stats_as_csv(self):
+        ratings_db.import_csv(self.conn, str(DATA_DIR / 'ratings-plus.csv'))
+        movies = analyze_data.load_data(str(DATA_DIR / 'ratings-plus.csv'))
+        self.assertEqual(ratings_db.load_films(self.conn), movies)
+
+        from_csv = analyze_data.build_stats(movies)
+        from_db = analyze_data.build_stats(
+            ratings_db.load_films(self.conn),
+            lambda category, min_count: ratings_db.category_stats(self.conn, category, min_count),
+        )
+        self.assertEqual(from_db, from_csv)
+
+    def test_upsert_and_lookups(self):
+        row = {
+            'Const': 'tt0000001', 'Your Rating': '8', 'Date Rated': '2025-11-15', 'Title': 'A',
+            'Original Title': 'A', 'URL': 'https://www.imdb.com/title/tt0000001', 'Title Type': 'Film',
+            'IMDb Rating': '7.0', 'Runtime (mins)': '100', 'Year': '2000', 'Genres': 'Dramma',
+            'Num Votes': '10', 'Release Date': '2000-01-01', 'Directors': 'X', 'Main Actors': '', 'Countries': '',
+        }
+        ratings_db.upsert_row(self.conn, row)
+        ratings_db.upsert_row(self.conn, {**row, 'Your Rating': '9', 'Countries': 'Italy, France'})
+
+        self.assertEqual(ratings_db.get_row(self.conn, 'tt0000001'), {**row, 'Your Rating': '9', 'Countries': 'Italy, France'})
+        self.assertEqual(len(ratings_db.rated_between(self.conn, '2025-11-01', '2025-11-30')), 1)
+        self.assertEqual(ratings_db.rated_between(self.conn, '2025-12-01', '2025-12-31'), [])
+        countries = self.conn.execute("SELECT country FROM movie_country ORDER BY position").fetchall()
+        self.assertEqual([c['country'] for c in countries], ['Italy', 'France'])
+
+    @patch('time.sleep')
+    def test_enrich_db(self, mock_sleep):
+        row = {'Const': 'tt0000001', 'URL': 'http://url1', 'Title': 'Movie1'}
+        ratings_db.upsert_row(self.conn, row)
+        db_path = str(self.test_dir / 'ratings.db')
+
+        with patch('enrich_ratings.get_metadata') as mock_get_metadata, patch('sys.stdout', new=MagicMock()), \
+             patch('enrich_ratings.FAILURES_FILE', str(self.test_dir / 'enrich-failures.json')), \
+             patch('posters.POSTERS_FILE', str(self.test_dir / 'posters.json')):
+            mock_get_metadata.return_value = {"Main Actors": "Actor X", "Countries": "Country Y"}
+            enrich_ratings.main(['--db', db_path, '--metrics-file', str(self.test_dir / 'metrics.prom'),
+                                 '--summary-file', str(self.test_dir / 'summary.json')])
+            mock_get_metadata.assert_called_once_with("http://url1")
+
+        saved = ratings_db.get_row(self.conn, 'tt0000001')
+        self.assertEqual(saved['Main Actors'], "Actor X")
+        self.assertEqual(saved['Countries'], "Country Y")
+
+if __name__ == '__main__':
+    unittest.main()
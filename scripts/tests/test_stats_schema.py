@@ -0,0 +1,58 @@
+import unittest
+import sys
+import io
+import json
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import ijson
+import stats_schema
+
+VALID_ITEM = {"name": "Test", "count": 5, "approval_rate": 80.0, "avg_rating": 7.5, "movies": ["M1", "M2"]}
+
+VALID_STATS = {
+    "total_movies": 10,
+    "total_days_watched": 10,
+    "avg_runtime_minutes": 100,
+    "favorites": {"genres": [VALID_ITEM], "directors": [], "actors": []},
+    "least_favorites": {"genres": []},
+    "most_watched_genres": [VALID_ITEM],
+    "decades_data": [{"decade": "1990s", "count": 2, "avg_rating": 7.0}],
+    "votes_data": [{"vote": 1, "my_count": 0, "imdb_count": 1}]
+}
+
+class TestStatsSchema(unittest.TestCase):
+
+    def test_valid_stats(self):
+        self.assertEqual(stats_schema.validate(VALID_STATS), [])
+
+    def test_missing_key_and_null(self):
+        data = json.loads(json.dumps(VALID_STATS))
+        del data["favorites"]["actors"]
+        data["avg_runtime_minutes"] = None
+        errors = stats_schema.validate(data)
+        self.assertIn("'stats.favorites' is missing key 'actors'.", errors)
+        self.assertIn("'stats.avg_runtime_minutes' must be number, got null.", errors)
+
+    def test_wrong_item_types(self):
+        data = json.loads(json.dumps(VALID_STATS))
+        data["most_watched_genres"][0]["movies"] = "M1"
+        data["decades_data"][0]["count"] = 2.5
+        errors = stats_schema.validate(data)
+        self.assertIn("'stats.most_watched_genres[0].movies' must be array, got string.", errors)
+        self.assertIn("'stats.decades_data[0].count' must be integer, got number.", errors)
+
+    def test_streaming_matches_in_memory(self):
+        data = json.loads(json.dumps(VALID_STATS))
+        del data["most_watched_genres"][0]["avg_rating"]
+        data["favorites"]["genres"] = {}
+
+        stream = io.BytesIO(json.dumps(data).encode('utf-8'))
+        streamed = stats_schema.validate_events(ijson.basic_parse(stream, use_float=True))
+
+        self.assertEqual(streamed, stats_schema.validate(data))
+        self.assertEqual(len(streamed), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+import http.client
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import analyze_data
+import stats_server
+
+RATINGS_FILE = Path(__file__).parent.parent.parent / 'data' / 'ratings-plus.csv'
+
+class TestStatsServer(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.ratings_file = self.test_dir / 'ratings-plus.csv'
+        lines = RATINGS_FILE.read_text(encoding='utf-8').splitlines(keepends=True)
+        self.ratings_file.write_text(''.join(lines[:80]), encoding='utf-8')
+        self.extra_lines = lines[80:120]
+
+        self.cache = stats_server.StatsCache(str(self.ratings_file))
+        self.assertTrue(self.cache.refresh())
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), stats_server.make_handler(self.cache))
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.server.server_address[1])
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir)
+
+    def get(self, path, **headers):
+        self.connection.request('GET', path, headers=headers)
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_stats_and_sections(self):
+        expected = json.loads(json.dumps(analyze_data.build_stats(analyze_data.load_data(str(self.ratings_file)))))
+        response, body = self.get('/stats')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Content-Type'), 'application/json')
+        self.assertIsNone(response.getheader('Content-Encoding'))
+        self.assertEqual(json.loads(body), expected)
+
+        # Same keep-alive connection, compressed
+        response, body = self.get('/stats/favorites', **{'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.getheader('Content-Encoding'), 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(body)), expected['favorites'])
+
+        response, body = self.get('/stats/nothing')
+        self.assertEqual(response.status, 404)
+        self.assertIn('/stats/popularity', json.loads(body)['paths'])
+
+    def test_slides(self):
+        response, body = self.get('/slides/')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Content-Type'), 'text/html; charset=utf-8')
+        self.assertIn(b'Blockbusters or Hidden Gems?', body)
+
+    def test_etags(self):
+        response, _ = self.get('/stats', **{'Accept-Encoding': 'gzip'})
+        gzip_etag = response.getheader('ETag')
+        response, _ = self.get('/stats')
+        etag = response.getheader('ETag')
+        self.assertNotEqual(etag, gzip_etag)
+        self.assertTrue(etag.startswith('"') and not etag.startswith('W/'))
+
+        response, body = self.get('/stats', **{'If-None-Match': etag})
+        self.assertEqual((response.status, body), (304, b''))
+        self.assertEqual(response.getheader('Cache-Control'), 'no-cache')
+        response, _ = self.get('/stats', **{'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status, 200)
+
+        # If-None-Match uses the weak comparison
+        response, _ = self.get('/stats', **{'If-None-Match': f'"other", W/{etag}'})
+        self.assertEqual(response.status, 304)
+
+    def test_invalidated_only_when_the_ratings_change(self):
+        response, _ = self.get('/stats')
+        etag = response.getheader('ETag')
+
+        # A new mtime with the same content keeps the cache
+        stat = os.stat(self.ratings_file)
+        os.utime(self.ratings_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertFalse(self.cache.refresh())
+        self.assertEqual(self.cache.builds, 1)
+
+        with open(self.ratings_file, 'a', encoding='utf-8') as f:
+            f.writelines(self.extra_lines)
+        os.utime(self.ratings_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10 ** 9))
+        self.assertTrue(self.cache.refresh())
+        response, body = self.get('/stats', **{'If-None-Match': etag})
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.getheader('ETag'), etag)
+        self.assertGreater(json.loads(body)['total_movies'], 0)
+
+        # A broken file keeps the previous responses
+        self.ratings_file.write_text("Const,Title Type\ntt1,Film\n")
+        with patch('sys.stdout', new=MagicMock()):
+            self.assertFalse(self.cache.refresh())
+        response, _ = self.get('/stats')
+        self.assertEqual(response.status, 200)
+
+    def test_accepts_gzip(self):
+        self.assertTrue(stats_server.accepts_gzip('gzip, deflate, br'))
+        self.assertTrue(stats_server.accepts_gzip('br;q=1.0, gzip;q=0.8'))
+        self.assertFalse(stats_server.accepts_gzip('gzip;q=0'))
+        self.assertFalse(stats_server.accepts_gzip(None))
+
+if __name__ == '__main__':
+    unittest.main()
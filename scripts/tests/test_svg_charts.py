@@ -0,0 +1,52 @@
+import unittest
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import svg_charts
+
+SVG_NS = '{http://www.w3.org/2000/svg}'
+
+DECADES = [
+    {'decade': '1990s', 'count': 12, 'avg_rating': 7.5},
+    {'decade': '2000s', 'count': 30, 'avg_rating': 6.2},
+    {'decade': '2010s', 'count': 7, 'avg_rating': 4.0},
+]
+
+VOTES = [{'vote': v, 'my_count': v * 2, 'imdb_count': 10 - v} for v in range(1, 11)]
+
+class TestSvgCharts(unittest.TestCase):
+
+    def test_nice_scale(self):
+        self.assertEqual(svg_charts.nice_scale(236), (250, 50))
+        self.assertEqual(svg_charts.nice_scale(9), (10, 2))
+        self.assertEqual(svg_charts.nice_scale(0), (5, 1))
+
+    def test_decades_chart(self):
+        root = ET.fromstring(svg_charts.decades_chart_svg(DECADES))
+        bars = [r for r in root.iter(f'{SVG_NS}rect') if r.get('fill') == 'url(#decadesBars)']
+        self.assertEqual(len(bars), 3)
+        # The tallest bar belongs to the decade with most movies
+        heights = [float(b.get('height')) for b in bars]
+        self.assertEqual(heights.index(max(heights)), 1)
+        # One rating point per decade, ratings below 5 are clamped to the axis
+        circles = list(root.iter(f'{SVG_NS}circle'))
+        self.assertEqual(len(circles), 3)
+        self.assertEqual(float(circles[2].get('cy')), svg_charts.HEIGHT - svg_charts.MARGIN_BOTTOM)
+
+    def test_votes_chart(self):
+        root = ET.fromstring(svg_charts.votes_chart_svg(VOTES))
+        mine = [r for r in root.iter(f'{SVG_NS}rect') if r.get('fill') == 'url(#votesMine)']
+        imdb = [r for r in root.iter(f'{SVG_NS}rect') if r.get('fill') == 'url(#votesImdb)']
+        self.assertEqual((len(mine), len(imdb)), (10, 10))
+        # Grouped: IMDb bar sits right of my bar for the same vote
+        self.assertLess(float(mine[0].get('x')), float(imdb[0].get('x')))
+
+    def test_empty_data(self):
+        ET.fromstring(svg_charts.decades_chart_svg([]))
+        ET.fromstring(svg_charts.votes_chart_svg([]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import vendor_assets
+
+FONTS_CSS = "@font-face { src: url(https://fonts.gstatic.com/s/outfit/v1/abc.woff2) format('woff2'); }"
+
+def fake_get(url, headers=None, timeout=None):
+    response = MagicMock()
+    if url.endswith('.woff2'):
+        response.content = b'FONTDATA'
+    elif 'fonts.googleapis.com' in url:
+        response.text = FONTS_CSS
+    elif url.endswith('.js'):
+        response.text = "window.Chart = {}; '</script>';"
+    else:
+        response.text = ".animate__animated { opacity: 1; }"
+    return response
+
+class TestVendorAssets(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.vendor_dir = os.path.join(self.test_dir, 'vendor')
+        self.output_dir = os.path.join(self.test_dir, 'slides')
+        os.makedirs(self.output_dir)
+        with patch('requests.get', side_effect=fake_get), patch('sys.stdout', new=MagicMock()):
+            vendor_assets.download_assets(self.vendor_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_download_rewrites_font_urls(self):
+        with open(os.path.join(self.vendor_dir, 'fonts.css')) as f:
+            css = f.read()
+        self.assertIn("url(fonts/abc.woff2)", css)
+        self.assertTrue(os.path.exists(os.path.join(self.vendor_dir, 'fonts', 'abc.woff2')))
+
+    def test_inline_assets(self):
+        tags = vendor_assets.inline_assets(self.vendor_dir)
+        self.assertIn("<script>window.Chart = {}; '<\\/script>';</script>", tags)
+        self.assertIn("url(data:font/woff2;base64,Rk9OVERBVEE=)", tags)
+        self.assertNotIn("https://", tags)
+
+    def test_publish_hashed_assets(self):
+        tags = vendor_assets.publish_hashed_assets(self.output_dir, self.vendor_dir)
+        published = sorted(os.listdir(os.path.join(self.output_dir, 'assets')))
+        self.assertEqual(len(published), 4)  # chart.js, animate.css, fonts.css and the font file
+        for name in published:
+            if not name.endswith('.woff2'):
+                self.assertIn(f"assets/{name}", tags)
+
+        # Same content, same names: the output is stable across builds, and the files
+        # another render may be serving are left in place
+        mtimes = {name: os.stat(os.path.join(self.output_dir, 'assets', name)).st_mtime_ns for name in published}
+        self.assertEqual(tags, vendor_assets.publish_hashed_assets(self.output_dir, self.vendor_dir))
+        self.assertEqual({name: os.stat(os.path.join(self.output_dir, 'assets', name)).st_mtime_ns for name in published}, mtimes)
+
+    def test_prune_hashed_assets(self):
+        vendor_assets.publish_hashed_assets(self.output_dir, self.vendor_dir)
+        with open(os.path.join(self.vendor_dir, 'animate.min.css'), 'w') as f:
+            f.write(".animate__animated { opacity: 0.5; }")
+        tags = vendor_assets.publish_hashed_assets(self.output_dir, self.vendor_dir)
+        # Both versions until the stale one is pruned
+        self.assertEqual(len(os.listdir(os.path.join(self.output_dir, 'assets'))), 5)
+
+        removed = vendor_assets.prune_hashed_assets(self.output_dir, self.vendor_dir)
+        self.assertEqual(len(removed), 1)
+        self.assertTrue(removed[0].startswith('animate.min.'))
+        self.assertNotIn(removed[0], tags)
+        self.assertEqual(len(os.listdir(os.path.join(self.output_dir, 'assets'))), 4)
+
+    def test_missing_vendor_dir(self):
+        with self.assertRaises(FileNotFoundError):
+            vendor_assets.inline_assets(os.path.join(self.test_dir, 'missing'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import base64
+import hashlib
+import os
+import re
+import threading
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VENDOR_DIR = os.path.join(BASE_DIR, 'slides', 'vendor')
+
+# Remote assets used by slides/template.html. Chart.js and animate.css are pinned to a
+# version; the Google Fonts stylesheet has no versioned URL, so the fonts downloaded may
+# change over time (the publish workflow caches them, see README)
+ASSETS = [
+    {
+        'file': 'chart.umd.js',
+        'url': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.js',
+        'kind': 'script',
+    },
+    {
+        'file': 'animate.min.css',
+        'url': 'https://cdnjs.cloudflare.com/ajax/libs/animate.css/4.1.1/animate.min.css',
+        'kind': 'style',
+    },
+    {
+        'file': 'fonts.css',
+        'url': 'https://fonts.googleapis.com/css2?family=Outfit:wght@300;400;700;900&family=Bebas+Neue&display=swap',
+        'kind': 'style',
+    },
+]
+
+# Google Fonts only serves woff2 to browsers it recognises
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+REMOTE_FONT_RE = re.compile(r'url\((https://fonts\.gstatic\.com/[^)]+)\)')
+LOCAL_FONT_RE = re.compile(r'url\((fonts/[^)]+)\)')
+
+def download_assets(vendor_dir=VENDOR_DIR):
+    """
+    Downloads every asset into vendor_dir. Font files referenced by the fonts
+    stylesheet are saved in vendor_dir/fonts and the stylesheet is rewritten to
+    point at them. Only needed once, the slides can then be built offline.
+    """
+    import requests
+
+    fonts_dir = os.path.join(vendor_dir, 'fonts')
+    os.makedirs(fonts_dir, exist_ok=True)
+
+    for asset in ASSETS:
+        print(f"Downloading {asset['url']}...")
+        response = requests.get(asset['url'], headers=HEADERS, timeout=30)
+        response.raise_for_status()
+        content = response.text
+
+        for font_url in REMOTE_FONT_RE.findall(content):
+            font_name = font_url.rsplit('/', 1)[-1]
+            font_response = requests.get(font_url, headers=HEADERS, timeout=30)
+            font_response.raise_for_status()
+            with open(os.path.join(fonts_dir, font_name), 'wb') as f:
+                f.write(font_response.content)
+            content = content.replace(font_url, f"fonts/{font_name}")
+
+        with open(os.path.join(vendor_dir, asset['file']), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+def read_asset(vendor_dir, filename):
+    path = os.path.join(vendor_dir, filename)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found. Run 'python scripts/vendor_assets.py' once to download the assets.")
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def hashed_name(filename, content):
+    """
+    Adds a short content hash to the file name (e.g. chart.umd.1a2b3c4d5e.js) for cache busting.
+    """
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest}{ext}"
+
+def inline_assets(vendor_dir=VENDOR_DIR, include_scripts=True):
+    """
+    Returns <script>/<style> tags with every asset embedded, fonts included as data URIs.
+    """
+    tags = []
+    for asset in ASSETS:
+        if asset['kind'] == 'script' and not include_scripts:
+            continue
+        content = read_asset(vendor_dir, asset['file'])
+        if asset['kind'] == 'script':
+            content = content.replace('</script', '<\\/script')
+            tags.append(f"<script>{content}</script>")
+        else:
+            def to_data_uri(match):
+                with open(os.path.join(vendor_dir, match.group(1)), 'rb') as f:
+                    encoded = base64.b64encode(f.read()).decode('ascii')
+                return f"url(data:font/woff2;base64,{encoded})"
+            tags.append(f"<style>{LOCAL_FONT_RE.sub(to_data_uri, content)}</style>")
+    return "\n".join(tags)
+
+def write_if_missing(path, data):
+    """
+    Content-addressed files never change, so an existing one is left alone (a render
+    running at the same time may be serving it); new ones appear in one rename.
+    """
+    if os.path.exists(path):
+        return
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def _publish(assets_dir, vendor_dir, include_scripts):
+    """
+    Returns (tags, names of the published files).
+    """
+    os.makedirs(assets_dir, exist_ok=True)
+    tags = []
+    names = set()
+    for asset in ASSETS:
+        if asset['kind'] == 'script' and not include_scripts:
+            continue
+        content = read_asset(vendor_dir, asset['file'])
+
+        def copy_font(match):
+            with open(os.path.join(vendor_dir, match.group(1)), 'rb') as f:
+                data = f.read()
+            name = hashed_name(os.path.basename(match.group(1)), data)
+            write_if_missing(os.path.join(assets_dir, name), data)
+            names.add(name)
+            return f"url({name})"
+
+        content = LOCAL_FONT_RE.sub(copy_font, content)
+        data = content.encode('utf-8')
+        name = hashed_name(asset['file'], data)
+        write_if_missing(os.path.join(assets_dir, name), data)
+        names.add(name)
+
+        if asset['kind'] == 'script':
+            tags.append(f'<script src="assets/{name}"></script>')
+        else:
+            tags.append(f'<link rel="stylesheet" href="assets/{name}" />')
+    return "\n".join(tags), names
+
+def publish_hashed_assets(output_dir, vendor_dir=VENDOR_DIR, include_scripts=True):
+    """
+    Copies the assets to output_dir/assets with content-hashed names and returns
+    the <script>/<link> tags referencing them. Files already published are kept,
+    so this is safe while another render uses them; see prune_hashed_assets.
+    """
+    return _publish(os.path.join(output_dir, 'assets'), vendor_dir, include_scripts)[0]
+
+def prune_hashed_assets(output_dir, vendor_dir=VENDOR_DIR, include_scripts=True):
+    """
+    Removes the files of output_dir/assets that the current assets don't use (older
+    versions). A separate step, run once the HTML referencing the current ones is
+    published. Returns the removed names.
+    """
+    assets_dir = os.path.join(output_dir, 'assets')
+    _, names = _publish(assets_dir, vendor_dir, include_scripts)
+    removed = sorted(name for name in os.listdir(assets_dir) if name not in names and not name.endswith('.tmp'))
+    for name in removed:
+        os.remove(os.path.join(assets_dir, name))
+    return removed
+
+if __name__ == "__main__":
+    download_assets()
+    print(f"Assets saved in {VENDOR_DIR}")